@@ -0,0 +1,179 @@
+# app/async_db.py
+
+"""Async Supabase (PostgREST) client backed by a shared HTTP/2 pool.
+
+``async_supabase`` mirrors the query-builder API of the blocking client in
+``app.db``; the only difference is that ``execute()`` must be awaited::
+
+    res = await async_supabase.table("customers").select("*").eq("id", cid).execute()
+
+All queries share one ``httpx.AsyncClient`` per event loop, so concurrent
+handlers reuse keep-alive connections instead of blocking the worker while a
+PostgREST round-trip is in flight.  Timeouts and transport failures are raised
+as ``postgrest.exceptions.APIError`` so routers can keep their existing
+``except APIError`` handling.
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from types import SimpleNamespace
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+
+from app.db import SUPABASE_URL, SUPABASE_KEY
+
+logger = logging.getLogger("db")
+
+POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "100"))
+POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "20"))
+CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+QUERY_TIMEOUT = float(os.getenv("SUPABASE_QUERY_TIMEOUT", "10"))
+
+
+class AsyncQuery:
+    """Proxy around a postgrest async request builder.
+
+    Filter/modifier calls are forwarded unchanged; ``execute`` enforces a
+    per-call deadline and normalises network errors to ``APIError``.
+    """
+
+    def __init__(self, builder):
+        self._builder = builder
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            # e.g. ``.not_`` is a property returning the builder itself
+            return AsyncQuery(attr) if hasattr(attr, "execute") else attr
+
+        def method(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return AsyncQuery(result) if hasattr(result, "execute") else result
+        return method
+
+    async def execute(self, timeout: float | None = None):
+        deadline = timeout if timeout is not None else QUERY_TIMEOUT
+        try:
+            return await asyncio.wait_for(self._builder.execute(), deadline)
+        except asyncio.TimeoutError:
+            logger.error("Supabase query timed out after %ss", deadline)
+            raise APIError({
+                "message": f"Database query timed out after {deadline}s",
+                "code": "timeout",
+            })
+        except httpx.HTTPError as e:
+            logger.error("Supabase request failed: %s", e)
+            raise APIError({
+                "message": f"Database request failed: {e}",
+                "code": "http_error",
+            })
+
+
+class AsyncSupabase:
+    """Lazily builds one pooled PostgREST client per running event loop.
+
+    Connections are bound to the loop that opened them, so each loop (the
+    server's, a test client portal, an ``asyncio.run`` in a script) gets its
+    own pool.  A keeper task on that loop closes the pool when the loop shuts
+    down and cancels its pending tasks, so pools of finished loops don't leak.
+    """
+
+    def __init__(self, url: str, key: str):
+        self.rest_url = f"{url}/rest/v1"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._unbound: tuple | None = None
+
+    def _new_client(self) -> tuple[httpx.AsyncClient, AsyncPostgrestClient]:
+        http = httpx.AsyncClient(
+            base_url=self.rest_url,
+            headers=self.headers,
+            http2=True,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(QUERY_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        return http, AsyncPostgrestClient(self.rest_url, headers=self.headers, http_client=http)
+
+    async def _close_with_loop(self, loop, http: httpx.AsyncClient):
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._clients.pop(loop, None)
+            await http.aclose()
+
+    def _postgrest(self) -> AsyncPostgrestClient:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Query built outside any loop; it gets a pool of its own.
+            if self._unbound is None:
+                self._unbound = self._new_client()
+            return self._unbound[1]
+        entry = self._clients.get(loop)
+        if entry is None:
+            http, client = self._new_client()
+            keeper = loop.create_task(self._close_with_loop(loop, http))
+            entry = self._clients[loop] = (http, client, keeper)
+        return entry[1]
+
+    def table(self, name: str) -> AsyncQuery:
+        return AsyncQuery(self._postgrest().from_(name))
+
+    def from_(self, name: str) -> AsyncQuery:
+        return self.table(name)
+
+    def rpc(self, fn: str, params: dict | None = None, **kwargs) -> AsyncQuery:
+        return AsyncQuery(self._postgrest().rpc(fn, params or {}, **kwargs))
+
+    async def aclose(self):
+        """Close the pool of the running loop (and one opened outside a loop)."""
+        entry = self._clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            http, _, keeper = entry
+            keeper.cancel()
+            await asyncio.gather(keeper, return_exceptions=True)
+            await http.aclose()  # the keeper may not have started yet
+        if self._unbound is not None:
+            await self._unbound[0].aclose()
+            self._unbound = None
+
+
+class _AsyncStubQuery:
+    def __getattr__(self, _):
+        def method(*args, **kwargs):
+            return self
+        return method
+
+    async def execute(self, timeout: float | None = None):
+        return SimpleNamespace(data=[], error=None, count=0)
+
+
+class _AsyncStubClient:
+    def table(self, *_args, **_kwargs):
+        return _AsyncStubQuery()
+
+    def from_(self, *_args, **_kwargs):
+        return _AsyncStubQuery()
+
+    def rpc(self, *_args, **_kwargs):
+        return _AsyncStubQuery()
+
+    async def aclose(self):
+        pass
+
+
+if SUPABASE_URL and SUPABASE_KEY:
+    async_supabase = AsyncSupabase(SUPABASE_URL, SUPABASE_KEY)
+else:
+    logger.warning("Supabase credentials missing; using in-memory async stub")
+    async_supabase = _AsyncStubClient()
@@ -0,0 +1,116 @@
+# app/batch_pricing.py
+
+"""Whole-lot pricing review.
+
+``run_batch_pricing`` walks ``inventory_with_days_in_stock`` in keyset
+batches and compares every unit with the comps already stored in
+``market_comps`` (one ``latest_market_comps`` call for the whole lot).
+Units the nightly fetcher has no comps for can fall back to the cached
+``comp_engine`` live search; those lookups run at most
+``PRICING_CONCURRENCY`` at a time.  Each unit is flagged with the same
+``price_flag`` rule as ``format_for_manager``.
+"""
+
+import asyncio
+import logging
+import math
+import os
+from collections import Counter
+from typing import Any, Dict, List
+
+from app.async_db import async_supabase
+from app.comp_check import comp_engine, price_flag
+from app.comp_stats import TRIM_PERCENT, adjusted_price, comp_stats, parse_number
+from app.export import iter_rows
+from app.jobs import Job
+from app.pagination import async_range_pages
+
+logger = logging.getLogger("batch_pricing")
+
+PRICING_CONCURRENCY = int(os.getenv("PRICING_CONCURRENCY", "4"))
+PRICING_COMPS_PER_VEHICLE = int(os.getenv("PRICING_COMPS_PER_VEHICLE", "20"))
+PRICING_ZIPCODE = os.getenv("PRICING_ZIPCODE", "76504")
+
+INVENTORY_COLUMNS = "id,stocknumber,year,make,model,trim,sellingprice,mileage"
+REPORT_COLUMNS = [
+    "id", "stocknumber", "year", "make", "model", "trim", "mileage", "price",
+    "flag", "gap", "comp_count", "comp_source", "market_low", "market_median",
+    "market_avg", "market_high", "adjusted_price",
+]
+
+
+async def stored_comps(per_vehicle: int = PRICING_COMPS_PER_VEHICLE) -> Dict[str, List[dict]]:
+    """Latest stored comps for every vehicle, keyed by inventory id."""
+    # ``per_vehicle`` rows per unit run far past PostgREST's max-rows: page it.
+    rows = async_range_pages(
+        lambda: async_supabase.rpc("latest_market_comps", {"per_vehicle": per_vehicle})
+    )
+    by_vehicle: Dict[str, List[dict]] = {}
+    async for row in rows:
+        by_vehicle.setdefault(str(row.get("inventory_id")), []).append(row)
+    return by_vehicle
+
+
+def price_row(vehicle: dict, comps: List[dict], source: str,
+              percent: float = TRIM_PERCENT) -> Dict[str, Any]:
+    """One report row: the vehicle, its market band and flag."""
+    _, stats = comp_stats(comps, percent)
+    price = parse_number(vehicle.get("sellingprice"))
+    price = None if math.isnan(price) else int(price)
+    priced = stats["count"] > 0
+    return {
+        "id": vehicle.get("id"),
+        "stocknumber": vehicle.get("stocknumber"),
+        "year": vehicle.get("year"),
+        "make": vehicle.get("make"),
+        "model": vehicle.get("model"),
+        "trim": vehicle.get("trim"),
+        "mileage": vehicle.get("mileage"),
+        "price": price,
+        "flag": price_flag(price, stats["market_low"], stats["market_high"]) if priced else "NO COMPS",
+        "gap": price - stats["market_avg"] if priced and price else None,
+        "comp_count": stats["count"],
+        "comp_source": source if priced else "none",
+        "market_low": stats["market_low"] if priced else None,
+        "market_median": stats["market_median"] if priced else None,
+        "market_avg": stats["market_avg"] if priced else None,
+        "market_high": stats["market_high"] if priced else None,
+        "adjusted_price": adjusted_price(stats, vehicle.get("mileage")),
+    }
+
+
+async def _live_comps(vehicle: dict, zipcode: str) -> List[dict]:
+    try:
+        result = await comp_engine.search(vehicle["year"], vehicle["make"], vehicle["model"],
+                                          vehicle.get("trim"), zipcode, 200)
+    except Exception as e:
+        logger.warning("Live comps failed for inventory %s: %s", vehicle.get("id"), e)
+        return []
+    return result.get("comps", [])
+
+
+async def run_batch_pricing(job: Job, live: bool = True, zipcode: str = PRICING_ZIPCODE,
+                            concurrency: int = PRICING_CONCURRENCY) -> List[Dict[str, Any]]:
+    """Price every inventory unit, updating ``job`` progress as units finish."""
+    comps_by_vehicle = await stored_comps()
+    vehicles = [v async for v in iter_rows(
+        lambda: async_supabase.table("inventory_with_days_in_stock").select(INVENTORY_COLUMNS)
+    )]
+    job.total = len(vehicles)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def evaluate(vehicle: dict) -> Dict[str, Any]:
+        comps = comps_by_vehicle.get(str(vehicle.get("id")), [])
+        if comps or not live or not all(vehicle.get(k) for k in ("year", "make", "model")):
+            row = price_row(vehicle, comps, "stored")
+        else:
+            async with semaphore:
+                comps = await _live_comps(vehicle, zipcode)
+            # Live results were already trimmed by summarize_comps.
+            row = price_row(vehicle, comps, "live", percent=0)
+        job.advance()
+        return row
+
+    rows = await asyncio.gather(*(evaluate(v) for v in vehicles))
+    job.summary = dict(Counter(r["flag"] for r in rows))
+    return rows
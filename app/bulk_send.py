@@ -0,0 +1,207 @@
+# app/bulk_send.py
+
+"""Bulk message sending.
+
+Texts: ``/bulk/text`` returns a job id straight away and ``send_bulk`` does the
+work on the event loop: ``BULK_SEND_WORKERS`` workers pull recipients off an
+``asyncio.Queue``, wait for the account's token bucket
+(``TWILIO_MESSAGES_PER_SECOND``) and run the blocking provider call in a
+thread.  A 429 from the provider is retried with backoff; other errors count
+as failed.  Progress and sent/failed/skipped counts are on the ``Job``.
+
+Email: ``send_email_batches`` packs recipients into SendGrid requests of up
+to ``SENDGRID_BATCH_SIZE`` personalizations (SendGrid allows 1000), each
+personalization carrying that customer's merge fields (``{{first_name}}``
+etc. in the subject/body), and sends the requests concurrently in threads.
+
+Both accept recipients as an async iterable, so ``/bulk/*`` can stream
+customer rows from ``iter_by_ids`` straight into the senders.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from html import escape
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List
+
+from sendgrid.helpers.mail import Mail, Personalization, Substitution, To
+
+from app.jobs import Job
+from app.rate_limit import AsyncTokenBucket
+
+logger = logging.getLogger("bulk_send")
+
+BULK_SEND_WORKERS = int(os.getenv("BULK_SEND_WORKERS", "8"))
+TWILIO_MESSAGES_PER_SECOND = float(os.getenv("TWILIO_MESSAGES_PER_SECOND", "1"))
+SEND_RETRIES = 3
+RETRY_BACKOFF = 1.0
+SENDGRID_BATCH_SIZE = min(int(os.getenv("SENDGRID_BATCH_SIZE", "1000")), 1000)
+SENDGRID_CONCURRENCY = int(os.getenv("SENDGRID_CONCURRENCY", "4"))
+
+_DONE = object()
+
+MERGE_FIELD = re.compile(r"{{\s*(\w+)\s*}}")
+# Placeholder used in the HTML body, whose values are HTML-escaped; the
+# subject keeps ``{{name}}`` and gets the raw value.
+HTML_FIELD = "{{html:%s}}"
+
+
+def _throttled(exc: Exception) -> bool:
+    return getattr(exc, "status", None) == 429
+
+
+async def _aiter(items: Iterable[Any] | AsyncIterable[Any]) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def send_bulk(job: Job, recipients: Iterable[Any] | AsyncIterable[Any],
+                    send: Callable[[Any], Any], limiter: AsyncTokenBucket,
+                    workers: int = BULK_SEND_WORKERS,
+                    sleep: Callable[[float], Awaitable] = asyncio.sleep,
+                    address: Callable[[Any], Any] | None = None) -> dict:
+    """Call blocking ``send(address(recipient))`` for every recipient through a worker pool.
+
+    ``recipients`` may be an async iterable (rows streaming in from
+    ``iter_by_ids``); workers start sending as soon as the first one arrives
+    and ``job.total`` grows as more do.  Recipients whose ``address`` is
+    empty are counted as skipped; without ``address`` each recipient is
+    passed to ``send`` as is.
+    """
+    workers = max(1, workers)
+    queue: asyncio.Queue = asyncio.Queue()
+    for key in ("skipped", "sent", "failed"):
+        job.summary.setdefault(key, 0)
+    job.total = job.done = job.summary["skipped"]
+
+    async def produce():
+        try:
+            async for recipient in _aiter(recipients):
+                job.total += 1
+                target = recipient if address is None else address(recipient)
+                if not target:
+                    job.summary["skipped"] += 1
+                    job.advance()
+                    continue
+                queue.put_nowait(target)
+        finally:
+            for _ in range(workers):
+                queue.put_nowait(_DONE)
+
+    async def worker():
+        while True:
+            recipient = await queue.get()
+            if recipient is _DONE:
+                return
+            for attempt in range(SEND_RETRIES):
+                await limiter.acquire()
+                try:
+                    await asyncio.to_thread(send, recipient)
+                    job.summary["sent"] += 1
+                    break
+                except Exception as e:
+                    if _throttled(e) and attempt < SEND_RETRIES - 1:
+                        await sleep(RETRY_BACKOFF * 2 ** attempt)
+                        continue
+                    logger.warning("Bulk send to %r failed: %s", recipient, e)
+                    job.summary["failed"] += 1
+                    break
+            job.advance()
+
+    await asyncio.gather(produce(), *(worker() for _ in range(workers)))
+    return dict(job.summary)
+
+
+# ── Email ─────────────────────────────────────────────
+
+def merge_fields(*templates: str) -> tuple[list[str], list[str]]:
+    """Normalise ``{{ name }}`` placeholders to ``{{name}}``; return templates and field names."""
+    fields = sorted({f for t in templates for f in MERGE_FIELD.findall(t or "")})
+    return [MERGE_FIELD.sub(lambda m: "{{%s}}" % m.group(1), t or "") for t in templates], fields
+
+
+def batch_mail(from_email: str, subject: str, html: str, recipients: List[dict],
+               fields: List[str]) -> Mail:
+    """One SendGrid request: one personalization (own To + merge values) per recipient.
+
+    Values merged into ``html`` are HTML-escaped, so a customer's name can't
+    inject markup; the subject gets them as they are.
+    """
+    html_fields = set(MERGE_FIELD.findall(html))
+    subject_fields = set(MERGE_FIELD.findall(subject))
+    html = MERGE_FIELD.sub(lambda m: HTML_FIELD % m.group(1), html)
+    mail = Mail(from_email=from_email, subject=subject, html_content=html)
+    for row in recipients:
+        p = Personalization()
+        p.add_to(To(row["email"]))
+        for field in fields:
+            value = row.get(field)
+            value = "" if value is None else str(value)
+            if field in subject_fields:
+                p.add_substitution(Substitution("{{%s}}" % field, value))
+            if field in html_fields:
+                p.add_substitution(Substitution(HTML_FIELD % field, escape(value)))
+        mail.add_personalization(p)
+    return mail
+
+
+async def send_email_batches(client, from_email: str, subject: str, html: str,
+                             customers: Iterable[dict] | AsyncIterable[dict],
+                             batch_size: int | None = None,
+                             concurrency: int = SENDGRID_CONCURRENCY) -> Dict[str, Any]:
+    """Send ``html`` to every customer with an email, ``batch_size`` per request.
+
+    ``customers`` may be an async iterable; each batch is sent as soon as it
+    fills up, while the rest are still being looked up.  Returns
+    sent/failed/skipped recipient counts and one outcome per batch.
+    """
+    batch_size = batch_size or SENDGRID_BATCH_SIZE
+    (subject, html), fields = merge_fields(subject, html)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def send(index: int, batch: List[dict]) -> Dict[str, Any]:
+        mail = batch_mail(from_email, subject, html, batch, fields)
+        outcome = {"batch": index, "recipients": len(batch), "status_code": None, "error": None}
+        async with semaphore:
+            try:
+                response = await asyncio.to_thread(client.send, mail)
+                outcome["status_code"] = response.status_code
+            except Exception as e:
+                outcome["status_code"] = getattr(e, "status_code", None)
+                outcome["error"] = str(e)
+                logger.warning("SendGrid batch %s (%s recipients) failed: %s", index, len(batch), e)
+        return outcome
+
+    tasks: List[asyncio.Future] = []
+    batch: List[dict] = []
+    recipients = skipped = 0
+    try:
+        async for row in _aiter(customers):
+            if not row.get("email"):
+                skipped += 1
+                continue
+            recipients += 1
+            batch.append(row)
+            if len(batch) == batch_size:
+                tasks.append(asyncio.ensure_future(send(len(tasks), batch)))
+                batch = []
+        if batch:
+            tasks.append(asyncio.ensure_future(send(len(tasks), batch)))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    outcomes = await asyncio.gather(*tasks)
+    sent = sum(o["recipients"] for o in outcomes if o["error"] is None)
+    return {
+        "sent": sent,
+        "failed": recipients - sent,
+        "skipped": skipped,
+        "batches": outcomes,
+    }
@@ -0,0 +1,57 @@
+# app/cache.py
+
+"""Small in-process TTL cache for expensive, slowly changing results."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire ``ttl`` seconds after being set.
+
+    ``maxsize`` bounds memory by evicting the least recently set entry.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, self._MISSING)
+            if item is self._MISSING:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        """Store ``value``; ``ttl`` overrides the cache default for this entry."""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        """Return the cached value for ``key``, computing it with ``factory()`` on a miss."""
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=_MISSING):
+        """Drop ``key``, or every entry when called without arguments."""
+        with self._lock:
+            if key is self._MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
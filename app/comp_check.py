@@ -1,13 +1,47 @@
-import requests
-from bs4 import BeautifulSoup
+# app/comp_check.py
+
+"""Market comps from Cars.com, CarGurus and Autotrader.
+
+Each source is a request builder plus a ``parse_*`` function that turns a
+results page into comp dicts (via the ``ListingSpec`` helpers in
+``app.comp_parsing``), so parsing can be tested against saved HTML.
+``CompEngine`` fetches all sources concurrently over one pooled
+``httpx.AsyncClient``:
+
+* every source gets its own deadline (``COMP_SOURCE_TIMEOUT``); a slow or
+  failing source is reported in ``sources`` and the others are still used;
+* results are cached per (year, make, model, trim, zip, radius) for
+  ``COMP_CACHE_TTL`` seconds (``COMP_PARTIAL_CACHE_TTL`` when a source was
+  missing, so it is retried sooner);
+* the raw result pages also go through the shared disk cache in
+  ``app.http_cache``, so a restart or another worker does not refetch them.
+"""
+
+import asyncio
+import logging
+import os
+import weakref
 from typing import List, Dict, Any
 
+import httpx
+import numpy as np
+from app.cache import TTLCache
+from app.http_cache import AsyncCachingTransport, http_cache
+from app.comp_parsing import ListingSpec, card_strainer, parse_listings
+from app.comp_stats import comp_arrays, comp_stats, trim_mask
+
+logger = logging.getLogger("comp_check")
+
+COMP_SOURCE_TIMEOUT = float(os.getenv("COMP_SOURCE_TIMEOUT", "8"))
+COMP_CACHE_TTL = float(os.getenv("COMP_CACHE_TTL", "900"))
+COMP_PARTIAL_CACHE_TTL = float(os.getenv("COMP_PARTIAL_CACHE_TTL", "60"))
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+# ── Cars.com ──────────────────────────────────────────
 
-def scrape_cars_com(year: int, make: str, model: str, trim: str | None = None,
-                    zipcode: str = "76504", radius: int = 200,
-                    max_results: int = 15) -> List[Dict[str, Any]]:
-    """Scrape used car listings from Cars.com."""
-    base_url = "https://www.cars.com/shopping/results/"
+def cars_com_request(year: int, make: str, model: str, zipcode: str = "76504",
+                     radius: int = 200, max_results: int = 15):
     params = {
         "stock_type": "used",
         "makes[]": make.lower(),
@@ -20,130 +54,74 @@ def scrape_cars_com(year: int, make: str, model: str, trim: str | None = None,
         "sort": "best_match_desc",
     }
     query = "&".join(f"{k}={v}" for k, v in params.items() if v)
-    url = f"{base_url}?{query}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    print("Scraping URL:", url)
-    r = requests.get(url, headers=headers, timeout=30)
-    soup = BeautifulSoup(r.text, "html.parser")
-    cars = []
-    for listing in soup.select("div.vehicle-card"):
-        try:
-            title = listing.select_one("h2.title").get_text(strip=True)
-            price_el = listing.select_one("span.primary-price")
-            price = price_el.get_text(strip=True) if price_el else "N/A"
-            mileage_el = listing.select_one("div.mileage")
-            mileage = mileage_el.get_text(strip=True) if mileage_el else "N/A"
-            location_el = listing.select_one("div.dealer-name")
-            location = location_el.get_text(strip=True) if location_el else "N/A"
-            link = "https://www.cars.com" + listing.select_one("a.vehicle-card-link")['href']
-            trim_info = " ".join(title.split()[3:]) if len(title.split()) > 3 else "N/A"
-            car = {
-                "source": "Cars.com",
-                "year_make_model": title,
-                "year": title.split()[0],
-                "make": title.split()[1],
-                "model": title.split()[2],
-                "trim": trim_info,
-                "mileage": mileage,
-                "price": price.replace("$", "").replace(",", ""),
-                "location": location,
-                "url": link,
-            }
-            if trim and trim.lower() not in car["trim"].lower():
-                continue
-            cars.append(car)
-        except Exception:
-            continue
-    return cars
-
-
-def scrape_cargurus(year: int, make: str, model: str, trim: str | None = None,
-                    zipcode: str = "76504", radius: int = 200,
-                    max_results: int = 15) -> List[Dict[str, Any]]:
-    """Scrape used car listings from CarGurus."""
-    search_url = "https://www.cargurus.com/Cars/inventorylisting/viewDetailsFilterViewInventoryListing.action"
-    params = {
+    return f"https://www.cars.com/shopping/results/?{query}", None
+
+
+CARS_COM = ListingSpec(
+    "Cars.com", "https://www.cars.com", card_strainer("div", "vehicle-card"),
+    title="h2.title", price="span.primary-price", mileage="div.mileage",
+    location="div.dealer-name", link="a.vehicle-card-link",
+)
+
+
+def parse_cars_com(html: str, trim: str | None = None) -> List[Dict[str, Any]]:
+    """Parse a Cars.com results page."""
+    return parse_listings(html, CARS_COM, trim)
+
+
+# ── CarGurus ──────────────────────────────────────────
+
+def cargurus_request(year: int, make: str, model: str, zipcode: str = "76504",
+                     radius: int = 200, max_results: int = 15):
+    url = "https://www.cargurus.com/Cars/inventorylisting/viewDetailsFilterViewInventoryListing.action"
+    return url, {
         "zip": zipcode,
         "distance": radius,
         "entitySelectingHelper.selectedEntity": f"{year}_{make}_{model}",
     }
-    r = requests.get(search_url, params=params, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
-    soup = BeautifulSoup(r.text, "html.parser")
-    cars = []
-    for listing in soup.select("div.ListingListing__listingCard"):
-        try:
-            title = listing.select_one("h4.listingTitle").get_text(strip=True)
-            price_el = listing.select_one("span.price")
-            price = price_el.get_text(strip=True) if price_el else "N/A"
-            mileage_el = listing.select_one("div.Mileage")
-            mileage = mileage_el.get_text(strip=True) if mileage_el else "N/A"
-            location_el = listing.select_one("div.Location")
-            location = location_el.get_text(strip=True) if location_el else "N/A"
-            link = "https://www.cargurus.com" + listing.select_one("a")['href']
-            trim_info = " ".join(title.split()[3:]) if len(title.split()) > 3 else "N/A"
-            car = {
-                "source": "CarGurus",
-                "year_make_model": title,
-                "year": title.split()[0],
-                "make": title.split()[1],
-                "model": title.split()[2],
-                "trim": trim_info,
-                "mileage": mileage,
-                "price": price.replace("$", "").replace(",", ""),
-                "location": location,
-                "url": link,
-            }
-            if trim and trim.lower() not in car["trim"].lower():
-                continue
-            cars.append(car)
-        except Exception:
-            continue
-    return cars
-
-
-def scrape_autotrader(year: int, make: str, model: str, trim: str | None = None,
-                      zipcode: str = "76504", radius: int = 200,
-                      max_results: int = 15) -> List[Dict[str, Any]]:
-    """Scrape used car listings from Autotrader."""
-    search_url = f"https://www.autotrader.com/cars-for-sale/{make}/{model}/{zipcode}"
-    params = {
+
+
+CARGURUS = ListingSpec(
+    "CarGurus", "https://www.cargurus.com", card_strainer("div", "ListingListing__listingCard"),
+    title="h4.listingTitle", price="span.price", mileage="div.Mileage",
+    location="div.Location", link="a",
+)
+
+
+def parse_cargurus(html: str, trim: str | None = None) -> List[Dict[str, Any]]:
+    """Parse a CarGurus results page."""
+    return parse_listings(html, CARGURUS, trim)
+
+
+# ── Autotrader ────────────────────────────────────────
+
+def autotrader_request(year: int, make: str, model: str, zipcode: str = "76504",
+                       radius: int = 200, max_results: int = 15):
+    return f"https://www.autotrader.com/cars-for-sale/{make}/{model}/{zipcode}", {
         "searchRadius": radius,
         "startYear": year,
         "endYear": year,
         "numRecords": max_results,
     }
-    r = requests.get(search_url, params=params, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
-    soup = BeautifulSoup(r.text, "html.parser")
-    cars = []
-    for listing in soup.select("div.inventory-listing"):
-        try:
-            title = listing.select_one("h2.title").get_text(strip=True)
-            price_el = listing.select_one("span.first-price")
-            price = price_el.get_text(strip=True) if price_el else "N/A"
-            mileage_el = listing.select_one("div.text-bold.text-size-200")
-            mileage = mileage_el.get_text(strip=True) if mileage_el else "N/A"
-            location_el = listing.select_one("div.text-bold.text-size-100")
-            location = location_el.get_text(strip=True) if location_el else "N/A"
-            link = "https://www.autotrader.com" + listing.select_one("a")['href']
-            trim_info = " ".join(title.split()[3:]) if len(title.split()) > 3 else "N/A"
-            car = {
-                "source": "Autotrader",
-                "year_make_model": title,
-                "year": title.split()[0],
-                "make": title.split()[1],
-                "model": title.split()[2],
-                "trim": trim_info,
-                "mileage": mileage,
-                "price": price.replace("$", "").replace(",", ""),
-                "location": location,
-                "url": link,
-            }
-            if trim and trim.lower() not in car["trim"].lower():
-                continue
-            cars.append(car)
-        except Exception:
-            continue
-    return cars
+
+
+AUTOTRADER = ListingSpec(
+    "Autotrader", "https://www.autotrader.com", card_strainer("div", "inventory-listing"),
+    title="h2.title", price="span.first-price", mileage="div.text-bold.text-size-200",
+    location="div.text-bold.text-size-100", link="a",
+)
+
+
+def parse_autotrader(html: str, trim: str | None = None) -> List[Dict[str, Any]]:
+    """Parse an Autotrader results page."""
+    return parse_listings(html, AUTOTRADER, trim)
+
+
+SOURCES = {
+    "Cars.com": (cars_com_request, parse_cars_com),
+    "CarGurus": (cargurus_request, parse_cargurus),
+    "Autotrader": (autotrader_request, parse_autotrader),
+}
 
 
 def clean_price(p: Any) -> int | None:
@@ -154,23 +132,15 @@ def clean_price(p: Any) -> int | None:
 
 
 def remove_outliers(cars: List[Dict[str, Any]], key: str = "price", percent: float = 0.1) -> List[Dict[str, Any]]:
-    prices = sorted([clean_price(c[key]) for c in cars if clean_price(c[key])])
-    if not prices:
+    """Drop the cheapest and dearest ``percent`` of priced ``cars`` (by rank)."""
+    prices, _ = comp_arrays(cars, price_key=key)
+    if np.isnan(prices).all():
         return cars
-    n = len(prices)
-    lower = int(n * percent)
-    upper = n - lower
-    filtered_prices = set(prices[lower:upper])
-    return [c for c in cars if clean_price(c[key]) in filtered_prices]
-
+    return [c for c, keep in zip(cars, trim_mask(prices, percent)) if keep]
 
-def aggregate_comps(year: int, make: str, model: str, trim: str | None = None,
-                    zipcode: str = "76504", radius: int = 200) -> Dict[str, Any]:
-    comps: List[Dict[str, Any]] = []
-    comps += scrape_cars_com(year, make, model, trim, zipcode, radius)
-    comps += scrape_cargurus(year, make, model, trim, zipcode, radius)
-    comps += scrape_autotrader(year, make, model, trim, zipcode, radius)
 
+def summarize_comps(comps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Dedupe, trim outliers and compute the market band (see ``app.comp_stats``)."""
     seen = set()
     unique = []
     for c in comps:
@@ -179,17 +149,132 @@ def aggregate_comps(year: int, make: str, model: str, trim: str | None = None,
             seen.add(key)
             unique.append(c)
 
-    filtered = remove_outliers(unique)
-    price_list = [clean_price(c["price"]) for c in filtered if clean_price(c["price"])]
-    avg = int(sum(price_list) / len(price_list)) if price_list else 0
-    lo = min(price_list) if price_list else 0
-    hi = max(price_list) if price_list else 0
-    return {
-        "comps": filtered,
-        "market_avg": avg,
-        "market_low": lo,
-        "market_high": hi,
-    }
+    filtered, stats = comp_stats(unique)
+    return {"comps": filtered, **stats}
+
+
+class CompEngine:
+    """Concurrent, cached comp lookups across ``sources``.
+
+    ``transport`` is handed to ``httpx.AsyncClient`` (tests pass an
+    ``httpx.MockTransport`` serving local HTML fixtures); by default a pooled
+    transport wrapped in the shared HTTP disk cache is used.
+    """
+
+    def __init__(self, sources=SOURCES, timeout: float = COMP_SOURCE_TIMEOUT,
+                 cache_ttl: float = COMP_CACHE_TTL,
+                 partial_ttl: float = COMP_PARTIAL_CACHE_TTL, transport=None):
+        self.sources = sources
+        self.timeout = timeout
+        self.partial_ttl = partial_ttl
+        self.cache = TTLCache(ttl=cache_ttl, maxsize=512)
+        self._transport = transport
+        self._page_cache = transport.cache if isinstance(transport, AsyncCachingTransport) else None
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _new_client(self) -> httpx.AsyncClient:
+        transport = self._transport
+        if transport is None:
+            transport = AsyncCachingTransport(httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            ), http_cache)
+            self._page_cache = http_cache
+        return httpx.AsyncClient(
+            headers=HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(self.timeout),
+            transport=transport,
+        )
+
+    async def _close_with_loop(self, loop, http: httpx.AsyncClient):
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._clients.pop(loop, None)
+            await http.aclose()
+
+    def _client(self) -> httpx.AsyncClient:
+        # Connections belong to the loop that opened them: one client per
+        # loop, closed by a keeper task when that loop shuts down (as in
+        # ``app.async_db``).
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is None:
+            http = self._new_client()
+            keeper = loop.create_task(self._close_with_loop(loop, http))
+            entry = self._clients[loop] = (http, keeper)
+        return entry[0]
+
+    async def _fetch(self, name: str, year: int, make: str, model: str,
+                     trim: str | None, zipcode: str, radius: int):
+        build, parse = self.sources[name]
+        url, params = build(year, make, model, zipcode, radius)
+        try:
+            r = await asyncio.wait_for(self._client().get(url, params=params), self.timeout)
+            r.raise_for_status()
+            # BeautifulSoup is CPU-bound; keep it off the event loop.
+            cars = await asyncio.to_thread(parse, r.text, trim)
+            if not cars and self._page_cache is not None:
+                # No listings, often a block/captcha page served as 200; don't keep it.
+                await asyncio.to_thread(self._page_cache.invalidate, str(r.request.url))
+            return name, cars, "ok"
+        except asyncio.TimeoutError:
+            logger.warning("%s comps timed out after %ss", name, self.timeout)
+            return name, [], "timeout"
+        except Exception as e:
+            logger.warning("%s comps failed: %s", name, e)
+            return name, [], "error"
+
+    async def search(self, year: int, make: str, model: str, trim: str | None = None,
+                     zipcode: str = "76504", radius: int = 200) -> Dict[str, Any]:
+        key = (int(year), make.lower(), model.lower(), (trim or "").lower(),
+               str(zipcode), int(radius))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        fetched = await asyncio.gather(*(
+            self._fetch(name, year, make, model, trim, zipcode, radius)
+            for name in self.sources
+        ))
+        comps: List[Dict[str, Any]] = []
+        statuses = {}
+        for name, found, status in fetched:
+            comps += found
+            statuses[name] = status
+
+        result = summarize_comps(comps)
+        result["sources"] = statuses
+        result["partial"] = any(s != "ok" for s in statuses.values())
+        self.cache.set(key, result, ttl=self.partial_ttl if result["partial"] else None)
+        return result
+
+    async def aclose(self):
+        entry = self._clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            http, keeper = entry
+            keeper.cancel()
+            await asyncio.gather(keeper, return_exceptions=True)
+            await http.aclose()  # the keeper may not have started yet
+
+
+comp_engine = CompEngine()
+
+
+async def aggregate_comps(year: int, make: str, model: str, trim: str | None = None,
+                          zipcode: str = "76504", radius: int = 200) -> Dict[str, Any]:
+    """Comps from every source, fetched concurrently and cached."""
+    return await comp_engine.search(year, make, model, trim, zipcode, radius)
+
+def price_flag(price: int | None, lo: int, hi: int) -> str:
+    """OVERPRICED / UNDERPRICED / IN MARKET RANGE for ``price`` against a market band."""
+    return (
+        "OVERPRICED" if price and price > hi else
+        "UNDERPRICED" if price and price < lo else
+        "IN MARKET RANGE"
+    )
 
 
 def format_for_manager(vehicle: Dict[str, Any], result: Dict[str, Any]) -> str:
@@ -200,11 +285,7 @@ def format_for_manager(vehicle: Dict[str, Any], result: Dict[str, Any]) -> str:
     market_band = f"${lo:,}–${hi:,}"
     user_price = clean_price(vehicle.get("price", "N/A"))
     gap = user_price - avg if user_price and avg else 0
-    flag = (
-        "OVERPRICED" if user_price and user_price > hi else
-        "UNDERPRICED" if user_price and user_price < lo else
-        "IN MARKET RANGE"
-    )
+    flag = price_flag(user_price, lo, hi)
     lines = [
         f"Market comps for {vehicle['year']} {vehicle['make']} {vehicle['model']} {vehicle.get('trim','')}:",
         f"- Your price: ${user_price:,} | Market avg: ${avg:,} | Most comps: {market_band} | Status: {flag}",
@@ -0,0 +1,103 @@
+# app/comp_parsing.py
+
+"""Shared HTML parsing for the comp scrapers.
+
+Result pages are mostly navigation, scripts and ads; only the listing cards
+matter.  ``iter_cards`` hands BeautifulSoup a ``SoupStrainer`` so the tree is
+built for the cards alone, using lxml when it is installed.  Each listing's
+title is split once by ``parse_title`` into year/make/model/trim.
+
+Used by ``app.comp_check`` and ``scripts/comp_fetcher.py``;
+``scripts/bench_comp_parsing.py`` times it against full-page parsing.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from bs4.builder import builder_registry
+
+PARSER = "lxml" if builder_registry.lookup("lxml") else "html.parser"
+
+
+def card_strainer(name: str | None = None, css_class: str | None = None,
+                  **attrs: str) -> SoupStrainer:
+    """Strainer matching listing cards by tag, CSS class and/or attributes."""
+    if css_class:
+        # While straining, ``class`` is still the raw attribute string, so a
+        # plain value would miss cards that carry more than one class.
+        attrs["class"] = lambda value: bool(value) and css_class in (
+            value.split() if isinstance(value, str) else value)
+    return SoupStrainer(name, attrs=attrs)
+
+
+def iter_cards(html: str, strainer: SoupStrainer) -> Iterator[Tag]:
+    """Yield the elements of ``html`` matched by ``strainer``, parsing nothing else."""
+    soup = BeautifulSoup(html, PARSER, parse_only=strainer)
+    for el in soup.children:
+        if isinstance(el, Tag):
+            yield el
+
+
+def text_of(card: Tag, selector: str, default: str = "N/A") -> str:
+    el = card.select_one(selector)
+    return el.get_text(strip=True) if el else default
+
+
+def parse_title(title: str) -> Dict[str, str]:
+    """Split a "2020 Ford F-150 XLT SuperCrew" title into its parts."""
+    parts = title.split(None, 3)
+    if len(parts) < 3:
+        raise ValueError(f"unrecognised listing title: {title!r}")
+    return {
+        "year": parts[0],
+        "make": parts[1],
+        "model": parts[2],
+        "trim": parts[3] if len(parts) > 3 else "N/A",
+    }
+
+
+@dataclass(frozen=True)
+class ListingSpec:
+    """Where the fields of one source's listing cards live."""
+
+    source: str
+    base: str
+    card: SoupStrainer
+    title: str
+    price: str
+    mileage: str
+    location: str
+    link: str
+
+
+def parse_listings(html: str, spec: ListingSpec, trim: str | None = None) -> List[Dict[str, Any]]:
+    """Parse the listing cards of one results page into comp dicts.
+
+    Cards missing a title or link are skipped; ``trim`` keeps only listings
+    whose trim contains it (case-insensitive).
+    """
+    trim = trim.lower() if trim else None
+    cars = []
+    for card in iter_cards(html, spec.card):
+        title_el = card.select_one(spec.title)
+        link_el = card.select_one(spec.link)
+        if title_el is None or link_el is None or not link_el.get("href"):
+            continue
+        title = title_el.get_text(strip=True)
+        try:
+            parts = parse_title(title)
+        except ValueError:
+            continue
+        if trim and trim not in parts["trim"].lower():
+            continue
+        cars.append({
+            "source": spec.source,
+            "year_make_model": title,
+            **parts,
+            "mileage": text_of(card, spec.mileage),
+            "price": text_of(card, spec.price).replace("$", "").replace(",", ""),
+            "location": text_of(card, spec.location),
+            "url": spec.base + link_el["href"],
+        })
+    return cars
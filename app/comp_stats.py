@@ -0,0 +1,129 @@
+# app/comp_stats.py
+
+"""NumPy statistics over market comps.
+
+Prices and mileage are parsed once into float arrays (``comp_arrays``), the
+cheapest and dearest ``percent`` of comps are trimmed by rank, and
+``price_stats`` returns the market band plus median, percentiles and a
+least-squares price-vs-mileage line.  ``summarize_comps`` in
+``app.comp_check`` and batch pricing use the same functions; results are
+plain ints/floats so they can be cached and returned as JSON.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+TRIM_PERCENT = 0.1
+PERCENTILES = (10, 25, 75, 90)
+MIN_REGRESSION_POINTS = 3
+
+_NON_NUMERIC = re.compile(r"[^\d.]")
+
+
+def parse_number(value: Any) -> float:
+    """``"$31,500"`` / ``"41,200 mi."`` / ``31500`` -> float; NaN when unparseable."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    digits = _NON_NUMERIC.sub("", str(value or ""))
+    try:
+        return float(digits)
+    except ValueError:
+        return np.nan
+
+
+def comp_arrays(comps: Iterable[Dict[str, Any]], price_key: str = "price",
+                mileage_key: str = "mileage") -> Tuple[np.ndarray, np.ndarray]:
+    """Price and mileage arrays for ``comps`` (NaN where missing)."""
+    comps = list(comps)
+    prices = np.fromiter((parse_number(c.get(price_key)) for c in comps), float, len(comps))
+    mileage = np.fromiter((parse_number(c.get(mileage_key)) for c in comps), float, len(comps))
+    prices[prices <= 0] = np.nan
+    return prices, mileage
+
+
+def trim_mask(prices: np.ndarray, percent: float = TRIM_PERCENT) -> np.ndarray:
+    """Boolean mask keeping priced comps outside the lowest/highest ``percent`` by rank.
+
+    Trimming by rank keeps exactly ``n - 2k`` comps even when several share a
+    price, unlike filtering on a set of surviving values.
+    """
+    valid = np.flatnonzero(~np.isnan(prices))
+    keep = np.zeros(prices.shape, dtype=bool)
+    n = valid.size
+    k = int(n * percent)
+    order = valid[np.argsort(prices[valid], kind="stable")]
+    keep[order[k:n - k]] = True
+    return keep
+
+
+def mileage_regression(prices: np.ndarray, mileage: np.ndarray) -> Dict[str, float] | None:
+    """Fit ``price = intercept + slope * mileage``; None without enough spread."""
+    ok = ~(np.isnan(prices) | np.isnan(mileage))
+    x, y = mileage[ok], prices[ok]
+    if x.size < MIN_REGRESSION_POINTS or np.ptp(x) == 0:
+        return None
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (intercept + slope * x)
+    total = ((y - y.mean()) ** 2).sum()
+    r2 = 1 - (residual ** 2).sum() / total if total else 0.0
+    return {
+        "slope_per_mile": round(float(slope), 4),
+        "intercept": round(float(intercept), 2),
+        "r2": round(float(r2), 4),
+        "points": int(x.size),
+    }
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "market_avg": 0,
+        "market_low": 0,
+        "market_high": 0,
+        "market_median": 0,
+        "percentiles": {f"p{p}": 0 for p in PERCENTILES},
+        "mileage_regression": None,
+    }
+
+
+def price_stats(prices: np.ndarray, mileage: np.ndarray | None = None) -> Dict[str, Any]:
+    """Market band, median, percentiles and mileage regression for already-trimmed arrays."""
+    priced = prices[~np.isnan(prices)]
+    if not priced.size:
+        return empty_stats()
+    pct = np.percentile(priced, PERCENTILES)
+    return {
+        "count": int(priced.size),
+        "market_avg": int(priced.mean()),
+        "market_low": int(priced.min()),
+        "market_high": int(priced.max()),
+        "market_median": int(np.median(priced)),
+        "percentiles": {f"p{p}": int(v) for p, v in zip(PERCENTILES, pct)},
+        "mileage_regression": None if mileage is None else mileage_regression(prices, mileage),
+    }
+
+
+def adjusted_price(stats: Dict[str, Any], mileage: Any) -> int | None:
+    """Market price predicted for ``mileage`` by the regression in ``stats``."""
+    fit = stats.get("mileage_regression")
+    miles = parse_number(mileage)
+    if not fit or np.isnan(miles):
+        return None
+    return int(fit["intercept"] + fit["slope_per_mile"] * miles)
+
+
+def comp_stats(comps: List[Dict[str, Any]], percent: float = TRIM_PERCENT
+               ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Trim outliers from ``comps``; return the survivors and their statistics."""
+    prices, mileage = comp_arrays(comps)
+    keep = trim_mask(prices, percent)
+    kept = [c for c, k in zip(comps, keep) if k]
+    return kept, price_stats(prices[keep], mileage[keep])
+
+
+def batch_comp_stats(comps_by_key: Dict[Any, List[Dict[str, Any]]],
+                     percent: float = TRIM_PERCENT) -> Dict[Any, Dict[str, Any]]:
+    """``comp_stats`` for many vehicles at once, e.g. the whole inventory."""
+    return {key: comp_stats(comps, percent)[1] for key, comps in comps_by_key.items()}
@@ -0,0 +1,51 @@
+# app/daily_metrics.py
+
+"""Month-to-date metrics read from the ``daily_metrics`` rollup table.
+
+The table holds one row per day of floor-traffic and lead counters and is
+maintained by database triggers (``supabase/migrations/*_daily_metrics.sql``),
+so a month costs at most 31 rows no matter how busy the store is.
+"""
+
+from datetime import date
+
+FLOOR_COLUMNS = ("visits", "demos", "worksheets", "offers", "sold")
+LEAD_COLUMNS = ("leads", "engaged_leads", "responded_leads", "response_seconds")
+
+
+def month_bounds(today: date | None = None) -> tuple[date, date]:
+    """First day of ``today``'s month and first day of the next month."""
+    today = today or date.today()
+    start = today.replace(day=1)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def _sum(rows: list[dict], columns: tuple[str, ...]) -> dict:
+    return {c: sum(r.get(c) or 0 for r in rows) for c in columns}
+
+
+def _query(client, columns: tuple[str, ...], today: date | None):
+    start, end = month_bounds(today)
+    return (
+        client.table("daily_metrics")
+        .select(",".join(columns))
+        .gte("day", start.isoformat())
+        .lt("day", end.isoformat())
+    )
+
+
+def month_totals(client, columns: tuple[str, ...], today: date | None = None) -> dict:
+    """Sum ``columns`` over this month's rollup rows using a blocking client."""
+    res = _query(client, columns, today).execute()
+    return _sum(res.data or [], columns)
+
+
+async def month_totals_async(client, columns: tuple[str, ...],
+                             today: date | None = None) -> dict:
+    """Same as ``month_totals`` on the async client."""
+    res = await _query(client, columns, today).execute()
+    return _sum(res.data or [], columns)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime, JSON
+from sqlalchemy import Column, String, Float, DateTime, JSON, Integer, Text, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import declarative_base
 import uuid
@@ -20,4 +20,31 @@ class AIHotness(Base):
     customer_id = Column(PGUUID(as_uuid=True), primary_key=True)
     score = Column(Float, nullable=False)
     breakdown = Column(JSON, nullable=False)
+    # Running per-type signal totals as of computed_at (see app.hotness).
+    totals = Column(JSON, nullable=True)
     computed_at = Column(DateTime, nullable=False)
+
+class QueuedJob(Base):
+    """A unit of background work for ``app.job_queue`` (see ``app.worker``)."""
+    __tablename__ = "job_queue"
+    __table_args__ = (
+        UniqueConstraint("kind", "idempotency_key", name="job_queue_idempotency"),
+        Index("job_queue_runnable", "status", "run_at"),
+    )
+    id = Column(String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    idempotency_key = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    summary = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
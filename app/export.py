@@ -0,0 +1,165 @@
+# app/export.py
+
+"""Streaming NDJSON/CSV exports.
+
+The ``/export`` routes walk a table with the same keyset cursor the list
+endpoints use, one batch at a time on the async client, and write each batch
+to the response as soon as it arrives.  Nothing is validated through pydantic
+and at most one batch is held in memory, however large the table is::
+
+    rows = iter_rows(lambda: async_supabase.table("deals").select(cols))
+    return await export_response(rows, columns, fmt, "deals")
+
+``iter_by_ids`` is the counterpart for an explicit selection of ids (bulk
+actions): the ids are split into URL-safe ``in.(...)`` chunks fetched a few at
+a time, and rows are yielded as each chunk comes back.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+from typing import AsyncIterator, Callable, Iterable
+
+from fastapi import HTTPException, Query
+from fastapi.responses import StreamingResponse
+from postgrest.exceptions import APIError
+
+from app.pagination import Page
+
+logger = logging.getLogger("export")
+
+EXPORT_BATCH_SIZE = int(os.getenv("API_EXPORT_BATCH_SIZE", "1000"))
+# ~150 uuids keep an ``id=in.(...)`` query string under 6 KB, well inside the
+# 8 KB request-line limit of most proxies.
+ID_CHUNK_SIZE = int(os.getenv("API_ID_CHUNK_SIZE", "150"))
+ID_LOOKUP_CONCURRENCY = int(os.getenv("API_ID_LOOKUP_CONCURRENCY", "4"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_format_param(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$",
+                     description="ndjson (default) or csv"),
+) -> str:
+    """FastAPI dependency for the ``format`` query parameter."""
+    return fmt
+
+
+async def iter_rows(build_query: Callable, key: str = "id", desc: bool = False,
+                    batch_size: int | None = None) -> AsyncIterator[dict]:
+    """Yield every row of ``build_query()`` one keyset page at a time.
+
+    ``build_query`` must return a fresh async query (select + filters) on each
+    call; ordering, the cursor filter and the limit are added here.
+    """
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    page = Page(limit=batch_size)
+    while True:
+        res = await page.apply(build_query(), key=key, desc=desc).execute()
+        rows = res.data or []
+        for row in rows[:batch_size]:
+            yield row
+        if len(rows) <= batch_size:
+            return
+        page.cursor = page.cursor_after(rows[batch_size - 1])
+
+
+async def iter_by_ids(build_query: Callable, ids: Iterable[str], key: str = "id",
+                      chunk_size: int | None = None,
+                      concurrency: int | None = None) -> AsyncIterator[dict]:
+    """Yield the rows of ``build_query()`` whose ``key`` is in ``ids``.
+
+    Duplicate ids are looked up once.  Up to ``concurrency`` chunks are in
+    flight at a time and rows come out in completion order, not id order.
+    """
+    chunk_size = chunk_size or ID_CHUNK_SIZE
+    ids = list(dict.fromkeys(ids))
+    semaphore = asyncio.Semaphore(max(1, concurrency or ID_LOOKUP_CONCURRENCY))
+
+    async def fetch(chunk: list[str]) -> list[dict]:
+        async with semaphore:
+            res = await build_query().in_(key, chunk).execute()
+        return res.data or []
+
+    tasks = [asyncio.ensure_future(fetch(ids[i:i + chunk_size]))
+             for i in range(0, len(ids), chunk_size)]
+    try:
+        for next_chunk in asyncio.as_completed(tasks):
+            for row in await next_chunk:
+                yield row
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _encoder(fmt: str, columns: list[str]):
+    if fmt == "ndjson":
+        return lambda row: json.dumps(row, default=str) + "\n"
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def encode(row: dict) -> str:
+        writer.writerow([_csv_value(row.get(c)) for c in columns])
+        line = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return line
+    return encode
+
+
+async def export_response(rows: AsyncIterator[dict], columns: list[str], fmt: str,
+                          filename: str, transform: Callable | None = None,
+                          chunk_rows: int = 500) -> StreamingResponse:
+    """Wrap ``rows`` in a ``StreamingResponse`` of NDJSON or CSV.
+
+    The first batch is fetched before the response starts so a bad filter or
+    an unreachable database still returns a proper 400 instead of an empty
+    200.  Errors after that can only end the stream early; they are logged.
+    """
+    try:
+        first = await anext(rows, None)
+    except APIError as e:
+        logger.error("Export of %s failed: %s", filename, e)
+        raise HTTPException(status_code=400, detail=e.message)
+
+    encode = _encoder(fmt, columns)
+
+    async def body():
+        if fmt == "csv":
+            header = io.StringIO()
+            csv.writer(header).writerow(columns)
+            yield header.getvalue()
+        if first is None:
+            return
+        chunk = [encode(transform(first) if transform else first)]
+        try:
+            async for row in rows:
+                chunk.append(encode(transform(row) if transform else row))
+                if len(chunk) >= chunk_rows:
+                    yield "".join(chunk)
+                    chunk = []
+        except APIError as e:
+            logger.error("Export of %s aborted mid-stream: %s", filename, e)
+        if chunk:
+            yield "".join(chunk)
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,228 @@
+# app/hotness.py
+
+"""Incrementally maintained AI hotness scores.
+
+Every ``ai_hotness`` row keeps the customer's running per-type signal totals
+(``totals``) as of ``computed_at``.  Ingesting a signal adds its value to
+that customer's totals and re-scores them, so reading a score is a
+primary-key lookup instead of a ``GROUP BY`` over ``customer_signals``.
+
+With ``HOTNESS_HALF_LIFE_DAYS`` set, totals decay exponentially: a signal
+counts half as much after one half-life.  Because every type decays at the
+same rate, stored totals are brought forward with one factor on the next
+write, and reads scale the stored breakdown by the factor since
+``computed_at``.  ``0`` (the default) means plain sums.
+
+    python -m app.hotness rebuild      # recompute every score from customer_signals
+
+Run the rebuild once after adding the ``totals`` column, and again after
+changing ``WEIGHTS`` or the half-life.  On Postgres it holds an ``EXCLUSIVE``
+lock on ``ai_hotness`` for its transaction: reads go on, and ingests wait and
+are folded into the rebuilt rows afterwards, so no update is lost.
+"""
+
+import argparse
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db_models import AIHotness, CustomerSignal
+
+logger = logging.getLogger("hotness")
+
+HOTNESS_HALF_LIFE_DAYS = float(os.getenv("HOTNESS_HALF_LIFE_DAYS", "0"))
+REBUILD_CHUNK = 5000
+LOOKUP_CHUNK = 1000
+
+WEIGHTS = {
+    "quote_request": 0.30,
+    "web_visit": 0.10,
+    "service_visit": 0.15,
+    "positive_equity": 0.20,
+    "sentiment_score": 0.25,
+}
+
+
+def decay_factor(since: datetime | None, until: datetime,
+                 half_life_days: float | None = None) -> float:
+    """How much a value recorded at ``since`` still counts at ``until``."""
+    half_life = HOTNESS_HALF_LIFE_DAYS if half_life_days is None else half_life_days
+    if not half_life or since is None or until <= since:
+        return 1.0
+    return 0.5 ** ((until - since).total_seconds() / (half_life * 86400))
+
+
+def score_totals(totals: Dict[str, float], factor: float = 1.0) -> Tuple[float, List[dict]]:
+    """Score (0-100) and per-type breakdown for ``totals`` scaled by ``factor``."""
+    breakdown = []
+    raw_score = 0.0
+    for signal_type, total in totals.items():
+        weight = WEIGHTS.get(signal_type, 0.0)
+        contribution = total * factor * weight
+        breakdown.append({"signal_type": signal_type, "weight": weight,
+                          "contribution": contribution})
+        raw_score += contribution
+    return max(0.0, min(raw_score, 100.0)), breakdown
+
+
+def current(row: AIHotness, now: datetime | None = None) -> Dict[str, Any]:
+    """``row`` as an ``AiHotnessResponse`` body, decayed to ``now``."""
+    now = now or datetime.utcnow()
+    factor = decay_factor(row.computed_at, now)
+    if factor == 1.0 or row.totals is None:
+        return {"customer_id": row.customer_id, "score": row.score,
+                "breakdown": row.breakdown, "computed_at": row.computed_at}
+    score, breakdown = score_totals(row.totals or {}, factor)
+    return {"customer_id": row.customer_id, "score": score,
+            "breakdown": breakdown, "computed_at": now}
+
+
+def _set_totals(row: AIHotness, totals: Dict[str, float], as_of: datetime):
+    row.totals = dict(totals)  # a new dict, so the JSON column is marked dirty
+    row.score, row.breakdown = score_totals(row.totals)
+    row.computed_at = as_of
+
+
+def _insert_missing(db: Session, ids: List[Any], now: datetime):
+    """Create empty rows for ``ids`` that have none, ignoring ones that exist.
+
+    ``ON CONFLICT DO NOTHING`` lets two transactions race to create the same
+    customer's row; the loser then waits on the winner's row lock instead of
+    failing the whole batch with a unique violation.
+    """
+    dialect = {"postgresql": postgresql, "sqlite": sqlite}.get(db.get_bind().dialect.name)
+    if dialect is None:
+        return
+    db.execute(
+        dialect.insert(AIHotness).on_conflict_do_nothing(index_elements=["customer_id"]),
+        [{"customer_id": cid, "score": 0.0, "breakdown": [], "totals": {}, "computed_at": now}
+         for cid in ids],
+    )
+
+
+def apply_signals(db: Session, signals: Iterable[Dict[str, Any]]) -> int:
+    """Fold new ``customer_signals`` rows into their customers' ``ai_hotness``.
+
+    ``signals`` are dicts with ``customer_id``, ``signal_type``,
+    ``signal_value`` and ``created_at``, already written (and flushed) in
+    the caller's transaction.  Missing rows are created first, then affected
+    rows are read (locked on Postgres) in chunks of ``LOOKUP_CHUNK`` ids; the
+    caller commits.  Returns the number of customers updated.
+    """
+    by_customer: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+    for signal in signals:
+        by_customer[signal["customer_id"]].append(signal)
+    ids = sorted(by_customer, key=str)
+    now = datetime.utcnow()
+    existing: Dict[Any, AIHotness] = {}
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[start:start + LOOKUP_CHUNK]
+        _insert_missing(db, chunk, now)
+        for row in db.scalars(select(AIHotness)
+                              .where(AIHotness.customer_id.in_(chunk))
+                              .with_for_update()):
+            existing[row.customer_id] = row
+
+    for customer_id in ids:
+        items = by_customer[customer_id]
+        row = existing.get(customer_id)
+        if row is not None and row.totals is None:
+            # Scored before totals were kept: recount everything on record,
+            # which already includes ``items``.
+            rebuild(db, customer_id=customer_id, commit=False)
+            continue
+        if row is None:
+            row = AIHotness(customer_id=customer_id, totals={}, computed_at=now)
+            db.add(row)
+        as_of = max([row.computed_at, *(s.get("created_at") or now for s in items)])
+        factor = decay_factor(row.computed_at, as_of)
+        totals = {t: v * factor for t, v in row.totals.items()}
+        for s in items:
+            weight = decay_factor(s.get("created_at") or now, as_of)
+            totals[s["signal_type"]] = totals.get(s["signal_type"], 0.0) + s["signal_value"] * weight
+        _set_totals(row, totals, as_of)
+    db.flush()  # so the next call in this transaction finds the new rows
+    return len(ids)
+
+
+def _signal_totals(db: Session, as_of: datetime, customer_id=None):
+    """``(customer_id, signal_type, amount)`` with amounts decayed to ``as_of``."""
+    if not HOTNESS_HALF_LIFE_DAYS:
+        query = (select(CustomerSignal.customer_id, CustomerSignal.signal_type,
+                        func.sum(CustomerSignal.signal_value))
+                 .group_by(CustomerSignal.customer_id, CustomerSignal.signal_type))
+    else:
+        query = select(CustomerSignal.customer_id, CustomerSignal.signal_type,
+                       CustomerSignal.signal_value, CustomerSignal.created_at)
+    if customer_id is not None:
+        query = query.where(CustomerSignal.customer_id == customer_id)
+    for row in db.execute(query.execution_options(yield_per=REBUILD_CHUNK)):
+        amount = float(row[2])
+        if HOTNESS_HALF_LIFE_DAYS:
+            amount *= decay_factor(row[3], as_of)
+        yield row[0], row[1], amount
+
+
+def rebuild(db: Session, customer_id=None, commit: bool = True) -> AIHotness | int | None:
+    """Recompute scores from ``customer_signals`` from scratch.
+
+    For one ``customer_id`` the row is upserted and returned (None if the
+    customer has no signals).  Without one, ``ai_hotness`` is replaced in
+    bulk, ``REBUILD_CHUNK`` rows per insert, and the row count is returned.
+    """
+    if customer_id is None and db.get_bind().dialect.name == "postgresql":
+        # Taken before reading customer_signals: ingests that commit before
+        # this are counted, later ones block until the rebuilt rows exist.
+        db.execute(text("lock table ai_hotness in exclusive mode"))
+    now = datetime.utcnow()
+    totals: Dict[Any, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for cid, signal_type, amount in _signal_totals(db, now, customer_id):
+        totals[cid][signal_type] += amount
+
+    if customer_id is not None:
+        if not totals:
+            return None
+        row = db.get(AIHotness, customer_id) or AIHotness(customer_id=customer_id)
+        _set_totals(row, next(iter(totals.values())), now)
+        db.add(row)
+        if commit:
+            db.commit()
+        return row
+
+    db.execute(delete(AIHotness))
+    batch: List[dict] = []
+    for cid, by_type in totals.items():
+        score, breakdown = score_totals(by_type)
+        batch.append({"customer_id": cid, "score": score, "breakdown": breakdown,
+                      "totals": dict(by_type), "computed_at": now})
+        if len(batch) >= REBUILD_CHUNK:
+            db.execute(insert(AIHotness), batch)
+            batch = []
+    if batch:
+        db.execute(insert(AIHotness), batch)
+    if commit:
+        db.commit()
+    return len(totals)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain AI hotness scores.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from app.db import SessionLocal
+
+    with SessionLocal() as db:
+        count = rebuild(db)
+    logger.info("Rebuilt AI hotness for %s customers", count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# app/http_cache.py
+
+"""Disk-backed cache for third-party HTTP lookups (NHTSA vPIC, comp sites).
+
+Successful ``GET`` responses are stored in a SQLite file keyed by full URL,
+with a TTL chosen per host (``HOST_TTLS``; VIN decodes never change, comp
+result pages go stale within hours).  The cache plugs into httpx as a
+transport, so callers keep using an ordinary client::
+
+    client = httpx.Client(transport=CachingTransport(httpx.HTTPTransport()))
+    client.get("https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVin/...")
+
+``AsyncCachingTransport`` does the same for ``httpx.AsyncClient``.  Because
+the file is shared, entries survive restarts and are visible to every worker
+process.  It lives in the system temp dir by default (the app directory is
+read-only on serverless hosts); if the file can't be opened the cache turns
+itself off.  Set ``HTTP_CACHE_PATH`` to an empty string to disable it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger("http_cache")
+
+HTTP_CACHE_PATH = os.getenv(
+    "HTTP_CACHE_PATH", os.path.join(tempfile.gettempdir(), "aiventa_http_cache.sqlite3")
+)
+HTTP_CACHE_DEFAULT_TTL = float(os.getenv("HTTP_CACHE_DEFAULT_TTL", "0"))
+COMP_PAGE_TTL = float(os.getenv("HTTP_CACHE_COMP_TTL", "3600"))
+
+HOST_TTLS = {
+    "vpic.nhtsa.dot.gov": 365 * 86400,
+    "www.cars.com": COMP_PAGE_TTL,
+    "www.cargurus.com": COMP_PAGE_TTL,
+    "www.autotrader.com": COMP_PAGE_TTL,
+}
+
+# Stored bodies are already decoded, so these no longer describe them.
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class HTTPCache:
+    """SQLite table of ``url -> (status, headers, body, expires)``.
+
+    A host with no entry in ``ttls`` (and ``default_ttl`` 0) is never cached.
+    """
+
+    def __init__(self, path: str | None = HTTP_CACHE_PATH, ttls: dict | None = None,
+                 default_ttl: float = HTTP_CACHE_DEFAULT_TTL):
+        self.path = path or None
+        self.ttls = dict(HOST_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def _conn(self) -> sqlite3.Connection | None:
+        """The open database, or None when the cache is (or just got) disabled."""
+        if self.path is None:
+            return None
+        if self._db is None:
+            try:
+                db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                db.execute("pragma journal_mode=wal")
+                db.execute(
+                    "create table if not exists responses ("
+                    " url text primary key, status integer, headers text,"
+                    " body blob, expires real)"
+                )
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("HTTP cache disabled, cannot open %s: %s", self.path, e)
+                self.path = None
+                return None
+            self._db = db
+        return self._db
+
+    def ttl_for(self, url: str) -> float:
+        return self.ttls.get(urlsplit(str(url)).hostname or "", self.default_ttl)
+
+    def get(self, url: str) -> tuple[int, dict, bytes] | None:
+        """Fresh ``(status, headers, body)`` for ``url``, or None."""
+        if self.path is None or self.ttl_for(url) <= 0:
+            return None
+        try:
+            with self._lock:
+                db = self._conn()
+                row = db and db.execute(
+                    "select status, headers, body, expires from responses where url = ?",
+                    (str(url),),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("HTTP cache read failed: %s", e)
+            return None
+        if row is None or row[3] < time.time():
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def __contains__(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    def set(self, url: str, status: int, headers: dict, body: bytes):
+        ttl = self.ttl_for(url)
+        if self.path is None or ttl <= 0:
+            return
+        try:
+            with self._lock:
+                db = self._conn()
+                if db is not None:
+                    db.execute(
+                        "insert or replace into responses values (?, ?, ?, ?, ?)",
+                        (str(url), status, json.dumps(headers), body, time.time() + ttl),
+                    )
+        except sqlite3.Error as e:
+            logger.warning("HTTP cache write failed: %s", e)
+
+    def invalidate(self, url: str | None = None):
+        """Forget ``url`` (e.g. a captcha page served with 200), or everything."""
+        if self.path is None:
+            return
+        try:
+            with self._lock:
+                db = self._conn()
+                if db is None:
+                    return
+                if url is None:
+                    db.execute("delete from responses")
+                else:
+                    db.execute("delete from responses where url = ?", (str(url),))
+        except sqlite3.Error as e:
+            logger.warning("HTTP cache invalidate failed: %s", e)
+
+    def purge_expired(self) -> int:
+        if self.path is None:
+            return 0
+        try:
+            with self._lock:
+                db = self._conn()
+                if db is None:
+                    return 0
+                return db.execute(
+                    "delete from responses where expires < ?", (time.time(),)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning("HTTP cache purge failed: %s", e)
+            return 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # -- httpx glue -------------------------------------------------------
+
+    def _hit(self, request: httpx.Request) -> httpx.Response | None:
+        if request.method != "GET":
+            return None
+        cached = self.get(str(request.url))
+        if cached is None:
+            return None
+        status, headers, body = cached
+        return httpx.Response(status, headers={**headers, "x-cache": "hit"},
+                              content=body, request=request)
+
+    def _store(self, request: httpx.Request, response: httpx.Response):
+        if request.method == "GET" and response.status_code == 200:
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS}
+            self.set(str(request.url), response.status_code, headers, response.content)
+
+
+class CachingTransport(httpx.BaseTransport):
+    """Sync httpx transport answering from ``cache`` before calling ``inner``."""
+
+    def __init__(self, inner: httpx.BaseTransport, cache: "HTTPCache | None" = None):
+        self.inner = inner
+        self.cache = cache if cache is not None else http_cache
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        hit = self.cache._hit(request)
+        if hit is not None:
+            return hit
+        response = self.inner.handle_request(request)
+        if request.method == "GET" and response.status_code == 200:
+            response.read()
+            self.cache._store(request, response)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncCachingTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ``CachingTransport``."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, cache: "HTTPCache | None" = None):
+        self.inner = inner
+        self.cache = cache if cache is not None else http_cache
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # SQLite reads and writes block; keep them off the event loop.
+        hit = await asyncio.to_thread(self.cache._hit, request)
+        if hit is not None:
+            return hit
+        response = await self.inner.handle_async_request(request)
+        if request.method == "GET" and response.status_code == 200:
+            await response.aread()
+            await asyncio.to_thread(self.cache._store, request, response)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+http_cache = HTTPCache()
@@ -0,0 +1,149 @@
+# app/inventory_aging.py
+
+"""Inventory aging snapshot (new/used buckets, average days, turn rate).
+
+Instead of re-reading the whole inventory view and re-bucketing it on every
+dashboard load, ``AgingSnapshot`` subscribes to the in-memory inventory index
+and keeps, per vehicle type, the count of vehicles and a histogram of the day
+each one arrived on the lot.  "Days in stock" for any day is then
+``today - arrival``, so:
+
+* inserts, updates and deletes adjust the counters in O(1);
+* rolling forward to a new day needs no reload, only re-bucketing the
+  histogram (one entry per distinct arrival date, not per vehicle);
+* the summary is cached until the next change or the next calendar day.
+"""
+
+import threading
+from collections import Counter
+from datetime import date
+
+DAYS_FIELDS = ("Days In Stock", "days_in_stock", "days_in_stock_dup", "DaysInStock")
+BUCKETS = ("0-30", "31-45", "46-60", "61-90", "90+")
+TYPES = ("new", "used")
+
+
+def bucket_days(days):
+    if days is None:
+        return None
+    if days <= 30:
+        return "0-30"
+    elif days <= 45:
+        return "31-45"
+    elif days <= 60:
+        return "46-60"
+    elif days <= 90:
+        return "61-90"
+    else:
+        return "90+"
+
+
+def days_in_stock(rec: dict) -> int | None:
+    for f in DAYS_FIELDS:
+        if rec.get(f):
+            try:
+                return int(rec[f])
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def empty_summary() -> dict:
+    return {
+        "total": 0,
+        "avgDays": 0,
+        "turnRate": 0,
+        "buckets": {b: 0 for b in BUCKETS},
+    }
+
+
+class _TypeStats:
+    __slots__ = ("total", "arrivals", "arrival_sum")
+
+    def __init__(self):
+        self.total = 0
+        self.arrivals: Counter = Counter()  # arrival ordinal -> vehicles
+        self.arrival_sum = 0
+
+    def add(self, arrival: int | None, sign: int = 1):
+        self.total += sign
+        if arrival is not None:
+            self.arrivals[arrival] += sign
+            if not self.arrivals[arrival]:
+                del self.arrivals[arrival]
+            self.arrival_sum += sign * arrival
+
+    def summary(self, today: int) -> dict:
+        out = empty_summary()
+        out["total"] = self.total
+        dated = sum(self.arrivals.values())
+        if not dated:
+            return out
+        total_days = dated * today - self.arrival_sum
+        for arrival, n in self.arrivals.items():
+            out["buckets"][bucket_days(today - arrival)] += n
+        out["avgDays"] = round(total_days / dated, 1)
+        out["turnRate"] = round(self.total / (total_days or 1), 2)
+        return out
+
+
+class AgingSnapshot:
+    """Incrementally maintained aging summary; see module docstring."""
+
+    def __init__(self, index=None, today=date.today):
+        self._today = today
+        self._lock = threading.Lock()
+        self._stats = {t: _TypeStats() for t in TYPES}
+        self._vehicles: dict = {}  # id -> (type, arrival ordinal, days as read)
+        self._cache: tuple | None = None
+        self.index = index
+        if index is not None:
+            index.add_listener(self)
+
+    def _entry(self, row: dict, previous=None):
+        kind = str(row.get("type", "")).lower()
+        if kind not in self._stats:
+            return None
+        days = days_in_stock(row)
+        if days is None:
+            return (kind, None, None)
+        if previous is not None and previous[2] == days:
+            # Same value we saw before, so the vehicle hasn't moved; keep
+            # the arrival date it was first measured against.
+            return (kind, previous[1], days)
+        return (kind, self._today().toordinal() - days, days)
+
+    def _apply(self, key, entry, sign: int):
+        if entry is None:
+            return
+        self._stats[entry[0]].add(entry[1], sign)
+        if sign > 0:
+            self._vehicles[key] = entry
+
+    def reset(self, rows: list[dict]):
+        with self._lock:
+            self._stats = {t: _TypeStats() for t in TYPES}
+            self._vehicles = {}
+            for i, row in enumerate(rows):
+                key = row.get("id", i)
+                self._apply(key, self._entry(row), 1)
+            self._cache = None
+
+    def update(self, old: dict | None, new: dict | None):
+        key = (new or old or {}).get("id")
+        with self._lock:
+            previous = self._vehicles.pop(key, None)
+            self._apply(key, previous, -1)
+            if new is not None:
+                self._apply(key, self._entry(new, previous), 1)
+            self._cache = None
+
+    def summary(self) -> dict:
+        """``{"new": {...}, "used": {...}}`` as of today."""
+        if self.index is not None:
+            self.index.ensure_fresh()
+        today = self._today().toordinal()
+        with self._lock:
+            if self._cache is None or self._cache[0] != today:
+                self._cache = (today, {t: s.summary(today) for t, s in self._stats.items()})
+            return self._cache[1]
@@ -0,0 +1,393 @@
+# app/inventory_index.py
+
+"""In-memory inventory index for the filter panel.
+
+The lot is a few thousand vehicles and changes a few times a day, while the
+filter panel queries on every keystroke.  ``InventoryIndex`` keeps the whole
+``inventory_with_days_in_stock`` view in memory with:
+
+* one bitmap (a Python ``int``, bit *n* = slot *n*) per distinct value of each
+  facet column (make, model, type, fuel type, drivetrain, exterior color);
+* a sorted ``(value, slot)`` array per numeric column (year, price, mileage)
+  so range filters are two ``bisect`` calls.
+
+Slots are assigned in ``id`` order, so walking the set bits of a result
+bitmap yields rows in the same order as the keyset-paginated list endpoint.
+The index reloads after ``INVENTORY_INDEX_TTL`` seconds and is patched in
+place by the inventory router's create/update/delete handlers, which re-read
+the written row from the view so derived columns ("Days In Stock") are kept.
+Writes made through another API worker (or straight to the table) bump the
+``inventory_version`` row from a trigger; the shared index compares that
+watermark at most every ``INVENTORY_INDEX_CHECK_SECONDS`` and reloads when it
+moved.  Derived caches subscribe with ``add_listener`` to follow all of it.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+
+from app.db import supabase
+from app.models import InventoryItem
+from app.pagination import Page
+from app.projection import select_columns
+
+logger = logging.getLogger("inventory_index")
+
+INVENTORY_INDEX_TTL = float(os.getenv("INVENTORY_INDEX_TTL", "300"))
+INVENTORY_INDEX_CHECK_SECONDS = float(os.getenv("INVENTORY_INDEX_CHECK_SECONDS", "5"))
+LOAD_BATCH_SIZE = 1000
+
+# Facets matched like ``ilike %term%`` and those matched exactly.
+SUBSTRING_FACETS = ("make", "model", "exterior_color")
+EXACT_FACETS = ("type", "fuel_type", "drive_type")
+FACETS = SUBSTRING_FACETS + EXACT_FACETS
+RANGES = {"year": int, "sellingprice": float, "mileage": int}
+
+
+def index_columns() -> str:
+    """Select list for indexed rows: the response model plus every filtered column.
+
+    Filters may use view columns the response model doesn't expose (e.g.
+    ``fuel_type``); they must still be loaded or the filter never matches.
+    """
+    return select_columns(InventoryItem, required=("id", *FACETS, *RANGES))
+
+
+def load_inventory_rows() -> list[dict]:
+    """Read the full inventory view in keyset batches."""
+    columns = index_columns()
+    rows: list[dict] = []
+    page = Page(limit=LOAD_BATCH_SIZE)
+    while True:
+        res = page.apply(
+            supabase.table("inventory_with_days_in_stock").select(columns)
+        ).execute()
+        batch = res.data or []
+        rows.extend(batch[:LOAD_BATCH_SIZE])
+        if len(batch) <= LOAD_BATCH_SIZE:
+            return rows
+        page.cursor = page.cursor_after(batch[LOAD_BATCH_SIZE - 1])
+
+
+def load_inventory_row(item_id) -> dict | None:
+    """Read one vehicle from the view (None if it no longer exists)."""
+    res = (
+        supabase.table("inventory_with_days_in_stock")
+        .select(index_columns())
+        .eq("id", item_id)
+        .maybe_single()
+        .execute()
+    )
+    return res.data if res else None
+
+
+def load_inventory_version():
+    """The ``inventory_version`` watermark, bumped on every inventory write."""
+    res = supabase.table("inventory_version").select("version").eq("id", 1).maybe_single().execute()
+    return res.data["version"] if res and res.data else None
+
+
+def _id_key(value):
+    # Numeric ids sort numerically, like the database does.
+    try:
+        return (0, int(value), "")
+    except (TypeError, ValueError):
+        return (1, 0, str(value))
+
+
+def _norm(value) -> str | None:
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    return text or None
+
+
+def _number(value, cast):
+    if value is None or value == "":
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _bits(bitmap: int):
+    """Yield the set bit positions of ``bitmap`` in ascending order."""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+@dataclass
+class SearchResult:
+    rows: list[dict]
+    total: int
+    facets: dict[str, dict[str, int]] = field(default_factory=dict)
+
+
+class InventoryIndex:
+    """Bitmap/sorted-array index over the inventory view.
+
+    ``loader`` returns every row; it is called on first use and again once the
+    snapshot is older than ``ttl`` seconds, or as soon as ``version_loader``
+    (polled every ``check_interval`` seconds) returns a different watermark.
+    ``row_loader(id)`` re-reads one row for ``refresh``.  All methods are
+    thread-safe.
+    """
+
+    def __init__(self, loader=load_inventory_rows, ttl: float = INVENTORY_INDEX_TTL,
+                 version_loader=None, row_loader=None,
+                 check_interval: float = INVENTORY_INDEX_CHECK_SECONDS):
+        self._loader = loader
+        self._version_loader = version_loader
+        self._row_loader = row_loader
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._loaded_at: float | None = None
+        self._checked_at: float | None = None
+        self._version = None
+        self._listeners: list = []
+        self._reset()
+
+    def add_listener(self, listener):
+        """Subscribe ``listener`` to index changes.
+
+        ``listener.reset(rows)`` is called after every full load and
+        ``listener.update(old, new)`` after each upsert/remove (``old`` is
+        ``None`` for inserts, ``new`` is ``None`` for deletes).  Both run while
+        the index lock is held.
+        """
+        self._listeners.append(listener)
+
+    # ----- building -----
+
+    def _reset(self):
+        self._rows: list[dict | None] = []
+        self._keys: list[tuple] = []
+        self._slot_by_id: dict = {}
+        self._live = 0
+        self._facets: dict[str, dict[str, int]] = {f: {} for f in FACETS}
+        self._labels: dict[str, dict[str, str]] = {f: {} for f in FACETS}
+        self._ranges: dict[str, list[tuple]] = {f: [] for f in RANGES}
+
+    def _build(self, rows: list[dict]):
+        self._reset()
+        for row in sorted(rows, key=lambda r: _id_key(r.get("id"))):
+            self._append(row)
+
+    def _append(self, row: dict):
+        slot = len(self._rows)
+        self._rows.append(row)
+        self._keys.append(_id_key(row.get("id")))
+        self._slot_by_id[str(row.get("id"))] = slot
+        self._index(slot, row)
+
+    def _index(self, slot: int, row: dict):
+        bit = 1 << slot
+        self._live |= bit
+        for f in FACETS:
+            value = _norm(row.get(f))
+            if value is not None:
+                self._facets[f][value] = self._facets[f].get(value, 0) | bit
+                self._labels[f].setdefault(value, str(row.get(f)).strip())
+        for f, cast in RANGES.items():
+            value = _number(row.get(f), cast)
+            if value is not None:
+                insort(self._ranges[f], (value, slot))
+
+    def _unindex(self, slot: int, row: dict):
+        bit = 1 << slot
+        self._live &= ~bit
+        for f in FACETS:
+            value = _norm(row.get(f))
+            if value is None or value not in self._facets[f]:
+                continue
+            remaining = self._facets[f][value] & ~bit
+            if remaining:
+                self._facets[f][value] = remaining
+            else:
+                del self._facets[f][value]
+                self._labels[f].pop(value, None)
+        for f, cast in RANGES.items():
+            value = _number(row.get(f), cast)
+            if value is None:
+                continue
+            arr = self._ranges[f]
+            i = bisect_left(arr, (value, slot))
+            if i < len(arr) and arr[i] == (value, slot):
+                del arr[i]
+
+    def _read_version(self):
+        try:
+            return self._version_loader()
+        except Exception as e:
+            logger.warning("Inventory version check failed, relying on the TTL: %s", e)
+            return self._version
+
+    def load(self):
+        """Replace the index contents with a fresh read from the loader."""
+        # Read the watermark first: a write landing during the load bumps it
+        # again and triggers another reload on the next check.
+        version = self._read_version() if self._version_loader else None
+        rows = self._loader()
+        with self._lock:
+            self._build(rows)
+            self._loaded_at = self._checked_at = time.monotonic()
+            self._version = version
+            for listener in self._listeners:
+                listener.reset(rows)
+        logger.info("Inventory index loaded with %d vehicles", len(rows))
+
+    def ensure_fresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded_at is None or now - self._loaded_at > self.ttl:
+                self.load()
+            elif self._version_loader and now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                if self._read_version() != self._version:
+                    self.load()
+
+    def invalidate(self):
+        """Force a reload on next access."""
+        with self._lock:
+            self._loaded_at = None
+
+    # ----- incremental maintenance -----
+
+    def upsert(self, row: dict):
+        """Insert or replace one vehicle; ``row`` may be a partial update."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            key = str(row.get("id"))
+            slot = self._slot_by_id.get(key)
+            old = None
+            if slot is not None and self._rows[slot] is not None:
+                old = self._rows[slot]
+                self._unindex(slot, old)
+                row = {**old, **row}
+                self._rows[slot] = row
+                self._index(slot, row)
+            elif not self._keys or _id_key(row.get("id")) > self._keys[-1]:
+                self._append(row)
+            else:
+                # Out-of-order id: rebuild so slots stay in id order.
+                self._build([r for r in self._rows if r is not None] + [row])
+            for listener in self._listeners:
+                listener.update(old, row)
+
+    def refresh(self, item_id):
+        """Re-read vehicle ``item_id`` with ``row_loader`` and patch it in.
+
+        Without a ``row_loader``, or if the read fails, the index is
+        invalidated instead so the next search reloads it.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return
+        if self._row_loader is None:
+            self.invalidate()
+            return
+        try:
+            row = self._row_loader(item_id)
+        except Exception as e:
+            logger.warning("Could not re-read inventory item %s, reloading: %s", item_id, e)
+            self.invalidate()
+            return
+        if row is None:
+            self.remove(item_id)
+        else:
+            self.upsert(row)
+
+    def remove(self, item_id):
+        with self._lock:
+            slot = self._slot_by_id.pop(str(item_id), None)
+            if slot is None or self._rows[slot] is None:
+                return
+            old = self._rows[slot]
+            self._unindex(slot, old)
+            self._rows[slot] = None
+            for listener in self._listeners:
+                listener.update(old, None)
+
+    # ----- querying -----
+
+    def _range_bitmap(self, f: str, lo, hi) -> int:
+        arr = self._ranges[f]
+        start = 0 if lo is None else bisect_left(arr, (lo, -1))
+        end = len(arr) if hi is None else bisect_right(arr, (hi, len(self._rows)))
+        bitmap = 0
+        for _, slot in arr[start:end]:
+            bitmap |= 1 << slot
+        return bitmap
+
+    def _term_bitmap(self, f: str, term: str) -> int:
+        needle = _norm(term) or ""
+        if f in EXACT_FACETS:
+            return self._facets[f].get(needle, 0)
+        bitmap = 0
+        for value, bits in self._facets[f].items():
+            if needle in value:
+                bitmap |= bits
+        return bitmap
+
+    def search(self, terms: dict | None = None, ranges: dict | None = None,
+               after=None, limit: int | None = None,
+               with_facets: bool = False) -> SearchResult:
+        """Filter the index.
+
+        ``terms`` maps facet columns to a search term (substring match for
+        make/model/color, exact for the rest, both case-insensitive);
+        ``ranges`` maps numeric columns to inclusive ``(min, max)`` bounds.
+        ``after``/``limit`` page by id.  Facet counts are disjunctive: each
+        facet is counted against every filter except its own.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            filters: dict[str, int] = {}
+            for f, term in (terms or {}).items():
+                if term:
+                    filters[f] = self._term_bitmap(f, term)
+            for f, (lo, hi) in (ranges or {}).items():
+                if lo is not None or hi is not None:
+                    filters[f] = self._range_bitmap(f, lo, hi)
+
+            matched = self._live
+            for bitmap in filters.values():
+                matched &= bitmap
+
+            visible = matched
+            if after is not None:
+                start = bisect_right(self._keys, _id_key(after))
+                visible = (visible >> start) << start
+            rows = []
+            for slot in _bits(visible):
+                if limit is not None and len(rows) >= limit:
+                    break
+                rows.append(self._rows[slot])
+
+            facets = {}
+            if with_facets:
+                for f in FACETS:
+                    base = self._live
+                    for other, bitmap in filters.items():
+                        if other != f:
+                            base &= bitmap
+                    counts = {}
+                    for value, bits in self._facets[f].items():
+                        n = (bits & base).bit_count()
+                        if n:
+                            counts[self._labels[f][value]] = n
+                    facets[f] = dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+            return SearchResult(rows=rows, total=matched.bit_count(), facets=facets)
+
+
+inventory_index = InventoryIndex(version_loader=load_inventory_version,
+                                 row_loader=load_inventory_row)
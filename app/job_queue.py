@@ -0,0 +1,366 @@
+# app/job_queue.py
+
+"""Durable background jobs stored in the ``job_queue`` table.
+
+``app.jobs`` runs work as a task inside the API process; this queue hands it
+to separate worker processes (``python -m app.worker``) instead, so a request
+only pays for one insert and the work survives restarts and scales with the
+number of workers.  Handlers are registered per kind and receive the same
+``Job`` object as in-process jobs, so one function serves both::
+
+    @job_queue.task("bulk-text", max_attempts=1)
+    async def run_bulk_text(job, ids, message): ...
+
+    row = job_queue.enqueue("bulk-text", {"ids": ids, "message": msg},
+                            idempotency_key=request_key)
+
+A worker claims a due row by moving it to ``running`` with a lease
+(``JOB_LEASE_SECONDS``) that it renews every ``JOB_HEARTBEAT_SECONDS`` while
+the handler runs; if a renewal finds the lease taken over, the handler is
+cancelled and its result dropped.  Sync handlers run in a thread so they
+don't stall the heartbeats of other jobs (a thread can't be cancelled, so a
+sync handler that lost its lease runs to the end and is ignored).
+A failed run is retried after ``JOB_RETRY_BACKOFF * 2**(attempt-1)`` seconds
+until ``max_attempts`` is reached; a row whose lease expired (the worker
+died) is picked up again by another worker.  Enqueueing twice with the same
+``(kind, idempotency_key)`` returns the first job.
+
+Set ``JOB_QUEUE_ENABLED=1`` once workers are deployed; until then routers
+keep using the in-process registry.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.db_models import QueuedJob
+from app.jobs import DONE, FAILED, PENDING, RUNNING, Job
+
+logger = logging.getLogger("job_queue")
+
+JOB_QUEUE_ENABLED = os.getenv("JOB_QUEUE_ENABLED", "").lower() in ("1", "true", "yes")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "5"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "30"))
+JOB_CLAIM_CANDIDATES = 10
+
+# ``run`` result when another worker took the job over before it finished.
+LEASE_LOST = "lease_lost"
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() + "Z" if value else None
+
+
+def _jsonable(value: Any) -> Any:
+    """Round-trip through JSON so numpy scalars, dates etc. can be stored."""
+    def default(obj):
+        return obj.item() if hasattr(obj, "item") else str(obj)
+    return json.loads(json.dumps(value, default=default))
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    kind: str
+    fn: Callable[..., Any]
+    max_attempts: int
+
+
+def to_job(row: QueuedJob) -> Job:
+    """The row as an ``app.jobs.Job`` (what handlers and status routes use)."""
+    return Job(
+        kind=row.kind,
+        id=row.id,
+        status=row.status,
+        total=row.total or 0,
+        done=row.done or 0,
+        summary=dict(row.summary or {}),
+        result=row.result,
+        error=row.error,
+        created_at=_iso(row.created_at),
+        finished_at=_iso(row.finished_at),
+    )
+
+
+def job_dict(row: QueuedJob) -> Dict[str, Any]:
+    return {
+        **to_job(row).to_dict(),
+        "attempts": row.attempts,
+        "max_attempts": row.max_attempts,
+        "run_at": _iso(row.run_at),
+        "status_url": f"/api/jobs/{row.id}",
+    }
+
+
+class JobQueue:
+    def __init__(self, session_factory: Callable | None = None,
+                 lease_seconds: float | None = None, retry_backoff: float | None = None):
+        self._session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+        self.tasks: Dict[str, TaskSpec] = {}
+
+    # -- plumbing ---------------------------------------------------------
+
+    def session(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        from app import db  # resolved per call so tests can patch SessionLocal
+        return db.SessionLocal()
+
+    def _lease(self) -> timedelta:
+        return timedelta(seconds=self.lease_seconds if self.lease_seconds is not None
+                         else JOB_LEASE_SECONDS)
+
+    def _backoff(self, attempt: int) -> timedelta:
+        base = self.retry_backoff if self.retry_backoff is not None else JOB_RETRY_BACKOFF
+        return timedelta(seconds=base * 2 ** max(0, attempt - 1))
+
+    def task(self, kind: str, max_attempts: int = 3):
+        """Register ``fn(job, **payload)`` (sync or async) as the handler for ``kind``."""
+        def register(fn):
+            self.tasks[kind] = TaskSpec(kind, fn, max_attempts)
+            return fn
+        return register
+
+    # -- producer side ----------------------------------------------------
+
+    def enqueue(self, kind: str, payload: Dict[str, Any] | None = None,
+                idempotency_key: str | None = None, max_attempts: int | None = None,
+                delay: float = 0) -> Dict[str, Any]:
+        """Insert a pending job (or return the existing one for ``idempotency_key``)."""
+        spec = self.tasks.get(kind)
+        if spec is None:
+            raise KeyError(f"No handler registered for job kind {kind!r}")
+        with self.session() as db:
+            if idempotency_key:
+                existing = self._by_key(db, kind, idempotency_key)
+                if existing is not None:
+                    return job_dict(existing)
+            row = QueuedJob(
+                kind=kind,
+                payload=_jsonable(payload or {}),
+                idempotency_key=idempotency_key,
+                status=PENDING,
+                attempts=0,
+                max_attempts=max_attempts or spec.max_attempts,
+                run_at=_utcnow() + timedelta(seconds=delay),
+                created_at=_utcnow(),
+            )
+            db.add(row)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Lost a race with another request carrying the same key.
+                db.rollback()
+                return job_dict(self._by_key(db, kind, idempotency_key))
+            return job_dict(row)
+
+    @staticmethod
+    def _by_key(db, kind: str, key: str) -> QueuedJob | None:
+        return db.scalars(select(QueuedJob).where(
+            QueuedJob.kind == kind, QueuedJob.idempotency_key == key,
+        )).first()
+
+    def get(self, job_id: str, kind: str | None = None) -> Dict[str, Any] | None:
+        with self.session() as db:
+            row = db.get(QueuedJob, job_id)
+            if row is None or (kind is not None and row.kind != kind):
+                return None
+            body = job_dict(row)
+            body["result"] = row.result
+            return body
+
+    def get_job(self, job_id: str, kind: str | None = None) -> Job | None:
+        with self.session() as db:
+            row = db.get(QueuedJob, job_id)
+            if row is None or (kind is not None and row.kind != kind):
+                return None
+            return to_job(row)
+
+    def recent(self, kind: str | None = None, status: str | None = None,
+               limit: int = 50) -> List[Dict[str, Any]]:
+        query = select(QueuedJob).order_by(QueuedJob.created_at.desc()).limit(limit)
+        if kind:
+            query = query.where(QueuedJob.kind == kind)
+        if status:
+            query = query.where(QueuedJob.status == status)
+        with self.session() as db:
+            return [job_dict(row) for row in db.scalars(query)]
+
+    # -- worker side ------------------------------------------------------
+
+    def _runnable(self, now: datetime):
+        return or_(
+            and_(QueuedJob.status == PENDING, QueuedJob.run_at <= now),
+            and_(QueuedJob.status == RUNNING, QueuedJob.locked_until < now),
+        )
+
+    def claim(self, worker_id: str, kinds: Iterable[str] | None = None) -> QueuedJob | None:
+        """Lease the next due job to ``worker_id``; None when nothing is due.
+
+        Candidates are re-checked in a conditional ``UPDATE``, so two workers
+        can never claim the same row (Postgres also skips locked rows).
+        """
+        kinds = list(kinds or self.tasks)
+        now = _utcnow()
+        with self.session() as db:
+            self._fail_exhausted(db, now)
+            query = (select(QueuedJob.id)
+                     .where(self._runnable(now), QueuedJob.kind.in_(kinds))
+                     .order_by(QueuedJob.run_at)
+                     .limit(JOB_CLAIM_CANDIDATES))
+            if db.get_bind().dialect.name == "postgresql":
+                query = query.with_for_update(skip_locked=True)
+            for job_id in db.scalars(query).all():
+                claimed = db.execute(
+                    update(QueuedJob)
+                    .where(QueuedJob.id == job_id, self._runnable(now))
+                    .values(status=RUNNING, locked_by=worker_id,
+                            locked_until=now + self._lease(),
+                            attempts=QueuedJob.attempts + 1, error=None)
+                ).rowcount
+                if claimed:
+                    db.commit()
+                    row = db.get(QueuedJob, job_id)
+                    db.expunge(row)
+                    return row
+            db.commit()
+        return None
+
+    def _fail_exhausted(self, db, now: datetime):
+        """Fail jobs whose worker died on their last allowed attempt."""
+        db.execute(
+            update(QueuedJob)
+            .where(QueuedJob.status == RUNNING, QueuedJob.locked_until < now,
+                   QueuedJob.attempts >= QueuedJob.max_attempts)
+            .values(status=FAILED, error="Worker lease expired", finished_at=now,
+                    locked_by=None, locked_until=None)
+        )
+
+    def _save(self, row: QueuedJob, worker_id: str, **values) -> bool:
+        """Update ``row`` if ``worker_id`` still holds it; False if the lease was lost."""
+        with self.session() as db:
+            updated = db.execute(
+                update(QueuedJob)
+                .where(QueuedJob.id == row.id, QueuedJob.locked_by == worker_id,
+                       QueuedJob.status == RUNNING)
+                .values(**values)
+            ).rowcount
+            db.commit()
+        return bool(updated)
+
+    def heartbeat(self, row: QueuedJob, job: Job, worker_id: str) -> bool:
+        return self._save(row, worker_id, total=job.total, done=job.done,
+                          summary=_jsonable(job.summary),
+                          locked_until=_utcnow() + self._lease())
+
+    def complete(self, row: QueuedJob, job: Job, worker_id: str, result: Any) -> bool:
+        return self._save(row, worker_id, status=DONE, total=job.total, done=job.done,
+                          summary=_jsonable(job.summary), result=_jsonable(result),
+                          finished_at=_utcnow(), locked_by=None, locked_until=None)
+
+    def fail(self, row: QueuedJob, job: Job, worker_id: str, error: str) -> bool:
+        """Schedule a retry with backoff, or fail for good after ``max_attempts``."""
+        values = dict(total=job.total, done=job.done, summary=_jsonable(job.summary),
+                      error=error, locked_by=None, locked_until=None)
+        if row.attempts < row.max_attempts:
+            values.update(status=PENDING, run_at=_utcnow() + self._backoff(row.attempts))
+        else:
+            values.update(status=FAILED, finished_at=_utcnow())
+        return self._save(row, worker_id, **values)
+
+    async def run(self, row: QueuedJob, worker_id: str) -> str:
+        """Run a claimed job to completion (or failure); return its new status."""
+        spec = self.tasks.get(row.kind)
+        job = to_job(row)
+        job.status = RUNNING
+        if spec is None:
+            await asyncio.to_thread(self.fail, row, job, worker_id,
+                                    f"No handler registered for job kind {row.kind!r}")
+            return FAILED
+
+        async def call():
+            payload = row.payload or {}
+            if inspect.iscoroutinefunction(spec.fn):
+                result = spec.fn(job, **payload)
+            else:
+                result = await asyncio.to_thread(spec.fn, job, **payload)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        handler = asyncio.create_task(call())
+        lease_lost = False
+
+        async def heartbeat():
+            nonlocal lease_lost
+            interval = min(JOB_HEARTBEAT_SECONDS, self._lease().total_seconds() / 3)
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    held = await asyncio.to_thread(self.heartbeat, row, job, worker_id)
+                except Exception:
+                    # Keep trying: the lease is only lost once another worker claims it.
+                    logger.exception("Heartbeat for job %s (%s) failed", row.id, row.kind)
+                    continue
+                if not held:
+                    lease_lost = True
+                    logger.warning("Job %s (%s) lost its lease; cancelling it",
+                                   row.id, row.kind)
+                    handler.cancel()
+                    return
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            result = await handler
+        except asyncio.CancelledError:
+            if not lease_lost:
+                raise
+            return LEASE_LOST
+        except Exception as e:
+            logger.exception("Job %s (%s) attempt %s failed", row.id, row.kind, row.attempts)
+            if not await asyncio.to_thread(self.fail, row, job, worker_id, str(e)):
+                logger.warning("Job %s (%s) failed after losing its lease", row.id, row.kind)
+                return LEASE_LOST
+            return PENDING if row.attempts < row.max_attempts else FAILED
+        finally:
+            beat.cancel()
+        if not await asyncio.to_thread(self.complete, row, job, worker_id, result):
+            logger.warning("Job %s (%s) finished after losing its lease; result dropped",
+                           row.id, row.kind)
+            return LEASE_LOST
+        return DONE
+
+    async def run_pending(self, worker_id: str | None = None,
+                          kinds: Iterable[str] | None = None) -> int:
+        """Run due jobs one after another until none is left; return how many ran."""
+        worker_id = worker_id or worker_name()
+        count = 0
+        while True:
+            row = await asyncio.to_thread(self.claim, worker_id, kinds)
+            if row is None:
+                return count
+            await self.run(row, worker_id)
+            count += 1
+
+
+job_queue = JobQueue()
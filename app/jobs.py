@@ -0,0 +1,116 @@
+# app/jobs.py
+
+"""In-process background jobs with progress polling.
+
+Long-running work (e.g. pricing the whole lot) is started with
+``jobs.start(kind, fn)`` and runs as an ``asyncio`` task on the API's event
+loop.  ``fn`` receives its ``Job`` and reports progress through
+``job.total`` / ``job.advance()``; whatever it returns becomes
+``job.result``.  Clients poll ``job.to_dict()`` and fetch the result once
+``status`` is ``"done"``.
+
+Jobs live in memory only: they do not survive a restart and are not shared
+between workers.  The registry keeps the newest ``JOB_HISTORY`` jobs.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("jobs")
+
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "50"))
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class Job:
+    kind: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = PENDING
+    total: int = 0
+    done: int = 0
+    summary: dict = field(default_factory=dict)
+    result: Any = None
+    error: str | None = None
+    created_at: str = field(default_factory=_now)
+    finished_at: str | None = None
+
+    def advance(self, n: int = 1):
+        self.done += n
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "progress": round(self.done / self.total, 4) if self.total else (1.0 if self.status == DONE else 0.0),
+            "summary": self.summary,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRegistry:
+    def __init__(self, history: int = JOB_HISTORY):
+        self.history = history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def get(self, job_id: str, kind: str | None = None) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is None or (kind is not None and job.kind != kind):
+            return None
+        return job
+
+    def start(self, kind: str, fn: Callable[[Job], Awaitable[Any]]) -> Job:
+        """Register a job and run ``fn(job)`` in the background."""
+        job = Job(kind)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history:
+            old_id, old = next(iter(self._jobs.items()))
+            if old.status in (PENDING, RUNNING):
+                break
+            del self._jobs[old_id]
+        self._tasks[job.id] = asyncio.create_task(self._run(job, fn))
+        return job
+
+    async def _run(self, job: Job, fn):
+        job.status = RUNNING
+        try:
+            job.result = await fn(job)
+            job.status = DONE
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = _now()
+            self._tasks.pop(job.id, None)
+
+    async def wait(self, job_id: str):
+        """Wait for a running job to finish (used by tests and shutdown)."""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def aclose(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+
+
+jobs = JobRegistry()
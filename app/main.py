@@ -1,4 +1,5 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -22,19 +23,36 @@ from app.routers.tasks          import router as tasks_router
 from app.routers.appointments   import router as appointments_router
 from app.routers.deals          import router as deals_router
 from app.routers.comps          import router as comps_router
+from app.routers.pricing        import router as pricing_router
 from app.routers.search         import router as search_router
 from app.routers.appraisals     import router as appraisals_router
 from app.openai_router          import router as ai_router
 from app.routers.vin            import router as vin_router
 from app.routers.auth           import router as auth_router
 from app.routers.ai_hotness     import router as ai_hotness_router
+from app.routers.jobs           import router as jobs_router
+from app.async_db               import async_supabase
+from app.comp_check             import comp_engine
+from app.jobs                   import jobs
+from app.http_cache             import http_cache
+from app.pagination             import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+
+# ── Lifespan: release pooled connections on shutdown ──
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await async_supabase.aclose()
+    await comp_engine.aclose()
+    await jobs.aclose()
+    http_cache.close()
 
 # ── App init with docs paths ──
 app = FastAPI(
     title="aiVenta CRM API",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
 # ── CORS Config ──
@@ -72,6 +90,7 @@ app.add_middleware(
     allow_credentials = allow_credentials,
     allow_methods     = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers     = ["*"],
+    expose_headers    = [NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
 
 # ── Health endpoints ──
@@ -103,6 +122,8 @@ app.include_router(appointments_router,  prefix=f"{api_prefix}/appointments", ta
 app.include_router(deals_router,         prefix=f"{api_prefix}/deals",        tags=["deals"])
 app.include_router(appraisals_router,    prefix=f"{api_prefix}/appraisals",   tags=["appraisals"])
 app.include_router(comps_router,         prefix=f"{api_prefix}",              tags=["comps"])
+app.include_router(pricing_router,       prefix=f"{api_prefix}/pricing",      tags=["pricing"])
+app.include_router(jobs_router,          prefix=f"{api_prefix}/jobs",         tags=["jobs"])
 app.include_router(search_router,        prefix=f"{api_prefix}",              tags=["search"])
 app.include_router(ai_hotness_router,    prefix=f"{api_prefix}",              tags=["ai-hotness"])
 app.include_router(ai_router,            prefix=f"{api_prefix}",              tags=["ai"])
@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import Optional, List, Literal, Union
+from typing import Dict, Optional, List, Literal, Union
 from pydantic import BaseModel, EmailStr, Field, root_validator, validator, ConfigDict
 
 # ── Analytics Schema ───────────────────────────────────────────────
@@ -270,6 +270,11 @@ class InventoryItem(CamelModel):
     version_mod_date: Optional[datetime] = Field(None, alias="Version_Mod.Date")
     vehicle_type: Optional[str] = None
 
+class InventorySearchResult(CamelModel):
+    total: int
+    items: List[InventoryItem]
+    facets: Dict[str, Dict[str, int]] = {}
+
 class InventoryItemCreate(CamelModel):
     # Same as InventoryItem, minus id and plus all optionals for creation.
     stocknumber: Optional[str] = None
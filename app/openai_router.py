@@ -16,7 +16,11 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 from app.openai_client import get_openai_client
 from app.db import supabase
+from app.async_db import async_supabase
+from app.cache import TTLCache
 from app.comp_check import aggregate_comps
+from app.inventory_index import inventory_index
+from app.pagination import range_pages
 from datetime import datetime, timezone
 import asyncio
 import json
@@ -25,9 +29,11 @@ import os
 
 router = APIRouter(prefix="/ai")
 
-# The Supabase client comes from ``app.db`` which falls back to an in-memory
-# stub when credentials are not configured.  OpenAI is retrieved lazily in each
-# handler via ``get_openai_client`` so tests can patch the helper easily.
+# The Supabase clients come from ``app.db`` / ``app.async_db`` which fall back
+# to in-memory stubs when credentials are not configured; async handlers use
+# ``async_supabase`` so queries don't block the event loop.  OpenAI is
+# retrieved lazily in each handler via ``get_openai_client`` so tests can
+# patch the helper easily.
 
 
 # ---------------------------------------------------------------------------
@@ -70,10 +76,10 @@ functions = [
 # Tool runners
 # ---------------------------------------------------------------------------
 
-def get_inventory(args: dict) -> list:
+async def get_inventory(args: dict) -> list:
     """Fetch inventory rows matching the provided filters."""
-    q = (
-        supabase.from_("ai_inventory_context")
+    q = await (
+        async_supabase.from_("ai_inventory_context")
         .select("stocknumber,vin,year,make,model,trim,sellingprice,miles")
         .ilike("model", f"%{args['model']}%")
         .lte("internet_price", args.get("max_price", 999999))
@@ -83,10 +89,10 @@ def get_inventory(args: dict) -> list:
     return q.data
 
 
-def get_best_contacts(args: dict) -> list:
+async def get_best_contacts(args: dict) -> list:
     """Return contacts ranked by purchase likelihood."""
-    rows = (
-        supabase.rpc(
+    rows = await (
+        async_supabase.rpc(
             "rank_contacts",
             {"segment": args["segment"], "limit_num": args.get("limit", 10)},
         ).execute()
@@ -127,8 +133,8 @@ async def ask(request: Request):
 
     # If it's obviously an inventory question, inject context directly
     if _is_inventory_question(question):
-        res = (
-            supabase.table("ai_inventory_context")
+        res = await (
+            async_supabase.table("ai_inventory_context")
             .select("*")
             .limit(5)
             .execute()
@@ -166,7 +172,7 @@ async def ask(request: Request):
     if msg.function_call:
         fn_name = msg.function_call.name
         args = json.loads(msg.function_call.arguments)
-        data = TOOLS[fn_name](args)
+        data = await TOOLS[fn_name](args)
 
         # Second pass – answer using the fetched data
         second = await openai.chat.completions.create(
@@ -234,7 +240,7 @@ async def ask_stream(q: str):
         if msg.function_call:
             fn_name = msg.function_call.name
             args = json.loads(msg.function_call.arguments)
-            data = TOOLS[fn_name](args)
+            data = await TOOLS[fn_name](args)
 
             second = await openai.chat.completions.create(
                 model="gpt-4o-mini",
@@ -289,24 +295,96 @@ async def ask_stream(q: str):
 # AI context aggregation
 # ---------------------------------------------------------------------------
 
-def get_inventory_with_comps() -> list:
-    """Return inventory rows with recent market comps attached."""
-    inv_res = supabase.table("ai_inventory_context").select("*").execute()
-    inventory = inv_res.data or []
+COMPS_PER_VEHICLE = 5
+AI_CONTEXT_TTL = float(os.getenv("AI_CONTEXT_TTL", "300"))
+
+# (comps fingerprint, inventory rows, inventory prompt block)
+_inventory_context_cache = TTLCache(ttl=AI_CONTEXT_TTL, maxsize=1)
+
+
+class _InventoryContextInvalidator:
+    """Drops the cached inventory context when the inventory index changes."""
+
+    def reset(self, rows):
+        _inventory_context_cache.invalidate()
+
+    def update(self, old, new):
+        _inventory_context_cache.invalidate()
+
+
+inventory_index.add_listener(_InventoryContextInvalidator())
+
+
+def _comps_fingerprint():
+    """Cheap change marker for ``market_comps``: its newest ``created_at``.
+
+    Comps are only ever replaced with freshly stamped rows, so the newest
+    timestamp moves on every refresh; an index lookup, unlike a row count.
+    """
+    res = (
+        supabase.table("market_comps")
+        .select("created_at")
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return res.data[0].get("created_at") if res.data else None
 
+
+def _latest_comps_by_vehicle() -> dict:
+    """Latest comps per inventory id from the ``latest_market_comps`` RPC."""
+    rows = range_pages(
+        lambda: supabase.rpc("latest_market_comps", {"per_vehicle": COMPS_PER_VEHICLE})
+    )
+    by_vehicle: dict = {}
+    for row in rows:
+        comp = dict(row)
+        by_vehicle.setdefault(str(comp.pop("inventory_id")), []).append(comp)
+    return by_vehicle
+
+
+def _inventory_block(inventory: list) -> str:
+    inv_lines = []
     for car in inventory:
-        car_id = car.get("id")
-        comps_res = (
-            supabase.table("market_comps")
-            .select("source,year,make,model,trim,mileage,price,url,created_at")
-            .eq("inventory_id", car_id)
-            .order("created_at", desc=True)
-            .limit(5)
-            .execute()
+        line = (
+            f"- {car.get('year')} {car.get('make')} {car.get('model')} {car.get('trim')} "
+            f"| {car.get('mileage')} mi | ${car.get('price')} | Stock#: {car.get('stocknumber')}"
         )
-        car["comps"] = comps_res.data or []
+        if car.get("comps"):
+            comps_lines = [
+                (
+                    f"    • [{c['source']}] {c['year']} {c['make']} {c['model']} {c['trim']} "
+                    f"| {c['mileage']} mi | ${c['price']} ({c['url']})"
+                )
+                for c in car["comps"]
+            ]
+            line += "\n" + "\n".join(comps_lines)
+        inv_lines.append(line)
+    return "\n".join(inv_lines)
+
+
+def _inventory_context() -> tuple[list, str]:
+    """Inventory rows with comps attached plus their prompt block, cached."""
+    fingerprint = _comps_fingerprint()
+    cached = _inventory_context_cache.get("inventory")
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1], cached[2]
+
+    inventory = list(range_pages(
+        lambda: supabase.table("ai_inventory_context").select("*").order("id")
+    ))
+    comps = _latest_comps_by_vehicle()
+    for car in inventory:
+        car["comps"] = comps.get(str(car.get("id")), [])
+
+    block = _inventory_block(inventory)
+    _inventory_context_cache.set("inventory", (fingerprint, inventory, block))
+    return inventory, block
 
-    return inventory
+
+def get_inventory_with_comps() -> list:
+    """Return inventory rows with recent market comps attached."""
+    return _inventory_context()[0]
 
 
 def get_overdue_followups() -> dict:
@@ -355,27 +433,10 @@ def get_hot_leads() -> list:
 @router.get("/context/full")
 def get_full_ai_context():
     """Aggregate inventory, follow-ups and lead info for AI prompts."""
-    inventory = get_inventory_with_comps()
+    inventory, inventory_block = _inventory_context()
     overdue = get_overdue_followups()
     hot_leads = get_hot_leads()
 
-    inv_lines = []
-    for car in inventory:
-        line = (
-            f"- {car.get('year')} {car.get('make')} {car.get('model')} {car.get('trim')} "
-            f"| {car.get('mileage')} mi | ${car.get('price')} | Stock#: {car.get('stocknumber')}"
-        )
-        if car.get("comps"):
-            comps_lines = [
-                (
-                    f"    • [{c['source']}] {c['year']} {c['make']} {c['model']} {c['trim']} "
-                    f"| {c['mileage']} mi | ${c['price']} ({c['url']})"
-                )
-                for c in car["comps"]
-            ]
-            line += "\n" + "\n".join(comps_lines)
-        inv_lines.append(line)
-
     overdue_lines = []
     for task in overdue["tasks"]:
         overdue_lines.append(
@@ -398,7 +459,7 @@ def get_full_ai_context():
             "overdue": overdue,
             "hot_leads": hot_leads,
             "ai_context_blocks": {
-                "inventory_block": "\n".join(inv_lines),
+                "inventory_block": inventory_block,
                 "overdue_block": "\n".join(overdue_lines),
                 "hot_leads_block": "\n".join(hot_lines),
             },
@@ -410,8 +471,8 @@ def get_full_ai_context():
 @router.get("/inventory/{item_id}/review")
 async def inventory_ai_review(item_id: int, zipcode: str = "76504", radius: int = 200):
     """Return an AI generated market review for a specific inventory item."""
-    res = (
-        supabase.table("inventory_with_days_in_stock")
+    res = await (
+        async_supabase.table("inventory_with_days_in_stock")
         .select("id,year,make,model,trim,sellingprice,mileage")
         .eq("id", item_id)
         .maybe_single()
@@ -421,7 +482,7 @@ async def inventory_ai_review(item_id: int, zipcode: str = "76504", radius: int
     if not vehicle:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    comps = aggregate_comps(vehicle["year"], vehicle["make"], vehicle["model"], vehicle.get("trim"), zipcode, radius)
+    comps = await aggregate_comps(vehicle["year"], vehicle["make"], vehicle["model"], vehicle.get("trim"), zipcode, radius)
     num_available = len(comps.get("comps", []))
 
     openai = get_openai_client()
@@ -449,6 +510,7 @@ async def inventory_ai_review(item_id: int, zipcode: str = "76504", radius: int
         "market_avg": comps.get("market_avg"),
         "market_low": comps.get("market_low"),
         "market_high": comps.get("market_high"),
+        "market_median": comps.get("market_median"),
         "analysis": analysis,
     }
 
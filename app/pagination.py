@@ -0,0 +1,171 @@
+# app/pagination.py
+
+"""Keyset (cursor) pagination shared by the list endpoints.
+
+List routes keep returning a plain JSON array and paging is opt-in: a
+request without ``limit`` or ``cursor`` gets the unpaged result it always
+did, so existing clients work unchanged.  Paged requests get their state in
+response headers:
+
+* ``X-Next-Cursor`` - opaque cursor for the next page (absent on the last page)
+* ``X-Total-Count`` - total matching rows, only when ``include_total=true``
+
+Usage inside a route::
+
+    query = supabase.table("deals").select("*", count=page.count)
+    res = page.apply(query).execute()
+    return page.finish(res, response)
+"""
+
+import base64
+import json
+import os
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException, Query, Response
+
+DEFAULT_PAGE_SIZE = int(os.getenv("API_DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "1000"))
+
+# PostgREST's ``db-max-rows``: the most rows one request can return.
+POSTGREST_MAX_ROWS = int(os.getenv("POSTGREST_MAX_ROWS", "1000"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(values: dict) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def range_pages(build, page_size: int | None = None):
+    """Yield every row of ``build()`` read ``page_size`` rows at a time.
+
+    For results without a usable keyset, such as set-returning RPCs, which
+    PostgREST would otherwise cut at ``db-max-rows``.  ``build`` must return a
+    fresh, deterministically ordered query; paging stops at the first short
+    page, so ``page_size`` must not exceed the server's max-rows.
+    """
+    page_size = page_size or POSTGREST_MAX_ROWS
+    start = 0
+    while True:
+        rows = build().range(start, start + page_size - 1).execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+async def async_range_pages(build, page_size: int | None = None):
+    """``range_pages`` for async PostgREST queries."""
+    page_size = page_size or POSTGREST_MAX_ROWS
+    start = 0
+    while True:
+        res = await build().range(start, start + page_size - 1).execute()
+        rows = res.data or []
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+def _quote(value) -> str:
+    """Quote a value for use inside a PostgREST ``or=(...)`` expression."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+@dataclass
+class Page:
+    """Pagination request for one list call.
+
+    ``key`` is the sort column; ``id`` is always appended as a tie-breaker so
+    the ordering is total and a cursor never skips or repeats rows.
+    """
+
+    cursor: str | None = None
+    limit: int | None = DEFAULT_PAGE_SIZE  # None: unpaged (legacy clients)
+    include_total: bool = False
+    key: str = field(default="id", init=False)
+    desc: bool = field(default=False, init=False)
+
+    @property
+    def count(self) -> str | None:
+        """Value for ``select(..., count=...)``."""
+        return "exact" if self.include_total else None
+
+    def apply(self, query, key: str = "id", desc: bool = False):
+        """Add the keyset filter, ordering and limit to a PostgREST query."""
+        self.key, self.desc = key, desc
+        op = "lt" if desc else "gt"
+        if self.cursor:
+            after = decode_cursor(self.cursor)
+            if "id" not in after or (key != "id" and key not in after):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            if key == "id":
+                query = getattr(query, op)("id", after["id"])
+            else:
+                value, last_id = _quote(after[key]), _quote(after["id"])
+                query = query.or_(
+                    f"{key}.{op}.{value},and({key}.eq.{value},id.{op}.{last_id})"
+                )
+        query = query.order(key, desc=desc)
+        if key != "id":
+            query = query.order("id", desc=desc)
+        if self.limit is None:
+            return query
+        # One extra row tells us whether another page exists.
+        return query.limit(self.limit + 1)
+
+    def finish(self, res, response: Response | None = None) -> list:
+        """Trim the look-ahead row and publish paging headers."""
+        rows = res.data or []
+        rows = rows if isinstance(rows, list) else []
+        return self.finish_rows(rows, response, total=getattr(res, "count", None))
+
+    def cursor_after(self, row: dict) -> str:
+        """Cursor that resumes immediately after ``row``."""
+        values = {"id": row.get("id")}
+        if self.key != "id":
+            values[self.key] = row.get(self.key)
+        return encode_cursor(values)
+
+    def finish_rows(self, rows: list, response: Response | None = None,
+                    total: int | None = None) -> list:
+        has_more = self.limit is not None and len(rows) > self.limit
+        rows = rows if self.limit is None else rows[: self.limit]
+        if response is not None:
+            if has_more and rows:
+                response.headers[NEXT_CURSOR_HEADER] = self.cursor_after(rows[-1])
+            if self.include_total and isinstance(total, int):
+                response.headers[TOTAL_COUNT_HEADER] = str(total)
+        return rows
+
+
+def page_params(
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE,
+                              description=f"Page size (default {DEFAULT_PAGE_SIZE} once paging)"),
+    include_total: bool = Query(False, description="Return X-Total-Count"),
+) -> Page:
+    """FastAPI dependency for ``cursor``/``limit``/``include_total``.
+
+    Without ``limit`` and ``cursor`` the list is unpaged, as before paging
+    existed; a ``cursor`` alone pages with ``DEFAULT_PAGE_SIZE``.
+    """
+    if limit is None and cursor is not None:
+        limit = DEFAULT_PAGE_SIZE
+    return Page(cursor=cursor, limit=limit, include_total=include_total)
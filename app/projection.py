@@ -0,0 +1,96 @@
+# app/projection.py
+
+"""Column projection derived from response models.
+
+Routes used to ``select("*")`` and let pydantic throw away the columns the
+response model doesn't declare.  ``select_columns`` builds the PostgREST
+select list from the model instead, and narrows it further when the client
+passes ``?fields=a,b,c``::
+
+    cols = select_columns(InventoryItem, fields)
+    supabase.table("inventory_with_days_in_stock").select(cols)
+"""
+
+import re
+from functools import lru_cache
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+_PLAIN_COLUMN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _quote(column: str) -> str:
+    # Columns such as "Days In Stock" or "Version_Mod.Date" must be quoted.
+    return column if _PLAIN_COLUMN.match(column) else f'"{column}"'
+
+
+@lru_cache(maxsize=None)
+def model_columns(model: type[BaseModel]) -> dict[str, str]:
+    """Map every accepted field spelling to its database column.
+
+    Explicit ``Field(alias=...)`` aliases name the database column; aliases
+    produced by an ``alias_generator`` (e.g. camelCase on inventory) only
+    affect the JSON output, so the field name is the column there.
+    """
+    mapping: dict[str, str] = {}
+    for name, info in model.model_fields.items():
+        explicit = info.alias and info.alias_priority == 2
+        column = info.alias if explicit else name
+        mapping[name] = column
+        mapping[column] = column
+        if info.alias:
+            mapping[info.alias] = column
+    return mapping
+
+
+def default_columns(model: type[BaseModel]) -> list[str]:
+    """Database columns needed to populate ``model``, in declaration order."""
+    return list(dict.fromkeys(model_columns(model)[n] for n in model.model_fields))
+
+
+@lru_cache(maxsize=None)
+def required_columns(model: type[BaseModel]) -> tuple[str, ...]:
+    """Columns backing fields ``model`` can't be built without."""
+    mapping = model_columns(model)
+    return tuple(mapping[n] for n, info in model.model_fields.items() if info.is_required())
+
+
+def resolve_columns(model: type[BaseModel], fields: str | None = None,
+                    required: tuple[str, ...] = ("id",)) -> list[str]:
+    """Return the database columns to read for ``model``.
+
+    ``fields`` is a comma-separated subset (field names, aliases or column
+    names); unknown names are rejected with 400.  ``required`` columns (the
+    primary key and any pagination sort key) and the columns behind the
+    model's required fields are always included, so a sparse row still
+    validates against the response model.
+    """
+    if fields:
+        mapping = model_columns(model)
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in mapping]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}",
+            )
+        columns = [mapping[f] for f in requested] + list(required_columns(model))
+    else:
+        columns = default_columns(model)
+    return list(dict.fromkeys([*required, *columns]))
+
+
+def select_columns(model: type[BaseModel], fields: str | None = None,
+                   required: tuple[str, ...] = ("id",)) -> str:
+    """Return a PostgREST select list for ``model`` (see ``resolve_columns``)."""
+    return ",".join(_quote(c) for c in resolve_columns(model, fields, required))
+
+
+def fields_param(
+    fields: str | None = Query(
+        None, description="Comma-separated list of fields to return"
+    ),
+) -> str | None:
+    """FastAPI dependency for the sparse fieldset ``fields`` parameter."""
+    return fields
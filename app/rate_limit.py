@@ -0,0 +1,71 @@
+# app/rate_limit.py
+
+"""Async token-bucket rate limiting for outbound provider APIs.
+
+One bucket per provider account (``limiter_for("twilio:<sid>", rate)``) is
+shared by every job and worker in the process.  ``rate`` is in requests per
+second for the whole account; ``burst`` tokens can be spent back to back
+after an idle period.
+
+Buckets live in process memory, so when several processes send for the same
+account each one gets ``rate / RATE_LIMIT_PROCESSES``.  ``python -m
+app.worker --processes N`` sets that to N for its own processes; set
+``RATE_LIMIT_PROCESSES`` to the total when senders run on several hosts or
+API workers, or the account is driven past its throughput.
+"""
+
+import asyncio
+import os
+import time
+
+RATE_LIMIT_PROCESSES = max(1, int(os.getenv("RATE_LIMIT_PROCESSES", "1")))
+
+
+class AsyncTokenBucket:
+    def __init__(self, rate: float, burst: float | None = None, clock=time.monotonic,
+                 sleep=asyncio.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until ``tokens`` are available and take them.
+
+        Waiters are served in arrival order: the lock is held while sleeping,
+        so a later caller can't overtake one that is already waiting.
+        """
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await self._sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+_limiters: dict[str, AsyncTokenBucket] = {}
+
+
+def set_process_count(count: int):
+    """Declare how many processes share each account's ``rate``."""
+    global RATE_LIMIT_PROCESSES
+    RATE_LIMIT_PROCESSES = max(1, int(count))
+
+
+def limiter_for(key: str, rate: float, burst: float | None = None) -> AsyncTokenBucket:
+    """This process's bucket for ``key``: its share of the account ``rate``."""
+    rate = rate / RATE_LIMIT_PROCESSES
+    limiter = _limiters.get(key)
+    if limiter is None or limiter.rate != rate:
+        limiter = _limiters[key] = AsyncTokenBucket(rate, burst)
+    return limiter
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from postgrest.exceptions import APIError
 from app.db import supabase
+from app.async_db import async_supabase
+from app.export import export_format_param, export_response, iter_rows
 from app.models import Activity, ActivityCreate, ActivityUpdate
+from app.pagination import Page, page_params
+from app.projection import fields_param, resolve_columns, select_columns
 
 router = APIRouter()
 
@@ -38,24 +42,50 @@ def today_metrics():
 
     return counts
 
-@router.get("/", response_model=list[Activity])
-@router.get("", response_model=list[Activity], include_in_schema=False)
-def list_activities(customer_id: str | None = Query(None)):
-    """List all activities, or filter by customer_id if provided."""
+@router.get("/", response_model=list[Activity], response_model_exclude_unset=True)
+@router.get("", response_model=list[Activity], response_model_exclude_unset=True, include_in_schema=False)
+def list_activities(
+    response: Response,
+    customer_id: str | None = Query(None),
+    page: Page = Depends(page_params),
+    fields: str | None = Depends(fields_param),
+):
+    """List activities newest first, optionally filtered by customer_id."""
+    columns = select_columns(Activity, fields, required=("id", "created_at"))
     try:
-        q = supabase.table("activities").select("*")
+        q = supabase.table("activities").select(columns, count=page.count)
         if customer_id is not None:
             q = q.eq("customer_id", customer_id)
-        res = q.execute()
+        res = page.apply(q, key="created_at", desc=True).execute()
     except APIError as e:
         raise HTTPException(status_code=400, detail=e.message)
-    return res.data
+    return page.finish(res, response)
+
+@router.get("/export", summary="Stream activities newest first as NDJSON or CSV")
+async def export_activities(
+    customer_id: str | None = Query(None),
+    fmt: str = Depends(export_format_param),
+    fields: str | None = Depends(fields_param),
+):
+    required = ("id", "created_at")
+    columns = resolve_columns(Activity, fields, required=required)
+    select = select_columns(Activity, fields, required=required)
+
+    def build_query():
+        q = async_supabase.table("activities").select(select)
+        if customer_id is not None:
+            q = q.eq("customer_id", customer_id)
+        return q
+
+    return await export_response(
+        iter_rows(build_query, key="created_at", desc=True), columns, fmt, "activities"
+    )
 
-@router.get("/{act_id}", response_model=Activity)
-def get_activity(act_id: int):
+@router.get("/{act_id}", response_model=Activity, response_model_exclude_unset=True)
+def get_activity(act_id: int, fields: str | None = Depends(fields_param)):
     res = (
         supabase.table("activities")
-        .select("*")
+        .select(select_columns(Activity, fields))
         .eq("id", act_id)
         .maybe_single()
         .execute()
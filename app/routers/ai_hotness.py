@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import os
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select
+from sqlalchemy import insert
 from uuid import UUID
-from datetime import datetime
-from typing import List
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, List
 
 from app.db import get_db_session
 from app.db_models import CustomerSignal, AIHotness
-from app.schemas import SignalIn, AiHotnessResponse, BreakdownItem
+from app.hotness import apply_signals, current
+from app.schemas import (
+    SignalIn, SignalBatchItem, SignalBatchResult, AiHotnessResponse,
+)
 
 router = APIRouter()
 
+SIGNAL_BATCH_MAX = int(os.getenv("SIGNAL_BATCH_MAX", "10000"))
+SIGNAL_INSERT_CHUNK = int(os.getenv("SIGNAL_INSERT_CHUNK", "5000"))
+NDJSON = "application/x-ndjson"
+
 @router.post(
     "/customers/{customer_id}/signals",
     status_code=status.HTTP_201_CREATED,
@@ -27,10 +39,125 @@ def ingest_signal(
         meta=payload.metadata,
     )
     db.add(signal)
+    db.flush()
+    apply_signals(db, [{
+        "customer_id": customer_id,
+        "signal_type": payload.type,
+        "signal_value": payload.value,
+        "created_at": signal.created_at,
+    }])
     db.commit()
     return {"status": "ok"}
 
 
+def _signal_row(item: SignalBatchItem) -> dict:
+    created_at = item.created_at
+    if created_at is not None and created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "id": uuid.uuid4(),
+        "customer_id": item.customer_id,
+        "signal_type": item.type,
+        "signal_value": item.value,
+        "meta": item.metadata,
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+def _item_error(index: int, e: ValidationError) -> dict:
+    message = "; ".join(
+        f"{'.'.join(map(str, err['loc'])) or 'item'}: {err['msg']}" for err in e.errors()
+    )
+    return {"index": index, "error": message}
+
+
+def _insert_signals(db: Session, rows: List[dict]):
+    # One executemany; SQLAlchemy sends it as multi-row INSERTs on Postgres.
+    if rows:
+        db.execute(insert(CustomerSignal), rows)
+        apply_signals(db, rows)
+
+
+async def _ndjson_items(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    """``(line index, parsed JSON or ValueError)`` for each non-blank body line."""
+    buffer = b""
+    index = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                try:
+                    yield index, json.loads(line)
+                except ValueError as e:
+                    yield index, e
+            index += 1
+    if buffer.strip():
+        try:
+            yield index, json.loads(buffer)
+        except ValueError as e:
+            yield index, e
+
+
+@router.post(
+    "/customers/signals:batch",
+    response_model=SignalBatchResult,
+)
+async def ingest_signals_batch(request: Request, db: Session = Depends(get_db_session)):
+    """
+    Ingest many signals in one transaction.
+    The body is a JSON array of ``{customer_id, type, value, metadata,
+    created_at}`` objects (or ``{"signals": [...]}``, at most
+    ``SIGNAL_BATCH_MAX``), or ``application/x-ndjson`` with one object per
+    line, which is streamed and has no size limit. Valid items are inserted
+    ``SIGNAL_INSERT_CHUNK`` rows per statement; invalid ones are reported in
+    ``errors`` by index (the line number for NDJSON) and skipped.
+    """
+    rows: List[dict] = []
+    errors: List[dict] = []
+    inserted = 0
+
+    def accept(index: int, item: Any):
+        try:
+            rows.append(_signal_row(SignalBatchItem.model_validate(item)))
+        except ValidationError as e:
+            errors.append(_item_error(index, e))
+
+    if request.headers.get("content-type", "").split(";")[0].strip() == NDJSON:
+        async for index, item in _ndjson_items(request):
+            if isinstance(item, ValueError):
+                errors.append({"index": index, "error": f"invalid JSON: {item}"})
+                continue
+            accept(index, item)
+            if len(rows) >= SIGNAL_INSERT_CHUNK:
+                await run_in_threadpool(_insert_signals, db, rows)
+                inserted += len(rows)
+                rows = []
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(400, "Body must be a JSON array of signals")
+        items = body.get("signals") if isinstance(body, dict) else body
+        if not isinstance(items, list):
+            raise HTTPException(400, "Body must be a JSON array of signals")
+        if len(items) > SIGNAL_BATCH_MAX:
+            raise HTTPException(
+                413,
+                f"At most {SIGNAL_BATCH_MAX} signals per request; use NDJSON for more",
+            )
+        for index, item in enumerate(items):
+            accept(index, item)
+        for start in range(0, len(rows), SIGNAL_INSERT_CHUNK):
+            await run_in_threadpool(_insert_signals, db, rows[start:start + SIGNAL_INSERT_CHUNK])
+        inserted, rows = len(rows), []
+
+    await run_in_threadpool(_insert_signals, db, rows)
+    inserted += len(rows)
+    await run_in_threadpool(db.commit)
+    return {"inserted": inserted, "rejected": len(errors), "errors": errors}
+
+
 @router.get(
     "/customers/{customer_id}/ai-hotness",
     response_model=AiHotnessResponse,
@@ -39,56 +166,7 @@ def get_ai_hotness(
     customer_id: UUID,
     db: Session = Depends(get_db_session),
 ):
-    signals = db.execute(
-        select(
-            CustomerSignal.signal_type,
-            func.sum(CustomerSignal.signal_value).label("total_value")
-        )
-        .where(CustomerSignal.customer_id == customer_id)
-        .group_by(CustomerSignal.signal_type)
-    ).all()
-
-    if not signals:
+    row = db.get(AIHotness, customer_id)
+    if row is None:
         raise HTTPException(404, "No signals found for this customer")
-
-    weights = {
-        "quote_request": 0.30,
-        "web_visit": 0.10,
-        "service_visit": 0.15,
-        "positive_equity": 0.20,
-        "sentiment_score": 0.25,
-    }
-
-    breakdown: List[BreakdownItem] = []
-    raw_score = 0.0
-    for sig in signals:
-        wt = weights.get(sig.signal_type, 0.0)
-        contrib = float(sig.total_value) * wt
-        breakdown.append(
-            BreakdownItem(
-                signal_type=sig.signal_type,
-                weight=wt,
-                contribution=contrib,
-            )
-        )
-        raw_score += contrib
-
-    score = max(0.0, min(raw_score, 100.0))
-
-    now = datetime.utcnow()
-    db.merge(
-        AIHotness(
-            customer_id=customer_id,
-            score=score,
-            breakdown=[item.dict() for item in breakdown],
-            computed_at=now,
-        )
-    )
-    db.commit()
-
-    return AiHotnessResponse(
-        customer_id=customer_id,
-        score=score,
-        breakdown=breakdown,
-        computed_at=now,
-    )
+    return current(row)
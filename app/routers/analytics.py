@@ -1,4 +1,6 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
 from app.routers import floor_traffic, leads, inventory
 from app.openai_client import get_openai_client
 
@@ -7,8 +9,10 @@ router = APIRouter()
 @router.get("/month-summary")
 async def month_summary():
     """Return an AI generated summary for the current month."""
-    ft_metrics = floor_traffic.month_metrics()
-    lead_metrics = leads.month_metrics()
+    ft_metrics, lead_metrics = await asyncio.gather(
+        floor_traffic.month_metrics(),
+        asyncio.to_thread(leads.month_metrics),
+    )
 
     client = get_openai_client()
     if not client:
@@ -31,12 +35,12 @@ async def month_summary():
 
 
 @router.get("/sales-overview")
-def sales_overview():
+async def sales_overview():
     """Return basic sales metrics for the month."""
-    metrics = floor_traffic.month_metrics()
+    metrics = jsonable_encoder(await floor_traffic.month_metrics())
     sold = metrics.get("sold_count", 0)
     goal = sold + 10
-    conversion_base = metrics.get("write_up_count", 0) or 1
+    conversion_base = metrics.get("worksheet_count", 0) or 1
     return {
         "current": sold,
         "goal": goal,
@@ -1,10 +1,11 @@
 """Endpoints for vehicle appraisals."""
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from postgrest.exceptions import APIError
 
 from app.db import supabase
 from app.models import Appraisal, AppraisalCreate
+from app.pagination import Page, page_params
 
 router = APIRouter()
 
@@ -22,12 +23,13 @@ def manager_only(user=Depends(get_current_user)):
 
 # ── List All Appraisals ──
 @router.get("/", response_model=list[Appraisal])
-def list_appraisals():
+def list_appraisals(response: Response, page: Page = Depends(page_params)):
     try:
-        res = supabase.table("appraisals").select("*").execute()
+        query = supabase.table("appraisals").select("*", count=page.count)
+        res = page.apply(query).execute()
     except APIError as e:
         raise HTTPException(500, detail=f"Database error: {e.message}")
-    return res.data or []
+    return page.finish(res, response)
 
 # ── Get Single Appraisal ──
 @router.get("/{appraisal_id}", response_model=Appraisal)
@@ -1,13 +1,26 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+import asyncio
+from fastapi import APIRouter, HTTPException, Header, status, Depends
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from app.db import supabase
+from postgrest.exceptions import APIError
+from app.async_db import async_supabase
+from app.bulk_send import TWILIO_MESSAGES_PER_SECOND, merge_fields, send_bulk, send_email_batches
+from app.export import iter_by_ids
+from app.job_queue import JOB_QUEUE_ENABLED, job_queue
+from app.jobs import jobs
+from app.models import Customer
+from app.projection import model_columns
+from app.rate_limit import limiter_for
 from twilio.rest import Client as TwilioClient
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 import os
+from typing import Iterable
 
 router = APIRouter()
 
+BULK_TEXT_JOB = "bulk-text"
+BULK_EMAIL_JOB = "bulk-email"
+
 class BulkTextRequest(BaseModel):
     ids: list[str]
     message: str
@@ -17,51 +30,90 @@ class BulkEmailRequest(BaseModel):
     subject: str
     body: str
 
-def get_customers_by_ids(ids: list[str]):
-    # Fetch customers from Supabase
-    resp = supabase.table('customers').select('*').in_('id', ids).execute()
-    if resp.error:
-        raise HTTPException(status_code=500, detail=resp.error.message)
-    return resp.data
-
-@router.post("/bulk/text")
-async def bulk_text(req: BulkTextRequest):
-    customers = get_customers_by_ids(req.ids)
-    twilio_client = TwilioClient(os.getenv("TWILIO_SID"), os.getenv("TWILIO_TOKEN"))
+# Bulk sends read only what they need, not ``select('*')``.
+TEXT_COLUMNS = ("id", "phone")
+EMAIL_COLUMNS = ("id", "email")
+
+def customers_by_ids(ids: list[str], columns: Iterable[str]):
+    """Stream the selected customers' ``columns`` in URL-safe id chunks."""
+    select = ",".join(dict.fromkeys(columns))
+    return iter_by_ids(lambda: async_supabase.table('customers').select(select), ids)
+
+def email_columns(subject: str, body: str) -> list[str]:
+    """``EMAIL_COLUMNS`` plus any customer column used as a merge field."""
+    known = model_columns(Customer)
+    _, fields = merge_fields(subject, body)
+    return [*EMAIL_COLUMNS, *(known[f] for f in fields if f in known)]
+
+def twilio_client():
+    return TwilioClient(os.getenv("TWILIO_SID"), os.getenv("TWILIO_TOKEN"))
+
+@job_queue.task(BULK_TEXT_JOB, max_attempts=1)  # a retry would text everyone again
+async def run_bulk_text(job, ids: list[str], message: str):
+    client = twilio_client()
     from_number = os.getenv("TWILIO_FROM")
-    sent, failed = 0, 0
-    for c in customers:
-        if not c.get("phone"):
-            continue
-        try:
-            twilio_client.messages.create(
-                body=req.message,
-                to=c["phone"],
-                from_=from_number
-            )
-            sent += 1
-        except Exception as e:
-            failed += 1
-    return {"sent": sent, "failed": failed}
+    limiter = limiter_for(f"twilio:{os.getenv('TWILIO_SID')}", TWILIO_MESSAGES_PER_SECOND)
+
+    def send(phone):
+        client.messages.create(body=message, to=phone, from_=from_number)
+
+    customers = customers_by_ids(ids, TEXT_COLUMNS)
+    return await send_bulk(job, customers, send, limiter, address=lambda c: c.get("phone"))
+
+@router.post("/bulk/text", status_code=status.HTTP_202_ACCEPTED)
+async def bulk_text(req: BulkTextRequest, idempotency_key: str | None = Header(None)):
+    """Queue a text blast; poll ``status_url`` for progress.
+
+    With the durable queue on, the blast is enqueued for ``app.worker`` and a
+    repeated ``Idempotency-Key`` returns the original job.
+    """
+    if JOB_QUEUE_ENABLED:
+        return await asyncio.to_thread(
+            job_queue.enqueue, BULK_TEXT_JOB, req.model_dump(), idempotency_key,
+        )
+    job = jobs.start(BULK_TEXT_JOB, lambda job: run_bulk_text(job, req.ids, req.message))
+    return {**job.to_dict(), "status_url": f"/api/bulk/jobs/{job.id}"}
+
+@router.get("/bulk/jobs/{job_id}")
+async def bulk_job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None and JOB_QUEUE_ENABLED:
+        job = await asyncio.to_thread(job_queue.get_job, job_id)
+    if job is None or not job.kind.startswith("bulk-"):
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    return job.to_dict()
+
+def sendgrid_client():
+    return SendGridAPIClient(os.getenv("SENDGRID_KEY"),
+                             host=os.getenv("SENDGRID_API_HOST", "https://api.sendgrid.com"))
+
+async def send_bulk_email(ids: list[str], subject: str, body: str):
+    customers = customers_by_ids(ids, email_columns(subject, body))
+    return await send_email_batches(
+        sendgrid_client(), os.getenv("SENDGRID_FROM"), subject, body, customers,
+    )
+
+@job_queue.task(BULK_EMAIL_JOB, max_attempts=1)
+async def run_bulk_email(job, ids: list[str], subject: str, body: str):
+    result = await send_bulk_email(ids, subject, body)
+    job.summary = {k: result[k] for k in ("sent", "failed", "skipped")}
+    job.total = job.done = sum(job.summary.values())
+    return result
 
 @router.post("/bulk/email")
-async def bulk_email(req: BulkEmailRequest):
-    customers = get_customers_by_ids(req.ids)
-    sg = SendGridAPIClient(os.getenv("SENDGRID_KEY"))
-    from_email = os.getenv("SENDGRID_FROM")
-    sent, failed = 0, 0
-    for c in customers:
-        if not c.get("email"):
-            continue
-        try:
-            mail = Mail(
-                from_email=from_email,
-                to_emails=c["email"],
-                subject=req.subject,
-                html_content=req.body
-            )
-            sg.send(mail)
-            sent += 1
-        except Exception as e:
-            failed += 1
-    return {"sent": sent, "failed": failed}
+async def bulk_email(req: BulkEmailRequest, idempotency_key: str | None = Header(None)):
+    """Email the customers in batched SendGrid requests.
+
+    ``{{field}}`` placeholders in the subject/body are filled from each
+    customer's row; ``batches`` reports the outcome of every request.  With
+    the durable queue on, the send is enqueued instead (202 with a job).
+    """
+    if JOB_QUEUE_ENABLED:
+        queued = await asyncio.to_thread(
+            job_queue.enqueue, BULK_EMAIL_JOB, req.model_dump(), idempotency_key,
+        )
+        return JSONResponse(queued, status_code=status.HTTP_202_ACCEPTED)
+    try:
+        return await send_bulk_email(req.ids, req.subject, req.body)
+    except APIError as e:
+        raise HTTPException(status_code=500, detail=e.message)
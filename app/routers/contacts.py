@@ -1,19 +1,22 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from postgrest.exceptions import APIError
 from app.db import supabase
 from app.models import Contact, ContactCreate, ContactUpdate
+from app.pagination import Page, page_params
 
 router = APIRouter()
 
 @router.get("/", response_model=list[Contact])
 @router.get("", response_model=list[Contact], include_in_schema=False)
 def list_contacts(
+    response: Response,
     q: str | None = Query(None, description="Search term for name"),
     email: str | None = Query(None, description="Filter by email"),
     phone: str | None = Query(None, description="Filter by phone"),
+    page: Page = Depends(page_params),
 ):
     """List contacts with optional search filters."""
-    query = supabase.table("contacts").select("*")
+    query = supabase.table("contacts").select("*", count=page.count)
     if q:
         query = query.ilike("name", f"%{q}%")
     if email:
@@ -21,8 +24,8 @@ def list_contacts(
     if phone:
         query = query.ilike("phone", f"%{phone}%")
 
-    res = query.execute()
-    return res.data
+    res = page.apply(query).execute()
+    return page.finish(res, response)
 
 @router.get("/{contact_id}", response_model=Contact)
 def get_contact(contact_id: int):
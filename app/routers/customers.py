@@ -1,9 +1,10 @@
 import structlog
 from loguru import logger as loguru_logger
-from fastapi import APIRouter, HTTPException, status, Query, UploadFile, File, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Request, Response
 from datetime import datetime, timedelta
 from postgrest.exceptions import APIError
 from app.db import supabase
+from app.async_db import async_supabase
 from app.models import (
     Customer,
     CustomerCreate,
@@ -11,7 +12,10 @@ from app.models import (
     CustomerFloorTrafficCreate,
     FloorTrafficCustomer,
 )
+from app.export import export_format_param, export_response, iter_rows
 from app.openai_client import get_openai_client
+from app.pagination import Page, page_params
+from app.projection import fields_param, resolve_columns, select_columns
 from pydantic import BaseModel
 import uuid
 import json
@@ -33,6 +37,9 @@ def get_trace_id(request: Request):
     return request.headers.get("X-Request-ID", str(uuid.uuid4()))
 
 # ---------- Helper for Normalizing Customer Data ----------
+# Always selected alongside ``fields`` so normalize_customer can derive ``name``.
+NAME_COLUMNS = ("id", "first_name", "last_name")
+
 def normalize_customer(c):
     if not c.get("name"):
         full_name = f"{c.get('first_name') or ''} {c.get('last_name') or ''}".strip()
@@ -48,17 +55,21 @@ def list_customers(
     email: str | None = Query(None, description="Filter by email"),
     phone: str | None = Query(None, description="Filter by phone"),
     request: Request = None,
+    response: Response = None,
+    page: Page = Depends(page_params),
+    fields: str | None = Depends(fields_param),
 ):
     trace_id = get_trace_id(request) if request else str(uuid.uuid4())
+    columns = select_columns(Customer, fields, required=NAME_COLUMNS)
     try:
-        query = supabase.table("customers").select("*")
+        query = supabase.table("customers").select(columns, count=page.count)
         if q:
             query = query.ilike("name", f"%{q}%")
         if email:
             query = query.ilike("email", f"%{email}%")
         if phone:
             query = query.ilike("phone", f"%{phone}%")
-        res = query.execute()
+        res = page.apply(query).execute()
     except APIError as e:
         logger.error({
             "event": "supabase_api_error",
@@ -69,7 +80,7 @@ def list_customers(
         loguru_logger.error(f"[{trace_id}] Supabase API error in list_customers: {e}")
         raise HTTPException(status_code=400, detail=e.message)
 
-    customers = [normalize_customer(c) for c in (res.data or [])]
+    customers = [normalize_customer(c) for c in page.finish(res, response)]
     logger.info({
         "event": "customers_listed",
         "filters": {"q": q, "email": email, "phone": phone},
@@ -84,8 +95,37 @@ def list_customers_noslash(
     email: str | None = Query(None, description="Filter by email"),
     phone: str | None = Query(None, description="Filter by phone"),
     request: Request = None,
+    response: Response = None,
+    page: Page = Depends(page_params),
+    fields: str | None = Depends(fields_param),
+):
+    return list_customers(q, email, phone, request, response, page, fields)
+
+# ----------- Export -----------
+@router.get("/export", summary="Stream all matching customers as NDJSON or CSV")
+async def export_customers(
+    q: str | None = Query(None, description="Search term for first or last name"),
+    email: str | None = Query(None, description="Filter by email"),
+    phone: str | None = Query(None, description="Filter by phone"),
+    fmt: str = Depends(export_format_param),
+    fields: str | None = Depends(fields_param),
 ):
-    return list_customers(q, email, phone, request)
+    columns = resolve_columns(Customer, fields, required=NAME_COLUMNS)
+    select = select_columns(Customer, fields, required=NAME_COLUMNS)
+
+    def build_query():
+        query = async_supabase.table("customers").select(select)
+        if q:
+            query = query.ilike("name", f"%{q}%")
+        if email:
+            query = query.ilike("email", f"%{email}%")
+        if phone:
+            query = query.ilike("phone", f"%{phone}%")
+        return query
+
+    return await export_response(
+        iter_rows(build_query), columns, fmt, "customers", transform=normalize_customer
+    )
 
 # ----------- Get Single Customer -----------
 @router.get(
@@ -93,13 +133,15 @@ def list_customers_noslash(
     response_model=Customer,
     response_model_exclude_none=True,
 )
-def get_customer(customer_id: str, request: Request):
+def get_customer(customer_id: str, request: Request,
+                 fields: str | None = Depends(fields_param)):
     trace_id = get_trace_id(request)
+    columns = select_columns(Customer, fields, required=NAME_COLUMNS)
     try:
         res = (
             supabase
             .table("customers")
-            .select("*")
+            .select(columns)
             .eq("id", customer_id)
             .maybe_single()
             .execute()
@@ -258,8 +300,8 @@ async def add_customer_to_floor_log(customer_id: str, entry: CustomerFloorTraffi
 
     # 1. Confirm the customer exists
     try:
-        res = (
-            supabase.table("customers")
+        res = await (
+            async_supabase.table("customers")
             .select("*")
             .eq("id", customer_id)
             .maybe_single()
@@ -289,8 +331,8 @@ async def add_customer_to_floor_log(customer_id: str, entry: CustomerFloorTraffi
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     be_back = False
     try:
-        past = (
-            supabase.table("floor_traffic_customers")
+        past = await (
+            async_supabase.table("floor_traffic_customers")
             .select("id")
             .eq("customer_id", customer_id)
             .gte("visit_time", thirty_days_ago.isoformat())
@@ -331,7 +373,7 @@ async def add_customer_to_floor_log(customer_id: str, entry: CustomerFloorTraffi
         payload["status"] = entry.status
 
     try:
-        res = supabase.table("floor_traffic_customers").insert(payload).execute()
+        res = await async_supabase.table("floor_traffic_customers").insert(payload).execute()
     except APIError as e:
         logger.error({
             "event": "supabase_api_error",
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Body
+from fastapi import APIRouter, HTTPException, status, Depends, Body, Response
 from postgrest.exceptions import APIError
 from app.db import supabase
+from app.async_db import async_supabase
+from app.export import export_format_param, export_response, iter_rows
+from app.pagination import Page, page_params
+from app.projection import fields_param, resolve_columns, select_columns
 from typing import Optional, List
 from app.models import Deal, DealCreate, DealUpdate, Customer  # <- Customer added!
 from datetime import datetime
@@ -45,15 +49,19 @@ def list_sold_customers():
 
 # ── Endpoints ────────────────────────────────────
 
-@router.get("/", response_model=List[Deal])
-@router.get("", response_model=List[Deal], include_in_schema=False)
+@router.get("/", response_model=List[Deal], response_model_exclude_unset=True)
+@router.get("", response_model=List[Deal], response_model_exclude_unset=True, include_in_schema=False)
 def list_deals(
+    response: Response,
     customer_id: Optional[str] = None,
     status: Optional[str] = None,
-    month: Optional[str] = None  # e.g. "2025-07"
+    month: Optional[str] = None,  # e.g. "2025-07"
+    page: Page = Depends(page_params),
+    fields: Optional[str] = Depends(fields_param),
 ):
+    columns = select_columns(Deal, fields)
     try:
-        query = supabase.table("deals").select("*")
+        query = supabase.table("deals").select(columns, count=page.count)
         if customer_id:
             query = query.eq("customer_id", customer_id)
         if status:
@@ -61,19 +69,43 @@ def list_deals(
         if month:
             # Filter for deals sold this month
             query = query.gte("sold_date", f"{month}-01").lte("sold_date", f"{month}-31")
-        res = query.execute()
-        return res.data or []
+        res = page.apply(query).execute()
+        return page.finish(res, response)
     except APIError as e:
         raise HTTPException(400, detail=e.message)
 
-@router.get("/{deal_id}", response_model=Deal)
-def get_deal(deal_id: str):
+@router.get("/export", summary="Stream all matching deals as NDJSON or CSV")
+async def export_deals(
+    customer_id: Optional[str] = None,
+    status: Optional[str] = None,
+    month: Optional[str] = None,  # e.g. "2025-07"
+    fmt: str = Depends(export_format_param),
+    fields: Optional[str] = Depends(fields_param),
+):
+    columns = resolve_columns(Deal, fields)
+    select = select_columns(Deal, fields)
+
+    def build_query():
+        query = async_supabase.table("deals").select(select)
+        if customer_id:
+            query = query.eq("customer_id", customer_id)
+        if status:
+            query = query.eq("status", status)
+        if month:
+            query = query.gte("sold_date", f"{month}-01").lte("sold_date", f"{month}-31")
+        return query
+
+    return await export_response(iter_rows(build_query), columns, fmt, "deals")
+
+@router.get("/{deal_id}", response_model=Deal, response_model_exclude_unset=True)
+def get_deal(deal_id: str, fields: Optional[str] = Depends(fields_param)):
+    columns = select_columns(Deal, fields)
     try:
         query_id = int(deal_id) if str(deal_id).isdigit() else deal_id
         res = (
             supabase
             .table("deals")
-            .select("*")
+            .select(columns)
             .eq("id", query_id)
             .maybe_single()
             .execute()
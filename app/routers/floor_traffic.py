@@ -6,7 +6,9 @@ from fastapi import APIRouter, HTTPException, status, Query
 from fastapi.encoders import jsonable_encoder
 from postgrest.exceptions import APIError
 
-from app.db import supabase
+from app.async_db import async_supabase
+from app.daily_metrics import FLOOR_COLUMNS, month_totals_async
+from app.projection import select_columns
 from app.models import (
     FloorTrafficCustomer,
     FloorTrafficCustomerCreate,
@@ -16,14 +18,14 @@ from app.models import (
 
 router = APIRouter()
 
-def _safe_select(cols: list[str]) -> str:
-    return "*"
+# Only the columns FloorTrafficCustomer serialises.
+FLOOR_TRAFFIC_COLUMNS = select_columns(FloorTrafficCustomer)
 
 
-def _create_deal_from_floor_record(record: dict):
+async def _create_deal_from_floor_record(record: dict):
     """Create a deal entry based on a floor traffic record."""
     try:
-        supabase.table("deals").insert({
+        await async_supabase.table("deals").insert({
             "customer_name": record.get("customer_name"),
             "salesperson": record.get("salesperson"),
             "stage": "new",
@@ -37,10 +39,10 @@ async def _fetch_range(start: date, end: date):
     start_dt = datetime.combine(start, datetime.min.time())
     end_dt = datetime.combine(end, datetime.min.time()) + timedelta(days=1)
     try:
-        res = (
-            supabase
+        res = await (
+            async_supabase
             .table("floor_traffic_customers")
-            .select("*")
+            .select(FLOOR_TRAFFIC_COLUMNS)
             .gte("visit_time", start_dt.isoformat())
             .lt("visit_time", end_dt.isoformat())
             .order("visit_time", desc=False)
@@ -112,8 +114,8 @@ async def create_floor_traffic(entry: FloorTrafficCustomerCreate):
     payload["customer_name"] = f"{first.strip()} {last.strip()}"
     print("POST PAYLOAD:", payload)
     try:
-        res = (
-            supabase
+        res = await (
+            async_supabase
             .table("floor_traffic_customers")
             .insert(payload)
             .execute()
@@ -131,7 +133,7 @@ async def create_floor_traffic(entry: FloorTrafficCustomerCreate):
     created = res.data[0]
 
     try:
-        supabase.table("contacts").insert({
+        await async_supabase.table("contacts").insert({
             "name": created.get("customer_name"),
             "email": created.get("email"),
             "phone": created.get("phone"),
@@ -140,7 +142,7 @@ async def create_floor_traffic(entry: FloorTrafficCustomerCreate):
         logging.warning("Failed to insert contact record; continuing without halting.")
 
     if created.get("sold"):
-        _create_deal_from_floor_record(created)
+        await _create_deal_from_floor_record(created)
 
     return created
 
@@ -150,8 +152,8 @@ async def update_floor_traffic(entry_id: str, entry: FloorTrafficCustomerUpdate)
     if not payload:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
     try:
-        res = (
-            supabase.table("floor_traffic_customers")
+        res = await (
+            async_supabase.table("floor_traffic_customers")
             .update(payload)
             .eq("id", entry_id)
             .execute()
@@ -163,7 +165,7 @@ async def update_floor_traffic(entry_id: str, entry: FloorTrafficCustomerUpdate)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entry not found")
     updated = res.data[0]
     if payload.get("sold"):
-        _create_deal_from_floor_record(updated)
+        await _create_deal_from_floor_record(updated)
     return updated
 
 @router.get(
@@ -172,44 +174,16 @@ async def update_floor_traffic(entry_id: str, entry: FloorTrafficCustomerUpdate)
     summary="Return month-to-date sales performance metrics.",
 )
 async def month_metrics():
-    today = date.today()
-    start = datetime.combine(today.replace(day=1), datetime.min.time())
-    # Handle December → January edge-case
-    if start.month == 12:
-        end = start.replace(year=start.year + 1, month=1)
-    else:
-        end = start.replace(month=start.month + 1)
-
     try:
-        res = (
-            supabase
-            .table("floor_traffic_customers")
-            .select("*")
-            .gte("visit_time", start.isoformat())
-            .lt("visit_time", end.isoformat())
-            .execute()
-        )
-        rows = res.data or []
+        totals = await month_totals_async(async_supabase, FLOOR_COLUMNS)
     except APIError as e:
         logging.error("floor_traffic.month_metrics query failed: %s", e)
-        return MonthMetrics(
-            total_customers=0,
-            demo_count=0,
-            worksheet_count=0,
-            customer_offer_count=0,
-            sold_count=0
-        )
-
-    total = len(rows)
-    demo = sum(1 for r in rows if r.get("demo"))
-    worksheet = sum(1 for r in rows if any(r.get(k) for k in ["worksheet", "write_up", "worksheet_complete"]))
-    customer_offer = sum(1 for r in rows if r.get("customer_offer"))
-    sold = sum(1 for r in rows if r.get("sold"))
+        totals = dict.fromkeys(FLOOR_COLUMNS, 0)
 
     return MonthMetrics(
-        total_customers=total,
-        demo_count=demo,
-        worksheet_count=worksheet,
-        customer_offer_count=customer_offer,
-        sold_count=sold,
+        total_customers=totals["visits"],
+        demo_count=totals["demos"],
+        worksheet_count=totals["worksheets"],
+        customer_offer_count=totals["offers"],
+        sold_count=totals["sold"],
     )
@@ -1,30 +1,24 @@
 import logging
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from postgrest.exceptions import APIError
 from app.db import supabase
-from app.models import InventoryItem, InventoryItemCreate, InventoryItemUpdate
+from app.async_db import async_supabase
+from app.export import export_format_param, export_response, iter_rows
+from app.inventory_aging import AgingSnapshot
+from app.inventory_index import inventory_index
+from app.models import InventoryItem, InventoryItemCreate, InventoryItemUpdate, InventorySearchResult
+from app.pagination import Page, decode_cursor, page_params
+from app.projection import fields_param, resolve_columns, select_columns
 
 router = APIRouter()
 
-@router.get(
-    "/",
-    response_model=list[InventoryItem],
-    summary="List inventory items with optional filters",
-)
-def list_inventory(
-    make: str | None = Query(None, description="Filter by make"),
-    model: str | None = Query(None, description="Filter by model"),
-    year_min: int | None = Query(None, description="Minimum year"),
-    year_max: int | None = Query(None, description="Maximum year"),
-    price_min: float | None = Query(None, description="Minimum selling price"),
-    price_max: float | None = Query(None, description="Maximum selling price"),
-    mileage_max: int | None = Query(None, description="Maximum mileage"),
-    inventory_type: str | None = Query(None, alias="type", description="Filter by type"),
-    exterior_color: str | None = Query(None, description="Filter by exterior color"),
-    fuel_type: str | None = Query(None, alias="fuelType", description="Filter by fuel type"),
-    drivetrain: str | None = Query(None, description="Filter by drivetrain"),
-):
-    query = supabase.table("inventory_with_days_in_stock").select("*")
+aging_snapshot = AgingSnapshot(inventory_index)
+
+def _filter_inventory(query, make=None, model=None, year_min=None, year_max=None,
+                      price_min=None, price_max=None, mileage_max=None,
+                      inventory_type=None, exterior_color=None, fuel_type=None,
+                      drivetrain=None):
+    """Apply the list/export query-string filters to an inventory query."""
     if make:
         query = query.ilike("make", f"%{make}%")
     if model:
@@ -47,18 +41,93 @@ def list_inventory(
         query = query.eq("fuel_type", fuel_type)
     if drivetrain:
         query = query.eq("drive_type", drivetrain)
+    return query
+
+def _search_index(page, make=None, model=None, year_min=None, year_max=None,
+                  price_min=None, price_max=None, mileage_max=None,
+                  inventory_type=None, exterior_color=None, fuel_type=None,
+                  drivetrain=None, with_facets=False):
+    """Run the list filters against the in-memory inventory index."""
+    after = None
+    if page.cursor:
+        after = decode_cursor(page.cursor).get("id")
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return inventory_index.search(
+        terms={
+            "make": make,
+            "model": model,
+            "type": inventory_type,
+            "exterior_color": exterior_color,
+            "fuel_type": fuel_type,
+            "drive_type": drivetrain,
+        },
+        ranges={
+            "year": (year_min, year_max),
+            "sellingprice": (price_min, price_max),
+            "mileage": (None, mileage_max),
+        },
+        after=after,
+        limit=None if page.limit is None else page.limit + 1,
+        with_facets=with_facets,
+    )
 
+def _project(rows, fields):
+    if not fields:
+        return rows
+    columns = resolve_columns(InventoryItem, fields)
+    return [{c: row[c] for c in columns if c in row} for row in rows]
+
+@router.get(
+    "/",
+    response_model=list[InventoryItem],
+    response_model_exclude_unset=True,
+    summary="List inventory items with optional filters",
+)
+def list_inventory(
+    make: str | None = Query(None, description="Filter by make"),
+    model: str | None = Query(None, description="Filter by model"),
+    year_min: int | None = Query(None, description="Minimum year"),
+    year_max: int | None = Query(None, description="Maximum year"),
+    price_min: float | None = Query(None, description="Minimum selling price"),
+    price_max: float | None = Query(None, description="Maximum selling price"),
+    mileage_max: int | None = Query(None, description="Maximum mileage"),
+    inventory_type: str | None = Query(None, alias="type", description="Filter by type"),
+    exterior_color: str | None = Query(None, description="Filter by exterior color"),
+    fuel_type: str | None = Query(None, alias="fuelType", description="Filter by fuel type"),
+    drivetrain: str | None = Query(None, description="Filter by drivetrain"),
+    response: Response = None,
+    page: Page = Depends(page_params),
+    fields: str | None = Depends(fields_param),
+):
+    filters = (make, model, year_min, year_max, price_min, price_max, mileage_max,
+               inventory_type, exterior_color, fuel_type, drivetrain)
+    columns = select_columns(InventoryItem, fields)
     try:
-        res = query.execute()
+        result = _search_index(page, *filters)
+        rows = page.finish_rows(result.rows, response, total=result.total)
+        return _project(rows, fields)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.warning("Inventory index unavailable, querying database: %s", e)
+
+    query = _filter_inventory(
+        supabase.table("inventory_with_days_in_stock").select(columns, count=page.count),
+        *filters,
+    )
+    try:
+        res = page.apply(query).execute()
     except APIError as e:
         logging.error("Error listing inventory: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
-    return res.data or []
+    return page.finish(res, response)
 
-@router.get("", include_in_schema=False, response_model=list[InventoryItem])
+@router.get("", include_in_schema=False, response_model=list[InventoryItem],
+            response_model_exclude_unset=True)
 def list_inventory_noslash(
     make: str | None = Query(None),
     model: str | None = Query(None),
@@ -71,104 +140,107 @@ def list_inventory_noslash(
     exterior_color: str | None = Query(None),
     fuel_type: str | None = Query(None, alias="fuelType"),
     drivetrain: str | None = Query(None),
+    response: Response = None,
+    page: Page = Depends(page_params),
+    fields: str | None = Depends(fields_param),
 ):
     return list_inventory(
         make, model, year_min, year_max, price_min, price_max,
         mileage_max, inventory_type, exterior_color,
-        fuel_type, drivetrain
+        fuel_type, drivetrain, response, page, fields
     )
 
-@router.get("/snapshot")
-def inventory_snapshot():
+@router.get(
+    "/search",
+    response_model=InventorySearchResult,
+    response_model_exclude_unset=True,
+    summary="Filter inventory from the in-memory index, with facet counts",
+)
+def search_inventory(
+    make: str | None = Query(None, description="Filter by make"),
+    model: str | None = Query(None, description="Filter by model"),
+    year_min: int | None = Query(None, description="Minimum year"),
+    year_max: int | None = Query(None, description="Maximum year"),
+    price_min: float | None = Query(None, description="Minimum selling price"),
+    price_max: float | None = Query(None, description="Maximum selling price"),
+    mileage_max: int | None = Query(None, description="Maximum mileage"),
+    inventory_type: str | None = Query(None, alias="type", description="Filter by type"),
+    exterior_color: str | None = Query(None, description="Filter by exterior color"),
+    fuel_type: str | None = Query(None, alias="fuelType", description="Filter by fuel type"),
+    drivetrain: str | None = Query(None, description="Filter by drivetrain"),
+    response: Response = None,
+    page: Page = Depends(page_params),
+    fields: str | None = Depends(fields_param),
+):
     try:
-        res = supabase.table("inventory_with_days_in_stock").select("*").execute()
-        data = res.data or []
-    except APIError as e:
-        logging.error("Error fetching inventory for snapshot: %s", e)
-        raise HTTPException(status_code=500, detail="Failed to fetch inventory")
-
-    new_cars = [rec for rec in data if str(rec.get("type", "")).lower() == "new"]
-    used_cars = [rec for rec in data if str(rec.get("type", "")).lower() == "used"]
-
+        result = _search_index(
+            page, make, model, year_min, year_max, price_min, price_max,
+            mileage_max, inventory_type, exterior_color, fuel_type, drivetrain,
+            with_facets=True,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error("Error loading inventory index: %s", e)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Inventory index unavailable")
+    rows = page.finish_rows(result.rows, response)
     return {
-        "new": summarize_inventory(new_cars),
-        "used": summarize_inventory(used_cars)
+        "total": result.total,
+        "items": _project(rows, fields),
+        "facets": result.facets,
     }
 
-def bucket_days(days):
-    if days is None:
-        return None
-    if days <= 30:
-        return "0-30"
-    elif days <= 45:
-        return "31-45"
-    elif days <= 60:
-        return "46-60"
-    elif days <= 90:
-        return "61-90"
-    else:
-        return "90+"
-
-def summarize_inventory(records):
-    out = {
-        "total": 0,
-        "avgDays": 0,
-        "turnRate": 0,
-        "buckets": {"0-30": 0, "31-45": 0, "46-60": 0, "61-90": 0, "90+": 0}
-    }
-    if not records:
-        return out
-
-    days_list = []
-    for rec in records:
-        days = (
-            rec.get("Days In Stock") or
-            rec.get("days_in_stock") or
-            rec.get("days_in_stock_dup") or
-            rec.get("DaysInStock")
+@router.get("/export", summary="Stream all matching inventory as NDJSON or CSV")
+async def export_inventory(
+    make: str | None = Query(None, description="Filter by make"),
+    model: str | None = Query(None, description="Filter by model"),
+    year_min: int | None = Query(None, description="Minimum year"),
+    year_max: int | None = Query(None, description="Maximum year"),
+    price_min: float | None = Query(None, description="Minimum selling price"),
+    price_max: float | None = Query(None, description="Maximum selling price"),
+    mileage_max: int | None = Query(None, description="Maximum mileage"),
+    inventory_type: str | None = Query(None, alias="type", description="Filter by type"),
+    exterior_color: str | None = Query(None, description="Filter by exterior color"),
+    fuel_type: str | None = Query(None, alias="fuelType", description="Filter by fuel type"),
+    drivetrain: str | None = Query(None, description="Filter by drivetrain"),
+    fmt: str = Depends(export_format_param),
+    fields: str | None = Depends(fields_param),
+):
+    columns = resolve_columns(InventoryItem, fields)
+    select = select_columns(InventoryItem, fields)
+
+    def build_query():
+        return _filter_inventory(
+            async_supabase.table("inventory_with_days_in_stock").select(select),
+            make, model, year_min, year_max, price_min, price_max, mileage_max,
+            inventory_type, exterior_color, fuel_type, drivetrain,
         )
-        if days is None:
-            continue
-        try:
-            days = int(days)
-        except Exception:
-            continue
-        days_list.append(days)
-        bucket = bucket_days(days)
-        if bucket:
-            out["buckets"][bucket] += 1
-
-    out["total"] = len(records)
-    out["avgDays"] = round(sum(days_list) / len(days_list), 1) if days_list else 0
-    out["turnRate"] = round(out["total"] / (sum(days_list) or 1), 2) if days_list else 0
-    return out
 
-@router.get("/snapshot-full")
-def inventory_snapshot_full():
+    return await export_response(iter_rows(build_query), columns, fmt, "inventory")
+
+@router.get("/snapshot")
+def inventory_snapshot():
     try:
-        res = supabase.table("inventory_with_days_in_stock").select("*").execute()
-        data = res.data or []
+        return aging_snapshot.summary()
     except APIError as e:
         logging.error("Error fetching inventory for snapshot: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch inventory")
 
-    new_cars = [rec for rec in data if str(rec.get("type", "")).lower() == "new"]
-    used_cars = [rec for rec in data if str(rec.get("type", "")).lower() == "used"]
-
-    return {
-        "new": summarize_inventory(new_cars),
-        "used": summarize_inventory(used_cars)
-    }
+@router.get("/snapshot-full")
+def inventory_snapshot_full():
+    return inventory_snapshot()
 
 # ----------- THESE ROUTES NEED TO USE UUIDS --------------
 
-@router.get("/{item_id}", response_model=InventoryItem)
-def get_inventory_item(item_id: int):   # UUID as string!
+@router.get("/{item_id}", response_model=InventoryItem, response_model_exclude_unset=True)
+def get_inventory_item(item_id: int, fields: str | None = Depends(fields_param)):   # UUID as string!
+    columns = select_columns(InventoryItem, fields)
     try:
         res = (
             supabase
             .table("inventory_with_days_in_stock")
-            .select("*")
+            .select(columns)
             .eq("id", item_id)
             .maybe_single()
             .execute()
@@ -196,6 +268,7 @@ def create_inventory_item(item: InventoryItemCreate):
         logging.error("Error creating inventory item: %s", e)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+    inventory_index.refresh(res.data[0]["id"])
     return res.data[0]
 
 @router.post("", include_in_schema=False, response_model=InventoryItem, status_code=status.HTTP_201_CREATED)
@@ -221,6 +294,7 @@ def update_inventory_item(item_id: str, item: InventoryItemUpdate):  # UUID as s
 
     if not res.data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
+    inventory_index.refresh(item_id)
     return res.data[0]
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -233,4 +307,5 @@ def delete_inventory_item(item_id: int):   # UUID as string!
 
     if not res.data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
+    inventory_index.remove(item_id)
     return
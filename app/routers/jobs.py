@@ -0,0 +1,30 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.job_queue import JOB_QUEUE_ENABLED, job_queue
+from app.jobs import jobs
+
+router = APIRouter()
+
+
+@router.get("/")
+async def list_jobs(kind: str | None = None, status: str | None = None,
+                    limit: int = Query(50, ge=1, le=500)):
+    """Newest queued jobs first (empty when the durable queue is off)."""
+    if not JOB_QUEUE_ENABLED:
+        return []
+    return await asyncio.to_thread(job_queue.recent, kind, status, limit)
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Status of a queued job, or of an in-process one started by this API worker."""
+    job = jobs.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    if JOB_QUEUE_ENABLED:
+        body = await asyncio.to_thread(job_queue.get, job_id)
+        if body is not None:
+            return body
+    raise HTTPException(status_code=404, detail="Job not found")
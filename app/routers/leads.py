@@ -1,12 +1,16 @@
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Response
 from uuid import UUID
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 from postgrest.exceptions import APIError
-from datetime import datetime, date
 
 from app.db import supabase
+from app.async_db import async_supabase
+from app.cache import TTLCache
+from app.daily_metrics import LEAD_COLUMNS, month_totals
 from app.openai_client import get_openai_client
+from app.pagination import Page, page_params
+from app.projection import fields_param, select_columns
 
 import os
 import openai
@@ -18,6 +22,13 @@ openai_client = openai.AsyncOpenAI(api_key=api_key) if api_key else None
 
 router = APIRouter()
 
+# Lead KPIs are aggregated by the ``lead_kpis`` RPC and cached briefly;
+# lead writes through this router drop the cached value.
+LEAD_KPI_TTL = float(os.getenv("LEAD_KPI_TTL", "30"))
+# How many recent leads ``/prioritized`` hands to the ranker.
+PRIORITY_CANDIDATES = int(os.getenv("LEAD_PRIORITY_CANDIDATES", "50"))
+_kpi_cache = TTLCache(ttl=LEAD_KPI_TTL, maxsize=1)
+
 class LeadCreate(BaseModel):
     name: str
     email: EmailStr
@@ -27,12 +38,17 @@ class Lead(BaseModel):
     name: str
     email: EmailStr
 
-@router.get("/", response_model=List[Lead])
-@router.get("", response_model=List[Lead], include_in_schema=False)
-def list_leads():
-    """Return all leads."""
-    res = supabase.table("leads").select("*").execute()
-    return res.data
+@router.get("/", response_model=List[Lead], response_model_exclude_unset=True)
+@router.get("", response_model=List[Lead], response_model_exclude_unset=True, include_in_schema=False)
+def list_leads(
+    response: Response,
+    page: Page = Depends(page_params),
+    fields: Optional[str] = Depends(fields_param),
+):
+    """Return one page of leads."""
+    query = supabase.table("leads").select(select_columns(Lead, fields), count=page.count)
+    res = page.apply(query).execute()
+    return page.finish(res, response)
 
 
 @router.post("/", response_model=Lead, status_code=201)
@@ -45,6 +61,7 @@ def create_lead(lead: LeadCreate):
         raise HTTPException(400, e.message)
 
     created = res.data
+    _kpi_cache.invalidate()
 
     # Also create a contact record for this lead. Ignore errors so the lead
     # itself is still saved if the contact insert fails (e.g. due to duplicates
@@ -77,6 +94,7 @@ def update_lead(lead_id: int = Path(..., gt=0), lead: LeadCreate = None):
         raise HTTPException(400, e.message)
     if not res.data:
         raise HTTPException(404, f"Lead with id={lead_id} not found")
+    _kpi_cache.invalidate()
     return res.data
 
 @router.delete("/{lead_id:int}", status_code=204)
@@ -87,43 +105,48 @@ def delete_lead(lead_id: int = Path(..., gt=0)):
         raise HTTPException(400, e.message)
     if res.count == 0:
         raise HTTPException(404, f"Lead with id={lead_id} not found")
+    _kpi_cache.invalidate()
     return
 
 
 # ── Additional AI/analytics endpoints ─────────────────────────────────────────
 
-def _fetch_all_leads():
-    res = supabase.table("leads").select("*").execute()
-    return res.data or []
-
-
 @router.get("/awaiting-response", response_model=List[Lead])
 def leads_awaiting_response():
     """Leads who have responded but haven't received a follow-up."""
-    leads = _fetch_all_leads()
-    pending = [
-        l
-        for l in leads
-        if l.get("last_lead_response_at")
-        and (
-            not l.get("last_staff_response_at")
-            or l.get("last_staff_response_at") < l.get("last_lead_response_at")
+    try:
+        res = (
+            supabase.table("leads_awaiting_response")
+            .select(select_columns(Lead))
+            .order("last_lead_response_at", desc=True)
+            .execute()
         )
-    ]
-    return pending
+    except APIError as e:
+        raise HTTPException(400, e.message)
+    return res.data or []
+
+
+async def _recent_leads(limit: int):
+    res = await (
+        async_supabase.table("leads")
+        .select("*")
+        .order("last_lead_response_at", desc=True, nullsfirst=False)
+        .limit(limit)
+        .execute()
+    )
+    return res.data or []
 
 
 @router.get("/prioritized", response_model=List[Lead])
 async def prioritized_leads():
-    """Return top 10 leads ranked by ChatGPT."""
-    leads = _fetch_all_leads()
+    """Return top 10 of the most recently active leads, ranked by ChatGPT."""
+    leads = await _recent_leads(PRIORITY_CANDIDATES)
     if not leads:
         return []
 
     client = get_openai_client()
     if not client:
-        # simple heuristic fallback
-        leads.sort(key=lambda l: l.get("last_lead_response_at") or "", reverse=True)
+        # simple heuristic fallback: already ordered by last response
         return leads[:10]
 
     prompt = (
@@ -140,10 +163,10 @@ async def prioritized_leads():
         content = chat.choices[0].message.content
         ids = json.loads(content)
     except Exception:
-        leads.sort(key=lambda l: l.get("last_lead_response_at") or "", reverse=True)
         return leads[:10]
 
-    ordered = [next((l for l in leads if l["id"] == i), None) for i in ids]
+    by_id = {l["id"]: l for l in leads}
+    ordered = [by_id.get(i) for i in ids if isinstance(i, (str, int))]
     ordered = [l for l in ordered if l]
     return ordered[:10]
 
@@ -156,8 +179,19 @@ class AskPayload(BaseModel):
 @router.post("/ask")
 async def ask_lead_question(payload: AskPayload):
     """Allow users to ask questions or generate messages about a lead."""
-    leads = _fetch_all_leads()
-    lead = next((l for l in leads if l["id"] == payload.lead_id), None)
+    lead = None
+    if payload.lead_id is not None:
+        try:
+            res = await (
+                async_supabase.table("leads")
+                .select("*")
+                .eq("id", payload.lead_id)
+                .maybe_single()
+                .execute()
+            )
+            lead = res.data if res else None
+        except APIError as e:
+            logging.warning("Lead %s lookup failed: %s", payload.lead_id, e)
     context = f"Lead info: {json.dumps(lead)}" if lead else ""
     prompt = f"{payload.question}\n{context}"
     client = get_openai_client()
@@ -174,55 +208,35 @@ async def ask_lead_question(payload: AskPayload):
         raise HTTPException(500, str(e))
 
 
-@router.get("/metrics")
-def lead_metrics():
-    """Return simple sales KPIs."""
-    leads = _fetch_all_leads()
-    total = len(leads)
-
-    engaged = [l for l in leads if l.get("last_lead_response_at")]
-    engagement_rate = round(len(engaged) / total * 100, 2) if total else 0.0
-
-    response_deltas = []
-    for l in engaged:
-        if l.get("last_staff_response_at"):
-            try:
-                la = datetime.fromisoformat(l["last_lead_response_at"])
-                sa = datetime.fromisoformat(l["last_staff_response_at"])
-                response_deltas.append((sa - la).total_seconds())
-            except Exception:
-                pass
-
-    avg_response_time = sum(response_deltas) / len(response_deltas) if response_deltas else 0.0
-
-    conversion_rate = round(len(engaged) / total * 100, 2) if total else 0.0
-
+def _lead_kpis():
+    res = supabase.rpc("lead_kpis").execute()
+    row = res.data[0] if isinstance(res.data, list) and res.data else res.data or {}
+    total = row.get("total_leads") or 0
+    engaged = row.get("engaged_leads") or 0
+    engagement_rate = round(engaged / total * 100, 2) if total else 0.0
     return {
         "total_leads": total,
-        "conversion_rate": conversion_rate,
-        "average_response_time": avg_response_time,
+        "conversion_rate": engagement_rate,
+        "average_response_time": float(row.get("avg_response_seconds") or 0.0),
         "lead_engagement_rate": engagement_rate,
     }
 
 
+@router.get("/metrics")
+def lead_metrics():
+    """Return simple sales KPIs."""
+    try:
+        return _kpi_cache.get_or_set("all", _lead_kpis)
+    except APIError as e:
+        logging.error("lead_kpis RPC failed: %s", e.message)
+        raise HTTPException(500, e.message)
+
+
 @router.get("/month-metrics")
 def month_metrics():
     """Return month-to-date lead metrics."""
-    today = date.today()
-    start = datetime.combine(today.replace(day=1), datetime.min.time())
-    if start.month == 12:
-        end = start.replace(year=start.year + 1, month=1)
-    else:
-        end = start.replace(month=start.month + 1)
-
     try:
-        res = (
-            supabase.table("leads")
-            .select("*")
-            .gte("created_at", start.isoformat())
-            .lt("created_at", end.isoformat())
-            .execute()
-        )
+        totals = month_totals(supabase, LEAD_COLUMNS)
     except APIError as e:
         logging.error("Supabase query failed: %s", e.message)
         return {
@@ -232,28 +246,14 @@ def month_metrics():
             "lead_engagement_rate": 0,
         }
 
-    rows = res.data or []
-    total = len(rows)
-    engaged = [r for r in rows if r.get("last_lead_response_at")]
-    engagement_rate = round(len(engaged) / total * 100, 2) if total else 0.0
-
-    response_deltas = []
-    for r in engaged:
-        if r.get("last_staff_response_at"):
-            try:
-                la = datetime.fromisoformat(r["last_lead_response_at"])
-                sa = datetime.fromisoformat(r["last_staff_response_at"])
-                response_deltas.append((sa - la).total_seconds())
-            except Exception:
-                pass
-
-    avg_response_time = sum(response_deltas) / len(response_deltas) if response_deltas else 0.0
-
-    conversion_rate = engagement_rate
+    total = totals["leads"]
+    engagement_rate = round(totals["engaged_leads"] / total * 100, 2) if total else 0.0
+    responded = totals["responded_leads"]
+    avg_response_time = totals["response_seconds"] / responded if responded else 0.0
 
     return {
         "total_leads": total,
-        "conversion_rate": conversion_rate,
+        "conversion_rate": engagement_rate,
         "average_response_time": avg_response_time,
         "lead_engagement_rate": engagement_rate,
     }
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from postgrest.exceptions import APIError
 from app.db import supabase
 from app.models import Opportunity, OpportunityCreate, OpportunityUpdate
+from app.pagination import Page, page_params
 
 router = APIRouter()
 
 @router.get("/", response_model=list[Opportunity])
 @router.get("", response_model=list[Opportunity], include_in_schema=False)
-def list_opportunities():
-    res = supabase.table("opportunities").select("*").execute()
-    return res.data
+def list_opportunities(response: Response, page: Page = Depends(page_params)):
+    query = supabase.table("opportunities").select("*", count=page.count)
+    res = page.apply(query).execute()
+    return page.finish(res, response)
 
 @router.get("/{opp_id}", response_model=Opportunity)
 def get_opportunity(opp_id: int):
@@ -0,0 +1,61 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.batch_pricing import REPORT_COLUMNS, run_batch_pricing
+from app.export import export_format_param, export_response
+from app.job_queue import JOB_QUEUE_ENABLED, job_queue
+from app.jobs import DONE, jobs
+
+router = APIRouter()
+
+JOB_KIND = "batch-pricing"
+
+job_queue.task(JOB_KIND)(run_batch_pricing)
+
+
+async def _get_job(job_id: str):
+    # In-process jobs are only visible to the API worker that started them;
+    # multi-worker deployments need JOB_QUEUE_ENABLED so any worker finds them.
+    job = jobs.get(job_id, kind=JOB_KIND)
+    if job is None and JOB_QUEUE_ENABLED:
+        job = await asyncio.to_thread(job_queue.get_job, job_id, JOB_KIND)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Pricing job not found")
+    return job
+
+
+@router.post("/batch", status_code=status.HTTP_202_ACCEPTED)
+async def start_batch_pricing(live: bool = True, zipcode: str = "76504",
+                              idempotency_key: str | None = Header(None)):
+    """Start pricing every inventory unit; poll ``/batch/{job_id}`` for progress."""
+    if JOB_QUEUE_ENABLED:
+        queued = await asyncio.to_thread(
+            job_queue.enqueue, JOB_KIND, {"live": live, "zipcode": zipcode}, idempotency_key,
+        )
+        return {**queued, "status_url": f"/api/pricing/batch/{queued['id']}"}
+    job = jobs.start(JOB_KIND, lambda job: run_batch_pricing(job, live=live, zipcode=zipcode))
+    return {**job.to_dict(), "status_url": f"/api/pricing/batch/{job.id}"}
+
+
+@router.get("/batch/{job_id}")
+async def batch_pricing_status(job_id: str):
+    job = await _get_job(job_id)
+    body = job.to_dict()
+    if job.status == DONE:
+        body["report_url"] = f"/api/pricing/batch/{job.id}/report"
+    return body
+
+
+@router.get("/batch/{job_id}/report")
+async def batch_pricing_report(job_id: str, fmt: str = Depends(export_format_param)):
+    """Download the finished report as CSV or NDJSON."""
+    job = await _get_job(job_id)
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Pricing job is {job.status}")
+
+    async def rows():
+        for row in job.result:
+            yield row
+
+    return await export_response(rows(), REPORT_COLUMNS, fmt, f"pricing-{job.id[:8]}")
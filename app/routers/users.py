@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Response
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from typing import Literal
 from postgrest.exceptions import APIError
 from app.db import supabase
+from app.pagination import Page, page_params
 
 router = APIRouter()
 
@@ -24,12 +25,13 @@ class User(BaseModel):
 # ─── Endpos ────────────────────────────────────────────────────────────────────
 
 @router.get("/", response_model=list[User])
-def list_users():
+def list_users(response: Response, page: Page = Depends(page_params)):
     try:
-        res = supabase.table("users").select("*").execute()
+        query = supabase.table("users").select("*", count=page.count)
+        res = page.apply(query).execute()
     except APIError as e:
         raise HTTPException(500, detail=e.message)
-    return res.data
+    return page.finish(res, response)
 
 @router.get("/{user_id}", response_model=User)
 def get_user(user_id: str = Path(..., description="The ID of the user to retrieve")):
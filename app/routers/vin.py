@@ -1,59 +1,173 @@
 # app/routers/vin.py
 
-import requests
+import asyncio
+import logging
+import os
+
+import httpx
 from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from app.http_cache import CachingTransport, http_cache
+from app.vin_decoder import InvalidVIN, decode_local, normalize_vin
+
+logger = logging.getLogger("vin")
 
 router = APIRouter()
 
-@router.get("/decode/{vin}")
-def decode_vin(vin: str):
-    """
-    Decode a VIN using NHTSA's free public API.
-    Returns key vehicle fields for autofill.
-    """
-    vin = vin.strip().upper()
-    if len(vin) != 17:
-        raise HTTPException(status_code=400, detail="VIN must be 17 characters.")
+VPIC_TIMEOUT = float(os.getenv("VPIC_TIMEOUT", "10"))
+VIN_BATCH_MAX = int(os.getenv("VIN_BATCH_MAX", "500"))
+VIN_BATCH_CONCURRENCY = int(os.getenv("VIN_BATCH_CONCURRENCY", "8"))
+
+# Decodes never change, so vPIC responses are kept in the disk cache for a year.
+vpic_client = httpx.Client(transport=CachingTransport(httpx.HTTPTransport(), http_cache),
+                           timeout=VPIC_TIMEOUT)
+
+# Fields only vPIC can provide (they live in the manufacturer-specific VDS).
+VPIC_FIELDS = {
+    "model": ("Model",),
+    "trim": ("Trim",),
+    "body": ("Body Class",),
+    "engine": ("Engine Model", "Engine Manufacturer"),
+    "fuel_type": ("Fuel Type - Primary",),
+    "series": ("Series",),
+    "doors": ("Doors",),
+    # Uncomment or add more fields as needed:
+    # "plant": ("Plant Country",),
+    # "gvwr": ("GVWR",),
+}
+
+
+def vpic_url(vin: str) -> str:
+    return f"https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVin/{vin}?format=json"
 
-    url = f"https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVin/{vin}?format=json"
 
+def vpic_decode(vin: str) -> dict | None:
+    """Fields decoded by NHTSA vPIC, or None if it can't be reached."""
+    url = vpic_url(vin)
     try:
-        resp = requests.get(url, timeout=10)
+        resp = vpic_client.get(url)
         resp.raise_for_status()
+        data = resp.json()
     except Exception as e:
-        print("VIN decode error:", e)
-        raise HTTPException(status_code=502, detail="Failed to reach NHTSA VIN API.")
-
-    data = resp.json()
-    if not data or "Results" not in data or not isinstance(data["Results"], list):
-        raise HTTPException(status_code=502, detail="No results from VIN decoder.")
-
-    def get_var(var):
-        val = next(
-            (r.get('Value') for r in data["Results"] if r.get("Variable") == var), None
-        )
-        # Filter out unhelpful values
-        if val and val not in ["Not Applicable", "0", "", None]:
-            return val
+        logger.warning("VIN decode error for %s: %s", vin, e)
         return None
+    if not data or not isinstance(data.get("Results"), list):
+        return None
+
+    values = {r.get("Variable"): r.get("Value") for r in data["Results"]}
+
+    def get_var(*names):
+        for name in names:
+            val = values.get(name)
+            # Filter out unhelpful values
+            if val and val not in ["Not Applicable", "0", ""]:
+                return val
+        return None
+
+    decoded = {field: get_var(*names) for field, names in VPIC_FIELDS.items()}
+    year = get_var("Model Year")
+    decoded["year"] = int(year) if year and year.isdigit() else None
+    decoded["make"] = get_var("Make")
+    return decoded
 
-    result = {
-        "year": get_var("Model Year"),
-        "make": get_var("Make"),
-        "model": get_var("Model"),
-        "trim": get_var("Trim"),
-        "body": get_var("Body Class"),
-        "engine": get_var("Engine Model") or get_var("Engine Manufacturer"),
-        "fuel_type": get_var("Fuel Type - Primary"),
-        "series": get_var("Series"),
-        "doors": get_var("Doors"),
-        # Uncomment or add more fields as needed:
-        # "plant": get_var("Plant Country"),
-        # "gvwr": get_var("GVWR"),
+
+def decode(vin: str, local: bool = False) -> dict:
+    """Local decode, completed from vPIC unless ``local`` is set.
+
+    vPIC's model year wins over the local one, which is a best guess for
+    VINs outside the North American position 7 convention; everything else
+    decoded locally is kept.  ``year`` is always an int.  Raises
+    ``InvalidVIN`` for a malformed VIN.
+    """
+    result = decode_local(vin)
+    result.update({field: None for field in VPIC_FIELDS})
+    result["source"] = "local"
+    if local:
+        return result
+
+    remote = vpic_decode(result["vin"])
+    if remote is None:
+        result["partial"] = True
+        return result
+    for field, value in remote.items():
+        if result.get(field) is None or (field == "year" and value):
+            result[field] = value
+    result["source"] = "local+vpic"
+    return result
+
+
+def _usable(result: dict) -> bool:
+    return any([result["year"], result["make"], result["model"]])
+
+
+def _decode_if_cached(vin: str) -> dict | None:
+    """``decode(vin)`` when vPIC's answer is already cached, else None."""
+    if vpic_url(vin) not in http_cache:
+        return None
+    return decode(vin)
+
+
+class VinBatchRequest(BaseModel):
+    vins: list[str] = Field(..., max_length=VIN_BATCH_MAX)
+    local: bool = False
+
+
+@router.post("/decode-batch")
+async def decode_vin_batch(req: VinBatchRequest):
+    """
+    Decode many VINs in one request.
+    Duplicates are decoded once. Offline decodes and VINs already in the HTTP
+    cache are answered immediately; the rest go to vPIC at most
+    ``VIN_BATCH_CONCURRENCY`` at a time. ``results`` holds one entry per
+    requested VIN, in request order (repeats included): either a decode or
+    ``{"vin", "error"}``.
+    """
+    requested = [normalize_vin(v) for v in req.vins]
+    vins = list(dict.fromkeys(requested))
+    semaphore = asyncio.Semaphore(VIN_BATCH_CONCURRENCY)
+
+    async def one(vin: str) -> dict:
+        try:
+            if req.local:
+                result = decode(vin, local=True)
+            else:
+                # The cache is a SQLite file, so even hits stay off the loop.
+                result = await asyncio.to_thread(_decode_if_cached, vin)
+                if result is None:
+                    decode_local(vin)  # reject malformed VINs before queueing
+                    async with semaphore:
+                        result = await asyncio.to_thread(decode, vin)
+        except InvalidVIN as e:
+            return {"vin": vin, "error": str(e)}
+        if not _usable(result):
+            return {"vin": vin, "error": "Could not decode this VIN."}
+        return result
+
+    decoded = dict(zip(vins, await asyncio.gather(*(one(vin) for vin in vins))))
+    results = [decoded[vin] for vin in requested]
+    return {
+        "count": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "results": results,
     }
 
+
+@router.get("/decode/{vin}")
+def decode_vin(vin: str, local: bool = False):
+    """
+    Decode a VIN for autofill.
+    Year, make and manufacturer are decoded offline from the VIN itself;
+    NHTSA's free vPIC API fills in model, trim, engine, etc. Pass
+    ``?local=true`` to skip vPIC and get the instant partial result.
+    """
+    try:
+        result = decode(normalize_vin(vin), local=local)
+    except InvalidVIN as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # If no useful decode, return 404
-    if not any([result["year"], result["make"], result["model"]]):
+    if not _usable(result):
         raise HTTPException(status_code=404, detail="Could not decode this VIN.")
 
     return result
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -8,6 +8,19 @@ class SignalIn(BaseModel):
     value: float
     metadata: Dict[str, Any] = {}
 
+class SignalBatchItem(SignalIn):
+    customer_id: UUID
+    created_at: Optional[datetime] = None
+
+class SignalItemError(BaseModel):
+    index: int
+    error: str
+
+class SignalBatchResult(BaseModel):
+    inserted: int
+    rejected: int
+    errors: List[SignalItemError]
+
 class BreakdownItem(BaseModel):
     signal_type: str
     weight: float
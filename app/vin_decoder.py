@@ -0,0 +1,208 @@
+# app/vin_decoder.py
+
+"""Offline VIN decoding.
+
+Everything that can be read from the VIN itself is resolved locally, without
+a network call:
+
+* characters are validated and the position 9 check digit verified
+  (mandatory for North American VINs, informational elsewhere);
+* the model year comes from position 10; the 30-year code cycle is settled
+  by position 7 where that convention applies (North American cars, light
+  trucks and MPVs), otherwise the latest cycle not in the future is used;
+* manufacturer, make and country come from the bundled ``WMI`` table
+  (positions 1-3).
+
+Model, trim, body, engine and similar details are in the manufacturer's VDS
+(positions 4-8), which is not standardised, so ``app.routers.vin`` asks NHTSA
+vPIC only for those.
+"""
+
+from datetime import date
+
+VIN_LENGTH = 17
+VIN_CHARS = set("0123456789ABCDEFGHJKLMNPRSTUVWXYZ")  # no I, O or Q
+
+TRANSLITERATION = {
+    **{str(d): d for d in range(10)},
+    "A": 1, "B": 2, "C": 3, "D": 4, "E": 5, "F": 6, "G": 7, "H": 8,
+    "J": 1, "K": 2, "L": 3, "M": 4, "N": 5, "P": 7, "R": 9,
+    "S": 2, "T": 3, "U": 4, "V": 5, "W": 6, "X": 7, "Y": 8, "Z": 9,
+}
+WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+# Position 10 codes in order; the cycle repeats every 30 years from 1980.
+YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"
+
+# VINs starting with these characters are North American, where the check
+# digit is required.
+NORTH_AMERICA = set("12345")
+
+# North American WMIs of motorcycles and heavy trucks, whose position 7 does
+# not follow the letter-means-2010+ convention (49 CFR 565.15 only requires
+# it for passenger cars, MPVs and trucks up to 10,000 lb GVWR).
+YEAR_CYCLE_EXEMPT = {
+    "1HD", "5HD",  # Harley-Davidson
+    "1FU", "1FV", "3AK",  # Freightliner
+    "1XK", "2XK",  # Kenworth
+    "1XP", "2XP",  # Peterbilt
+    "1M1", "1M2",  # Mack
+    "4V4", "4V5",  # Volvo Trucks
+    "1HT", "3HA", "3HS",  # International
+}
+
+COUNTRIES = {
+    "1": "United States", "4": "United States", "5": "United States",
+    "2": "Canada", "3": "Mexico", "6": "Australia", "9": "Brazil",
+    "J": "Japan", "K": "South Korea", "L": "China", "S": "United Kingdom",
+    "V": "France", "W": "Germany", "Y": "Sweden", "Z": "Italy",
+}
+
+# WMI -> (manufacturer, make).  make is None where one WMI is shared by
+# several brands (e.g. Stellantis' 1C4); vPIC fills it in.
+WMI = {
+    # Ford / Lincoln
+    "1FA": ("Ford Motor Company", "Ford"), "1FB": ("Ford Motor Company", "Ford"),
+    "1FC": ("Ford Motor Company", "Ford"), "1FD": ("Ford Motor Company", "Ford"),
+    "1FM": ("Ford Motor Company", "Ford"), "1FT": ("Ford Motor Company", "Ford"),
+    "1ZV": ("Ford Motor Company", "Ford"), "2FA": ("Ford Motor Company", "Ford"),
+    "2FM": ("Ford Motor Company", "Ford"), "2FT": ("Ford Motor Company", "Ford"),
+    "3FA": ("Ford Motor Company", "Ford"), "1LN": ("Ford Motor Company", "Lincoln"),
+    "5LM": ("Ford Motor Company", "Lincoln"),
+    # General Motors
+    "1G1": ("General Motors", "Chevrolet"), "1GC": ("General Motors", "Chevrolet"),
+    "1GN": ("General Motors", "Chevrolet"), "1GB": ("General Motors", "Chevrolet"),
+    "2G1": ("General Motors", "Chevrolet"), "3G1": ("General Motors", "Chevrolet"),
+    "3GC": ("General Motors", "Chevrolet"), "3GN": ("General Motors", "Chevrolet"),
+    "KL7": ("General Motors", "Chevrolet"), "KL8": ("General Motors", "Chevrolet"),
+    "1GT": ("General Motors", "GMC"), "2GT": ("General Motors", "GMC"),
+    "3GT": ("General Motors", "GMC"), "1GK": ("General Motors", "GMC"),
+    "1G4": ("General Motors", "Buick"), "5GA": ("General Motors", "Buick"),
+    "KL4": ("General Motors", "Buick"), "1G6": ("General Motors", "Cadillac"),
+    "1GY": ("General Motors", "Cadillac"), "1G2": ("General Motors", "Pontiac"),
+    "1G8": ("General Motors", "Saturn"),
+    # Stellantis (FCA US)
+    "1C3": ("FCA US LLC", "Chrysler"), "1C4": ("FCA US LLC", None),
+    "2C3": ("FCA US LLC", None), "2C4": ("FCA US LLC", None),
+    "1C6": ("FCA US LLC", "Ram"), "3C6": ("FCA US LLC", "Ram"),
+    "3C7": ("FCA US LLC", "Ram"), "1J4": ("FCA US LLC", "Jeep"),
+    "1J8": ("FCA US LLC", "Jeep"), "1B3": ("FCA US LLC", "Dodge"),
+    "1B7": ("FCA US LLC", "Dodge"), "1D7": ("FCA US LLC", "Dodge"),
+    "2B3": ("FCA US LLC", "Dodge"), "3D7": ("FCA US LLC", "Dodge"),
+    "ZFA": ("FCA Italy", "Fiat"), "ZAR": ("FCA Italy", "Alfa Romeo"),
+    # Honda / Acura
+    "1HG": ("Honda", "Honda"), "2HG": ("Honda", "Honda"), "2HK": ("Honda", "Honda"),
+    "5FN": ("Honda", "Honda"), "5J6": ("Honda", "Honda"), "JHM": ("Honda", "Honda"),
+    "19X": ("Honda", "Honda"), "19U": ("Honda", "Acura"), "JH4": ("Honda", "Acura"),
+    "5J8": ("Honda", "Acura"),
+    # Toyota / Lexus
+    "4T1": ("Toyota", "Toyota"), "4T3": ("Toyota", "Toyota"), "4T4": ("Toyota", "Toyota"),
+    "5TD": ("Toyota", "Toyota"), "5TF": ("Toyota", "Toyota"), "2T1": ("Toyota", "Toyota"),
+    "2T3": ("Toyota", "Toyota"), "JTD": ("Toyota", "Toyota"), "JTE": ("Toyota", "Toyota"),
+    "JTM": ("Toyota", "Toyota"), "JTN": ("Toyota", "Toyota"), "JTH": ("Toyota", "Lexus"),
+    "JTJ": ("Toyota", "Lexus"), "2T2": ("Toyota", "Lexus"), "58A": ("Toyota", "Lexus"),
+    # Nissan / Infiniti
+    "1N4": ("Nissan", "Nissan"), "1N6": ("Nissan", "Nissan"), "3N1": ("Nissan", "Nissan"),
+    "5N1": ("Nissan", "Nissan"), "JN1": ("Nissan", "Nissan"), "JN8": ("Nissan", "Nissan"),
+    "JNK": ("Nissan", "Infiniti"), "5N3": ("Nissan", "Infiniti"),
+    # Hyundai / Kia / Genesis
+    "KMH": ("Hyundai", "Hyundai"), "KM8": ("Hyundai", "Hyundai"),
+    "5NP": ("Hyundai", "Hyundai"), "5NM": ("Hyundai", "Hyundai"),
+    "KMT": ("Hyundai", "Genesis"), "KNA": ("Kia", "Kia"), "KND": ("Kia", "Kia"),
+    "5XX": ("Kia", "Kia"), "5XY": ("Kia", "Kia"), "3KP": ("Kia", "Kia"),
+    # Subaru / Mazda / Mitsubishi / Suzuki
+    "JF1": ("Subaru", "Subaru"), "JF2": ("Subaru", "Subaru"),
+    "4S3": ("Subaru", "Subaru"), "4S4": ("Subaru", "Subaru"),
+    "JM1": ("Mazda", "Mazda"), "JM3": ("Mazda", "Mazda"), "3MZ": ("Mazda", "Mazda"),
+    "JA3": ("Mitsubishi", "Mitsubishi"), "JA4": ("Mitsubishi", "Mitsubishi"),
+    "JS2": ("Suzuki", "Suzuki"),
+    # German
+    "WBA": ("BMW", "BMW"), "WBS": ("BMW", "BMW"), "5UX": ("BMW", "BMW"),
+    "5YM": ("BMW", "BMW"), "4US": ("BMW", "BMW"), "WMW": ("BMW", "MINI"),
+    "WDD": ("Mercedes-Benz", "Mercedes-Benz"), "WDB": ("Mercedes-Benz", "Mercedes-Benz"),
+    "WDC": ("Mercedes-Benz", "Mercedes-Benz"), "W1K": ("Mercedes-Benz", "Mercedes-Benz"),
+    "W1N": ("Mercedes-Benz", "Mercedes-Benz"), "4JG": ("Mercedes-Benz", "Mercedes-Benz"),
+    "55S": ("Mercedes-Benz", "Mercedes-Benz"),
+    "WAU": ("Audi", "Audi"), "WA1": ("Audi", "Audi"), "WUA": ("Audi", "Audi"),
+    "WVW": ("Volkswagen", "Volkswagen"), "WVG": ("Volkswagen", "Volkswagen"),
+    "1VW": ("Volkswagen", "Volkswagen"), "3VW": ("Volkswagen", "Volkswagen"),
+    "WP0": ("Porsche", "Porsche"), "WP1": ("Porsche", "Porsche"),
+    # Others
+    "YV1": ("Volvo Cars", "Volvo"), "YV4": ("Volvo Cars", "Volvo"),
+    "7JR": ("Volvo Cars", "Volvo"), "SAL": ("Jaguar Land Rover", "Land Rover"),
+    "SAJ": ("Jaguar Land Rover", "Jaguar"), "SAD": ("Jaguar Land Rover", "Jaguar"),
+    "ZFF": ("Ferrari", "Ferrari"), "5YJ": ("Tesla", "Tesla"), "7SA": ("Tesla", "Tesla"),
+    "LRW": ("Tesla", "Tesla"), "1HD": ("Harley-Davidson", "Harley-Davidson"),
+}
+
+
+class InvalidVIN(ValueError):
+    """The VIN is malformed (length, characters or check digit)."""
+
+
+def normalize_vin(vin: str) -> str:
+    return (vin or "").strip().upper()
+
+
+def check_digit(vin: str) -> str:
+    """Expected position 9 character for ``vin`` ("0"-"9" or "X")."""
+    total = sum(TRANSLITERATION[c] * w for c, w in zip(vin, WEIGHTS))
+    remainder = total % 11
+    return "X" if remainder == 10 else str(remainder)
+
+
+def validate_vin(vin: str) -> bool:
+    """Raise ``InvalidVIN`` for a malformed VIN; return whether the check digit matches."""
+    if len(vin) != VIN_LENGTH:
+        raise InvalidVIN("VIN must be 17 characters.")
+    bad = sorted(set(vin) - VIN_CHARS)
+    if bad:
+        raise InvalidVIN(f"VIN contains invalid characters: {''.join(bad)}")
+    valid = vin[8] == check_digit(vin)
+    if not valid and vin[0] in NORTH_AMERICA:
+        raise InvalidVIN("VIN check digit is invalid.")
+    return valid
+
+
+def uses_position7_cycle(vin: str) -> bool:
+    """Whether position 7 tells the model-year cycle apart for ``vin``."""
+    return vin[0] in NORTH_AMERICA and vin[:3] not in YEAR_CYCLE_EXEMPT
+
+
+def model_year(vin: str, today: date | None = None) -> int | None:
+    """Model year from position 10.
+
+    For North American light vehicles a digit in position 7 means the
+    1980-2009 cycle and a letter 2010-2039; other VINs get the latest cycle.
+    Either way a year more than one ahead of ``today`` is moved back a cycle.
+    """
+    code = vin[9]
+    if code not in YEAR_CODES:
+        return None
+    latest = (today or date.today()).year + 1
+    year = 1980 + YEAR_CODES.index(code)
+    if uses_position7_cycle(vin):
+        if not vin[6].isdigit():
+            year += 30
+    else:
+        while year + 30 <= latest:
+            year += 30
+    if year > latest:
+        year -= 30
+    return year
+
+
+def decode_local(vin: str, today: date | None = None) -> dict:
+    """Decode what the VIN itself encodes; unknown fields are None."""
+    vin = normalize_vin(vin)
+    check_ok = validate_vin(vin)
+    manufacturer, make = WMI.get(vin[:3], (None, None))
+    return {
+        "vin": vin,
+        "year": model_year(vin, today),
+        "make": make,
+        "manufacturer": manufacturer,
+        "country": COUNTRIES.get(vin[0]),
+        "check_digit_valid": check_ok,
+        "serial": vin[11:],
+    }
@@ -0,0 +1,124 @@
+# app/worker.py
+
+"""Run durable jobs from ``job_queue`` (see ``app.job_queue``).
+
+    python -m app.worker                         # one process, 4 jobs at a time
+    python -m app.worker --processes 4 --concurrency 2
+    python -m app.worker --kinds bulk-text,bulk-email
+    python -m app.worker --once                  # drain due jobs and exit
+
+Each process polls the table every ``--poll-interval`` seconds when idle.
+Processes share nothing but the database, so they can run on any number of
+cores or machines next to the API.  Provider rate limits (``app.rate_limit``)
+are split evenly across the ``--processes`` started here; when workers run on
+several machines, set ``RATE_LIMIT_PROCESSES`` to the total instead.
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import signal
+
+from app import rate_limit
+from app.job_queue import JobQueue, job_queue, worker_name
+
+logger = logging.getLogger("worker")
+
+# Modules whose import registers job handlers on ``job_queue``.
+TASK_MODULES = ("app.routers.bulk", "app.routers.pricing")
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1"))
+
+
+def load_tasks():
+    for module in TASK_MODULES:
+        importlib.import_module(module)
+
+
+async def work(queue: JobQueue, concurrency: int = WORKER_CONCURRENCY,
+               poll_interval: float = WORKER_POLL_INTERVAL, kinds=None,
+               once: bool = False, stop: asyncio.Event | None = None) -> int:
+    """Run jobs with ``concurrency`` slots until ``stop`` is set (or, with
+    ``once``, until nothing is due).  Returns the number of jobs run."""
+    stop = stop or asyncio.Event()
+    ran = 0
+
+    async def slot():
+        nonlocal ran
+        worker_id = worker_name()
+        while not stop.is_set():
+            row = await asyncio.to_thread(queue.claim, worker_id, kinds)
+            if row is None:
+                if once:
+                    return
+                try:
+                    await asyncio.wait_for(stop.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            status = await queue.run(row, worker_id)
+            ran += 1
+            logger.info("Job %s (%s) attempt %s: %s", row.id, row.kind, row.attempts, status)
+
+    await asyncio.gather(*(slot() for _ in range(max(1, concurrency))))
+    return ran
+
+
+def run_process(concurrency: int, poll_interval: float, kinds, once: bool,
+                processes: int = 1):
+    logging.basicConfig(level=logging.INFO)
+    if "RATE_LIMIT_PROCESSES" not in os.environ:
+        rate_limit.set_process_count(processes)
+    load_tasks()
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await work(job_queue, concurrency, poll_interval, kinds, once, stop)
+
+    asyncio.run(main())
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued background jobs.")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes to start (default 1)")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help=f"jobs run at once per process (default {WORKER_CONCURRENCY})")
+    parser.add_argument("--poll-interval", type=float, default=WORKER_POLL_INTERVAL,
+                        help=f"seconds between polls when idle (default {WORKER_POLL_INTERVAL:g})")
+    parser.add_argument("--kinds", default="",
+                        help="comma-separated job kinds to run (default all)")
+    parser.add_argument("--once", action="store_true", help="exit once no job is due")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()] or None
+    worker_args = (args.concurrency, args.poll_interval, kinds, args.once,
+                   max(1, args.processes))
+    if args.processes <= 1:
+        run_process(*worker_args)
+        return
+    procs = [multiprocessing.Process(target=run_process, args=worker_args)
+             for _ in range(args.processes)]
+    for proc in procs:
+        proc.start()
+    try:
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        for proc in procs:
+            proc.terminate()
+            proc.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Micro-benchmark for the comp parsers.
+
+Times ``app.comp_parsing`` (strained lxml parse, one title split) against the
+previous approach (whole page through ``html.parser``, title re-split per
+field) on the saved result pages in ``tests/fixtures/comps``.  Fixture cards
+are repeated and surrounded with page chrome so the input resembles a real
+results page.
+
+    python scripts/bench_comp_parsing.py --cards 25 --chrome 400 --number 20
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bs4 import BeautifulSoup  # noqa: E402
+
+from app.comp_check import AUTOTRADER, CARGURUS, CARS_COM  # noqa: E402
+from app.comp_parsing import PARSER, parse_listings  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "comps"
+# fixture -> (spec, CSS selector the old parser used for cards)
+PAGES = {
+    "cars_com.html": (CARS_COM, "div.vehicle-card"),
+    "cargurus.html": (CARGURUS, "div.ListingListing__listingCard"),
+    "autotrader.html": (AUTOTRADER, "div.inventory-listing"),
+}
+CHROME = (
+    '<div class="nav"><ul>' + "".join(f'<li><a href="/m/{i}">Menu {i}</a></li>' for i in range(10))
+    + '</ul><script>window.__data = {"ads": [1, 2, 3]};</script>'
+    '<p class="promo">Financing available <span>today</span></p></div>'
+)
+
+
+def build_page(fixture: str, cards: int, chrome: int) -> str:
+    """Repeat the fixture's body ``cards`` times inside ``chrome`` filler blocks."""
+    body = fixture.split("<body>", 1)[1].rsplit("</body>", 1)[0]
+    half = CHROME * (chrome // 2)
+    return f"<html><head><title>Results</title></head><body>{half}{body * cards}{half}</body></html>"
+
+
+def legacy_parse(html: str, spec, card: str) -> list:
+    """The pre-strainer pipeline, kept here as the baseline."""
+    soup = BeautifulSoup(html, "html.parser")
+    cars = []
+    for listing in soup.select(card):
+        try:
+            title = listing.select_one(spec.title).get_text(strip=True)
+            cars.append({
+                "year_make_model": title,
+                "year": title.split()[0],
+                "make": title.split()[1],
+                "model": title.split()[2],
+                "trim": " ".join(title.split()[3:]) if len(title.split()) > 3 else "N/A",
+                "url": spec.base + listing.select_one(spec.link)["href"],
+            })
+        except Exception:
+            continue
+    return cars
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=25, help="fixture repetitions per page")
+    parser.add_argument("--chrome", type=int, default=400, help="filler blocks per page")
+    parser.add_argument("--number", type=int, default=20, help="parses per measurement")
+    args = parser.parse_args(argv)
+
+    print(f"parser={PARSER} cards x{args.cards} chrome x{args.chrome} number={args.number}")
+    print(f"{'source':<12}{'page KB':>9}{'legacy ms':>11}{'new ms':>9}{'speedup':>9}")
+    for name, (spec, card) in PAGES.items():
+        page = build_page((FIXTURES / name).read_text(), args.cards, args.chrome)
+        assert len(parse_listings(page, spec)) == len(legacy_parse(page, spec, card))
+        old = min(timeit.repeat(lambda: legacy_parse(page, spec, card), number=args.number, repeat=3))
+        new = min(timeit.repeat(lambda: parse_listings(page, spec), number=args.number, repeat=3))
+        per = 1000 / args.number
+        print(f"{spec.source:<12}{len(page) / 1024:>9.0f}{old * per:>11.2f}{new * per:>9.2f}"
+              f"{old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
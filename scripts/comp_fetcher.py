@@ -1,9 +1,39 @@
+"""Nightly market-comp fetcher.
+
+Scrapes Cars.com comps for every vehicle in ``ai_inventory_context`` and
+stores them in ``market_comps``.  Inventory is grouped by vehicle signature
+(year, make, model, trim, zip) so identical units on the lot are scraped once
+and the comps fanned out to each of them.  Only signatures with a vehicle that
+is new, whose comps are older than ``--max-age-days`` or whose sellingprice
+changed since the last fetch are refreshed (``--full`` refreshes everything).
+Signatures are processed by a thread pool
+(``--concurrency``) while a per-host rate limiter keeps requests to each site
+at least ``--rate`` seconds apart.  Finished vehicles are recorded in a
+checkpoint file so an interrupted run picks up where it stopped; the file is
+removed once a run completes.
+
+    python scripts/comp_fetcher.py --concurrency 4 --rate 3
+    python scripts/comp_fetcher.py --restart      # ignore an old checkpoint
+    python scripts/comp_fetcher.py --full         # refresh every vehicle
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
 import time
 import random
-import requests
-from datetime import datetime
+import httpx
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
 from supabase import create_client, Client
-from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.comp_parsing import card_strainer, iter_cards, text_of  # noqa: E402
+from app.http_cache import CachingTransport, http_cache  # noqa: E402
+from app.pagination import range_pages  # noqa: E402
 
 # --- SUPABASE SETUP ---
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
@@ -11,6 +41,10 @@ SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")  # Name your env variable
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+CHECKPOINT_PATH = os.environ.get("COMP_FETCHER_CHECKPOINT", ".comp_fetcher_checkpoint.json")
+DEFAULT_ZIPCODE = "76502"  # Or pull from vehicle or config
+MAX_AGE_DAYS = float(os.environ.get("COMP_MAX_AGE_DAYS", "7"))
+
 # --- USER AGENTS & HEADERS ---
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
@@ -25,7 +59,101 @@ HEADERS = {
 def get_headers():
     return {**HEADERS, "User-Agent": random.choice(USER_AGENTS)}
 
+# --- RATE LIMITING ---
+class HostRateLimiter:
+    """Space requests to the same host ``interval`` (+ random jitter) seconds apart.
+
+    Shared by all worker threads, so raising ``--concurrency`` overlaps work
+    across hosts and parsing/DB time without hammering any single site.
+    """
+
+    def __init__(self, interval=2.0, jitter=3.0):
+        self.interval = interval
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.interval + random.uniform(0, self.jitter)
+        if slot > now:
+            time.sleep(slot - now)
+
+rate_limiter = HostRateLimiter()
+
+# Result pages go through the shared disk cache, so a rerun after a failure
+# (or a signature shared with an API lookup) doesn't hit the site again.
+http = httpx.Client(transport=CachingTransport(httpx.HTTPTransport(), http_cache),
+                    follow_redirects=True)
+
+# --- CHECKPOINT ---
+class Checkpoint:
+    """Set of finished keys persisted to a JSON file after every update."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = set()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._done = set(json.load(f).get("done", []))
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable checkpoint {path}: {e}")
+
+    def __contains__(self, key):
+        return str(key) in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def mark(self, *keys):
+        """Record ``keys`` as done with a single rewrite of the file."""
+        with self._lock:
+            self._done.update(str(key) for key in keys)
+            if not self.path:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"done": sorted(self._done), "updated_at": datetime.utcnow().isoformat()}, f)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._done.clear()
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
 # --- SCRAPE FUNCTION ---
+VEHICLE_CARDS = card_strainer(**{"data-test": "vehicleCard"})
+
+def _digits(text):
+    digits = "".join(ch for ch in text if ch.isdigit())
+    return int(digits) if digits else None
+
+def parse_results(html, year, make, model, trim):
+    """Comp dicts for the vehicle cards of a Cars.com results page."""
+    comps = []
+    for card in iter_cards(html, VEHICLE_CARDS):
+        link = card.select_one("a[href]")
+        if link is None:
+            print("Parse fail: card without link")
+            continue
+        comps.append({
+            "year": year,
+            "make": make,
+            "model": model,
+            "trim": trim,
+            "mileage": _digits(text_of(card, "[data-test='vehicleMileage']", "")),
+            "price": _digits(text_of(card, "[data-test='vehicleCardPricingBlockPrice']", "")),
+            "source": "Cars.com",
+            "url": "https://www.cars.com" + link["href"],
+        })
+    return comps
+
 def scrape_cars_com(year, make, model, trim, zipcode, radius=200, max_results=20):
     base_url = "https://www.cars.com/shopping/results/"
     params = {
@@ -45,44 +173,26 @@ def scrape_cars_com(year, make, model, trim, zipcode, radius=200, max_results=20
     for attempt in range(3):
         try:
             print(f"Scraping (try {attempt+1}): {url}")
-            r = requests.get(url, headers=get_headers(), timeout=30)
+            if url not in http_cache:
+                rate_limiter.wait(url)
+            r = http.get(url, headers=get_headers(), timeout=30)
             if r.status_code != 200:
                 print(f"Non-200 response: {r.status_code}")
                 continue
             lowered = r.text.lower()
             if any(k in lowered for k in ["are you a robot", "unusual traffic", "captcha", "verify you are human"]):
                 print("⚠️  Blocked/Captcha, sleeping & retrying...")
+                http_cache.invalidate(str(r.request.url))
                 time.sleep(5 * (attempt+1))
                 continue
 
-            soup = BeautifulSoup(r.text, "lxml")
-            cards = soup.select("[data-test='vehicleCard']")
-            if not cards:
+            comps = parse_results(r.text, year, make, model, trim)
+            if not comps:
                 print("⚠️ No vehicle cards found! Saving HTML for debug...")
+                http_cache.invalidate(str(r.request.url))
                 with open("carscom_noresults.html", "w", encoding="utf-8") as f:
                     f.write(r.text)
                 continue
-
-            comps = []
-            for card in cards:
-                try:
-                    price = card.select_one("[data-test='vehicleCardPricingBlockPrice']").text.strip().replace("$", "").replace(",", "")
-                    mileage = card.select_one("[data-test='vehicleMileage']").text.strip().replace(",", "").replace(" mi.", "")
-                    title = card.select_one("h2").text.strip()
-                    vehicle_url = "https://www.cars.com" + card.select_one("a")["href"]
-                    comps.append({
-                        "year": year,
-                        "make": make,
-                        "model": model,
-                        "trim": trim,
-                        "mileage": int(mileage) if mileage.replace(",","").isdigit() else None,
-                        "price": int(price) if price.replace(",","").isdigit() else None,
-                        "source": "Cars.com",
-                        "url": vehicle_url
-                    })
-                except Exception as e:
-                    print("Parse fail:", e)
-                    continue
             print(f"Fetched {len(comps)} comps for {year} {make} {model}")
             return comps
         except Exception as e:
@@ -92,12 +202,20 @@ def scrape_cars_com(year, make, model, trim, zipcode, radius=200, max_results=20
 
 # --- SUPABASE HELPERS ---
 def fetch_inventory():
-    res = supabase.table("ai_inventory_context").select("*").execute()
-    return res.data or []
+    return list(range_pages(
+        lambda: supabase.table("ai_inventory_context").select("*").order("id")
+    ))
+
+def fetch_comp_freshness():
+    """Map inventory id -> newest comp fetch ``{"fetched_at", "inventory_price"}``."""
+    # One row per vehicle, so read it in pages past PostgREST's max-rows.
+    rows = range_pages(lambda: supabase.rpc("market_comps_freshness"))
+    return {str(r["inventory_id"]): r for r in rows}
 
-def save_market_comp(inventory_id, comp):
-    data = {
+def comp_row(inventory_id, comp, fetched_at, inventory_price=None):
+    return {
         "inventory_id": inventory_id,
+        "inventory_price": inventory_price,
         "source": comp.get("source"),
         "year": comp.get("year"),
         "make": comp.get("make"),
@@ -106,29 +224,164 @@ def save_market_comp(inventory_id, comp):
         "mileage": comp.get("mileage"),
         "price": comp.get("price"),
         "url": comp.get("url"),
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": fetched_at,
     }
-    supabase.table("market_comps").insert(data).execute()
+
+def replace_market_comps(inventory_ids, comps, prices=None):
+    """Swap the stored comps of ``inventory_ids`` for ``comps`` in one request.
+
+    ``prices`` maps inventory id -> sellingprice at fetch time, stored so the
+    next run can tell whether the vehicle was repriced.
+    """
+    prices = prices or {}
+    fetched_at = datetime.utcnow().isoformat()
+    rows = [comp_row(inv_id, comp, fetched_at, prices.get(inv_id))
+            for inv_id in inventory_ids for comp in comps]
+    supabase.rpc(
+        "replace_market_comps",
+        {"p_inventory_ids": list(inventory_ids), "p_comps": rows},
+    ).execute()
+    return len(rows)
 
 # --- MAIN JOB ---
-def comp_fetcher_job():
-    vehicles = fetch_inventory()
-    print(f"Found {len(vehicles)} vehicles in inventory.")
+def _year(value):
+    try:
+        return int(float(str(value).strip()))
+    except (TypeError, ValueError):
+        return None
+
+def vehicle_signature(vehicle):
+    """Vehicles with the same signature share one Cars.com search.
+
+    None when the vehicle lacks a usable year, make or model to search for.
+    """
+    def norm(value):
+        return str(value or "").strip().lower()
+    year = _year(vehicle.get("year"))
+    if year is None or not norm(vehicle.get("make")) or not norm(vehicle.get("model")):
+        return None
+    return (
+        year,
+        norm(vehicle.get("make")),
+        norm(vehicle.get("model")),
+        norm(vehicle.get("trim")),
+        str(vehicle.get("zipcode") or DEFAULT_ZIPCODE),
+    )
+
+def group_by_signature(vehicles):
+    groups = {}
     for vehicle in vehicles:
-        inventory_id = vehicle["id"]
-        comps = scrape_cars_com(
-            year=vehicle["year"],
-            make=vehicle["make"],
-            model=vehicle["model"],
-            trim=vehicle.get("trim"),
-            zipcode="76502"  # Or pull from vehicle or config
-        )
-        if comps:
-            # Delete old comps for this inventory, if desired:
-            supabase.table("market_comps").delete().eq("inventory_id", inventory_id).execute()
-            for comp in comps:
-                save_market_comp(inventory_id, comp)
-        time.sleep(2 + random.randint(0, 3))  # Randomized throttle!
+        signature = vehicle_signature(vehicle)
+        if signature is None:
+            print(f"Skipping vehicle {vehicle.get('id')}: no usable year/make/model "
+                  f"({vehicle.get('year')!r} {vehicle.get('make')!r} {vehicle.get('model')!r})")
+            continue
+        groups.setdefault(signature, []).append(vehicle)
+    return groups
+
+def _parse_time(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _same_price(a, b):
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return a == b
+
+def needs_refresh(vehicle, freshness, max_age_days=MAX_AGE_DAYS, now=None):
+    """Why ``vehicle`` needs new comps ("new", "stale", "price"), or None."""
+    last = freshness.get(str(vehicle["id"]))
+    if not last:
+        return "new"
+    fetched_at = _parse_time(last.get("fetched_at"))
+    now = now or datetime.now(timezone.utc)
+    if fetched_at is None or now - fetched_at > timedelta(days=max_age_days):
+        return "stale"
+    if not _same_price(last.get("inventory_price"), vehicle.get("sellingprice")):
+        return "price"
+    return None
+
+def select_refresh(vehicles, freshness, max_age_days=MAX_AGE_DAYS, now=None):
+    """Signature groups that contain at least one vehicle needing new comps.
+
+    The whole group is refreshed so every unit of a signature shares one
+    fetch time; the scrape costs the same either way.
+    """
+    groups = group_by_signature(vehicles)
+    return {
+        sig: group for sig, group in groups.items()
+        if any(needs_refresh(v, freshness, max_age_days, now) for v in group)
+    }
+
+def process_group(vehicles, checkpoint):
+    """Scrape once for a group of identical vehicles and store comps for each."""
+    sample = vehicles[0]
+    comps = scrape_cars_com(
+        year=_year(sample["year"]),
+        make=sample["make"],
+        model=sample["model"],
+        trim=sample.get("trim"),
+        zipcode=sample.get("zipcode") or DEFAULT_ZIPCODE,
+    )
+    if not comps:
+        # Leave them out of the checkpoint so a resumed run tries again.
+        return 0
+    ids = [v["id"] for v in vehicles]
+    saved = replace_market_comps(ids, comps, {v["id"]: v.get("sellingprice") for v in vehicles})
+    checkpoint.mark(*ids)
+    return saved
+
+def comp_fetcher_job(concurrency=4, checkpoint_path=CHECKPOINT_PATH, restart=False,
+                     full=False, max_age_days=MAX_AGE_DAYS):
+    vehicles = fetch_inventory()
+    checkpoint = Checkpoint(checkpoint_path)
+    if restart:
+        checkpoint.clear()
+    pending = [v for v in vehicles if v["id"] not in checkpoint]
+    if full:
+        groups = group_by_signature(pending)
+    else:
+        groups = select_refresh(pending, fetch_comp_freshness(), max_age_days)
+    print(f"Found {len(vehicles)} vehicles in inventory; {len(pending)} not yet done "
+          f"({len(checkpoint)} done in a previous run); refreshing {len(groups)} signatures.")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(process_group, group, checkpoint): sig for sig, group in groups.items()}
+        for future in as_completed(futures):
+            signature = futures[future]
+            try:
+                if not future.result():
+                    failed += 1
+            except Exception as e:
+                failed += 1
+                print(f"Signature {signature} failed: {e}")
+
+    if failed:
+        print(f"{failed} signatures without comps; checkpoint kept at {checkpoint_path} for a rerun.")
+    else:
+        checkpoint.clear()
+        print("All vehicles refreshed.")
+    return failed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch market comps for inventory.")
+    parser.add_argument("--concurrency", type=int, default=4, help="worker threads (default 4)")
+    parser.add_argument("--rate", type=float, default=2.0,
+                        help="minimum seconds between requests to the same host (default 2)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="checkpoint file path")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--full", action="store_true",
+                        help="refresh every vehicle, not just new, stale or repriced ones")
+    parser.add_argument("--max-age-days", type=float, default=MAX_AGE_DAYS,
+                        help=f"refresh comps older than this many days (default {MAX_AGE_DAYS:g})")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    comp_fetcher_job()
+    args = parse_args()
+    rate_limiter.interval = args.rate
+    comp_fetcher_job(args.concurrency, args.checkpoint, args.restart,
+                     full=args.full, max_age_days=args.max_age_days)
@@ -0,0 +1,39 @@
+-- Lead KPIs computed in the database so the API no longer downloads the whole
+-- leads table to count it (see app/routers/leads.py).
+
+create index if not exists leads_last_lead_response_at_idx
+    on public.leads (last_lead_response_at desc nulls last);
+
+-- One row: totals and the mean staff response delay in seconds.
+create or replace function public.lead_kpis()
+returns table (
+    total_leads bigint,
+    engaged_leads bigint,
+    avg_response_seconds double precision
+)
+language sql
+stable
+as $$
+    select
+        count(*) as total_leads,
+        count(*) filter (where last_lead_response_at is not null) as engaged_leads,
+        coalesce(
+            avg(extract(epoch from (last_staff_response_at::timestamptz
+                                    - last_lead_response_at::timestamptz)))
+                filter (where last_lead_response_at is not null
+                          and last_staff_response_at is not null),
+            0
+        )::double precision as avg_response_seconds
+    from public.leads;
+$$;
+
+-- Leads who replied after (or without) our last response.
+create or replace view public.leads_awaiting_response as
+    select *
+    from public.leads
+    where last_lead_response_at is not null
+      and (last_staff_response_at is null
+           or last_staff_response_at < last_lead_response_at);
+
+grant execute on function public.lead_kpis() to anon, authenticated, service_role;
+grant select on public.leads_awaiting_response to anon, authenticated, service_role;
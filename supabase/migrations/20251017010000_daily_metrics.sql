@@ -0,0 +1,171 @@
+-- Daily rollup of floor-traffic and lead counters.
+--
+-- Month-to-date metrics (floor_traffic.month_metrics, leads.month_metrics and
+-- the analytics tiles built on them) sum at most 31 rows of this table instead
+-- of reading every visit/lead of the month.  Triggers keep it current on every
+-- insert, update and delete, whichever client performs the write.
+
+create table if not exists public.daily_metrics (
+    day date primary key,
+    visits integer not null default 0,
+    demos integer not null default 0,
+    worksheets integer not null default 0,
+    offers integer not null default 0,
+    sold integer not null default 0,
+    leads integer not null default 0,
+    engaged_leads integer not null default 0,
+    responded_leads integer not null default 0,
+    response_seconds double precision not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create or replace function public.bump_daily_metrics(
+    p_day date,
+    p_visits integer default 0,
+    p_demos integer default 0,
+    p_worksheets integer default 0,
+    p_offers integer default 0,
+    p_sold integer default 0,
+    p_leads integer default 0,
+    p_engaged integer default 0,
+    p_responded integer default 0,
+    p_response_seconds double precision default 0
+) returns void
+language sql
+as $$
+    insert into public.daily_metrics as d (
+        day, visits, demos, worksheets, offers, sold,
+        leads, engaged_leads, responded_leads, response_seconds
+    ) values (
+        p_day, p_visits, p_demos, p_worksheets, p_offers, p_sold,
+        p_leads, p_engaged, p_responded, p_response_seconds
+    )
+    on conflict (day) do update set
+        visits = d.visits + excluded.visits,
+        demos = d.demos + excluded.demos,
+        worksheets = d.worksheets + excluded.worksheets,
+        offers = d.offers + excluded.offers,
+        sold = d.sold + excluded.sold,
+        leads = d.leads + excluded.leads,
+        engaged_leads = d.engaged_leads + excluded.engaged_leads,
+        responded_leads = d.responded_leads + excluded.responded_leads,
+        response_seconds = d.response_seconds + excluded.response_seconds,
+        updated_at = now();
+$$;
+
+-- true when any of ``keys`` is a true boolean in the row (missing columns are
+-- ignored, matching the API which accepted worksheet/write_up/worksheet_complete).
+create or replace function public._row_flag(r jsonb, variadic keys text[])
+returns integer
+language sql
+immutable
+as $$
+    select case when exists (
+        select 1 from unnest(keys) k where (r ->> k) = 'true'
+    ) then 1 else 0 end;
+$$;
+
+create or replace function public.floor_traffic_daily_metrics()
+returns trigger
+language plpgsql
+as $$
+declare
+    r jsonb;
+begin
+    if tg_op in ('UPDATE', 'DELETE') and old.visit_time is not null then
+        r := to_jsonb(old);
+        perform public.bump_daily_metrics(
+            old.visit_time::date, -1,
+            -public._row_flag(r, 'demo'),
+            -public._row_flag(r, 'worksheet', 'write_up', 'worksheet_complete'),
+            -public._row_flag(r, 'customer_offer'),
+            -public._row_flag(r, 'sold'));
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') and new.visit_time is not null then
+        r := to_jsonb(new);
+        perform public.bump_daily_metrics(
+            new.visit_time::date, 1,
+            public._row_flag(r, 'demo'),
+            public._row_flag(r, 'worksheet', 'write_up', 'worksheet_complete'),
+            public._row_flag(r, 'customer_offer'),
+            public._row_flag(r, 'sold'));
+    end if;
+    return null;
+end;
+$$;
+
+create or replace function public.leads_daily_metrics()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') and old.created_at is not null then
+        perform public.bump_daily_metrics(
+            old.created_at::date,
+            p_leads => -1,
+            p_engaged => -(old.last_lead_response_at is not null)::int,
+            p_responded => -(old.last_lead_response_at is not null
+                             and old.last_staff_response_at is not null)::int,
+            p_response_seconds => -coalesce(extract(epoch from (
+                old.last_staff_response_at::timestamptz
+                - old.last_lead_response_at::timestamptz)), 0));
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') and new.created_at is not null then
+        perform public.bump_daily_metrics(
+            new.created_at::date,
+            p_leads => 1,
+            p_engaged => (new.last_lead_response_at is not null)::int,
+            p_responded => (new.last_lead_response_at is not null
+                            and new.last_staff_response_at is not null)::int,
+            p_response_seconds => coalesce(extract(epoch from (
+                new.last_staff_response_at::timestamptz
+                - new.last_lead_response_at::timestamptz)), 0));
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists floor_traffic_daily_metrics on public.floor_traffic_customers;
+create trigger floor_traffic_daily_metrics
+    after insert or update or delete on public.floor_traffic_customers
+    for each row execute function public.floor_traffic_daily_metrics();
+
+drop trigger if exists leads_daily_metrics on public.leads;
+create trigger leads_daily_metrics
+    after insert or update or delete on public.leads
+    for each row execute function public.leads_daily_metrics();
+
+-- Backfill from existing rows.
+truncate public.daily_metrics;
+
+insert into public.daily_metrics (day, visits, demos, worksheets, offers, sold)
+select
+    visit_time::date,
+    count(*),
+    sum(public._row_flag(to_jsonb(f), 'demo')),
+    sum(public._row_flag(to_jsonb(f), 'worksheet', 'write_up', 'worksheet_complete')),
+    sum(public._row_flag(to_jsonb(f), 'customer_offer')),
+    sum(public._row_flag(to_jsonb(f), 'sold'))
+from public.floor_traffic_customers f
+where visit_time is not null
+group by 1;
+
+insert into public.daily_metrics as d (day, leads, engaged_leads, responded_leads, response_seconds)
+select
+    created_at::date,
+    count(*),
+    count(*) filter (where last_lead_response_at is not null),
+    count(*) filter (where last_lead_response_at is not null
+                       and last_staff_response_at is not null),
+    coalesce(sum(extract(epoch from (last_staff_response_at::timestamptz
+                                     - last_lead_response_at::timestamptz))), 0)
+from public.leads
+where created_at is not null
+group by 1
+on conflict (day) do update set
+    leads = excluded.leads,
+    engaged_leads = excluded.engaged_leads,
+    responded_leads = excluded.responded_leads,
+    response_seconds = excluded.response_seconds;
+
+grant select on public.daily_metrics to anon, authenticated, service_role;
@@ -0,0 +1,42 @@
+-- Latest N market comps for every vehicle in ai_inventory_context in a single
+-- query, replacing one market_comps request per vehicle in /ai/context/full.
+
+create index if not exists market_comps_inventory_created_idx
+    on public.market_comps (inventory_id, created_at desc);
+
+create or replace function public.latest_market_comps(per_vehicle integer default 5)
+returns table (
+    inventory_id text,
+    source text,
+    year integer,
+    make text,
+    model text,
+    trim text,
+    mileage integer,
+    price numeric,
+    url text,
+    created_at timestamptz
+)
+language sql
+stable
+as $$
+    select
+        ranked.inventory_id::text, ranked.source::text, ranked.year::integer,
+        ranked.make::text, ranked.model::text, ranked.trim::text,
+        ranked.mileage::integer, ranked.price::numeric, ranked.url::text,
+        ranked.created_at::timestamptz
+    from (
+        select
+            mc.*,
+            row_number() over (
+                partition by mc.inventory_id
+                order by mc.created_at desc
+            ) as rn
+        from public.market_comps mc
+        where mc.inventory_id in (select id from public.ai_inventory_context)
+    ) ranked
+    where ranked.rn <= per_vehicle
+    order by ranked.inventory_id, ranked.created_at desc;
+$$;
+
+grant execute on function public.latest_market_comps(integer) to anon, authenticated, service_role;
@@ -0,0 +1,35 @@
+-- Replace the comps of one or more vehicles in a single request/transaction
+-- (used by scripts/comp_fetcher.py instead of one insert per comp row).
+--
+--   p_inventory_ids: JSON array of inventory ids whose comps are replaced
+--   p_comps:         JSON array of market_comps rows (each with inventory_id)
+
+create or replace function public.replace_market_comps(p_inventory_ids jsonb, p_comps jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    inserted integer;
+begin
+    delete from public.market_comps mc
+    using jsonb_populate_recordset(
+        null::public.market_comps,
+        (select coalesce(jsonb_agg(jsonb_build_object('inventory_id', v)), '[]'::jsonb)
+         from jsonb_array_elements(p_inventory_ids) v)
+    ) ids
+    where mc.inventory_id = ids.inventory_id;
+
+    insert into public.market_comps (
+        inventory_id, source, year, make, model, trim, mileage, price, url, created_at
+    )
+    select
+        r.inventory_id, r.source, r.year, r.make, r.model, r.trim, r.mileage,
+        r.price, r.url, coalesce(r.created_at, now())
+    from jsonb_populate_recordset(null::public.market_comps, p_comps) r;
+
+    get diagnostics inserted = row_count;
+    return inserted;
+end;
+$$;
+
+grant execute on function public.replace_market_comps(jsonb, jsonb) to service_role;
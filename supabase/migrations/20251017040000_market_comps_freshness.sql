@@ -0,0 +1,56 @@
+-- Incremental comp refresh for scripts/comp_fetcher.py.
+--
+-- market_comps.inventory_price records the vehicle's sellingprice when its
+-- comps were fetched, and market_comps_freshness() returns the newest fetch
+-- per vehicle so the fetcher only re-scrapes vehicles that are new, stale or
+-- repriced.
+
+alter table public.market_comps
+    add column if not exists inventory_price numeric;
+
+create or replace function public.market_comps_freshness()
+returns table (
+    inventory_id text,
+    fetched_at timestamptz,
+    inventory_price numeric
+)
+language sql
+stable
+as $$
+    select distinct on (mc.inventory_id)
+        mc.inventory_id::text, mc.created_at::timestamptz, mc.inventory_price::numeric
+    from public.market_comps mc
+    where mc.inventory_id in (select id from public.ai_inventory_context)
+    order by mc.inventory_id, mc.created_at desc;
+$$;
+
+grant execute on function public.market_comps_freshness() to service_role;
+
+create or replace function public.replace_market_comps(p_inventory_ids jsonb, p_comps jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    inserted integer;
+begin
+    delete from public.market_comps mc
+    using jsonb_populate_recordset(
+        null::public.market_comps,
+        (select coalesce(jsonb_agg(jsonb_build_object('inventory_id', v)), '[]'::jsonb)
+         from jsonb_array_elements(p_inventory_ids) v)
+    ) ids
+    where mc.inventory_id = ids.inventory_id;
+
+    insert into public.market_comps (
+        inventory_id, source, year, make, model, trim, mileage, price, url,
+        inventory_price, created_at
+    )
+    select
+        r.inventory_id, r.source, r.year, r.make, r.model, r.trim, r.mileage,
+        r.price, r.url, r.inventory_price, coalesce(r.created_at, now())
+    from jsonb_populate_recordset(null::public.market_comps, p_comps) r;
+
+    get diagnostics inserted = row_count;
+    return inserted;
+end;
+$$;
@@ -0,0 +1,28 @@
+-- Durable background job queue (app/job_queue.py, run by `python -m app.worker`).
+--
+-- Workers claim runnable rows (pending and due, or running with an expired
+-- lease) with `for update skip locked`, so any number of worker processes can
+-- poll the same table.  (kind, idempotency_key) makes enqueueing idempotent.
+
+create table if not exists public.job_queue (
+    id              varchar(32) primary key,
+    kind            text        not null,
+    payload         json        not null default '{}',
+    idempotency_key text,
+    status          text        not null default 'pending',
+    attempts        integer     not null default 0,
+    max_attempts    integer     not null default 3,
+    run_at          timestamp   not null default (now() at time zone 'utc'),
+    locked_by       text,
+    locked_until    timestamp,
+    total           integer     not null default 0,
+    done            integer     not null default 0,
+    summary         json,
+    result          json,
+    error           text,
+    created_at      timestamp   not null default (now() at time zone 'utc'),
+    finished_at     timestamp,
+    constraint job_queue_idempotency unique (kind, idempotency_key)
+);
+
+create index if not exists job_queue_runnable on public.job_queue (status, run_at);
@@ -0,0 +1,4 @@
+-- Running per-type signal totals for incrementally maintained hotness scores
+-- (app/hotness.py).  After applying, backfill with `python -m app.hotness rebuild`.
+
+alter table public.ai_hotness add column if not exists totals json;
@@ -0,0 +1,32 @@
+-- Cross-worker invalidation for the in-memory inventory index
+-- (app/inventory_index.py).
+--
+-- Every statement that writes public.inventory bumps the single
+-- inventory_version row; each API worker polls it and reloads its index when
+-- the version moved, so a write made through one worker (or straight to the
+-- table) shows up on the others within INVENTORY_INDEX_CHECK_SECONDS.
+
+create table if not exists public.inventory_version (
+    id integer primary key default 1 check (id = 1),
+    version bigint not null default 0,
+    changed_at timestamptz not null default now()
+);
+
+insert into public.inventory_version (id) values (1) on conflict (id) do nothing;
+
+create or replace function public.bump_inventory_version()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.inventory_version
+    set version = version + 1, changed_at = now()
+    where id = 1;
+    return null;
+end;
+$$;
+
+drop trigger if exists inventory_version_bump on public.inventory;
+create trigger inventory_version_bump
+    after insert or update or delete or truncate on public.inventory
+    for each statement execute function public.bump_inventory_version();
@@ -0,0 +1,45 @@
+-- latest_market_comps() is read in .range() pages (PostgREST caps a response
+-- at db-max-rows), so its order must be total: comps from one fetch share
+-- created_at, which left both the per-vehicle ranking and the page
+-- boundaries unstable between requests.  Also index created_at for the
+-- newest-comp lookup /ai/context/full uses as its cache fingerprint.
+
+create index if not exists market_comps_created_idx
+    on public.market_comps (created_at desc);
+
+create or replace function public.latest_market_comps(per_vehicle integer default 5)
+returns table (
+    inventory_id text,
+    source text,
+    year integer,
+    make text,
+    model text,
+    trim text,
+    mileage integer,
+    price numeric,
+    url text,
+    created_at timestamptz
+)
+language sql
+stable
+as $$
+    select
+        ranked.inventory_id::text, ranked.source::text, ranked.year::integer,
+        ranked.make::text, ranked.model::text, ranked.trim::text,
+        ranked.mileage::integer, ranked.price::numeric, ranked.url::text,
+        ranked.created_at::timestamptz
+    from (
+        select
+            mc.*,
+            row_number() over (
+                partition by mc.inventory_id
+                order by mc.created_at desc, mc.url, mc.source, mc.price, mc.mileage
+            ) as rn
+        from public.market_comps mc
+        where mc.inventory_id in (select id from public.ai_inventory_context)
+    ) ranked
+    where ranked.rn <= per_vehicle
+    order by ranked.inventory_id, ranked.rn;
+$$;
+
+grant execute on function public.latest_market_comps(integer) to anon, authenticated, service_role;
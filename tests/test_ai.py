@@ -13,7 +13,7 @@ def test_ai_ask_inventory_keyword():
     exec_result = MagicMock(data=sample, error=None)
 
     mock_select = MagicMock()
-    mock_select.limit.return_value.execute.return_value = exec_result
+    mock_select.limit.return_value.execute = AsyncMock(return_value=exec_result)
 
     mock_table = MagicMock()
     mock_table.select.return_value = mock_select
@@ -25,7 +25,7 @@ def test_ai_ask_inventory_keyword():
     mock_openai = MagicMock()
     mock_openai.chat.completions.create = AsyncMock(return_value=mock_resp)
 
-    with patch("app.openai_router.supabase", mock_supabase), \
+    with patch("app.openai_router.async_supabase", mock_supabase), \
          patch("app.openai_router.get_openai_client", return_value=mock_openai):
         response = client.post(
             "/api/ai/ask",
@@ -54,7 +54,7 @@ def test_inventory_ai_review():
     mock_chain = MagicMock()
     mock_chain.eq.return_value = mock_chain
     mock_chain.maybe_single.return_value = mock_chain
-    mock_chain.execute.return_value = exec_result
+    mock_chain.execute = AsyncMock(return_value=exec_result)
 
     mock_table = MagicMock()
     mock_table.select.return_value = mock_chain
@@ -78,7 +78,7 @@ def test_inventory_ai_review():
     mock_openai = MagicMock()
     mock_openai.chat.completions.create = AsyncMock(return_value=mock_resp)
 
-    with patch("app.openai_router.supabase", mock_supabase), \
+    with patch("app.openai_router.async_supabase", mock_supabase), \
          patch("app.openai_router.aggregate_comps", return_value=comps_result), \
          patch("app.openai_router.get_openai_client", return_value=mock_openai):
         response = client.get("/api/ai/inventory/1/review")
@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 from app.main import app
+from app.cache import TTLCache
 
 client = TestClient(app)
 
@@ -62,14 +63,14 @@ def test_get_full_ai_context():
     ]
 
     mock_inv_table = MagicMock()
-    mock_inv_table.select.return_value.execute.return_value = MagicMock(
+    mock_inv_table.select.return_value.order.return_value.range.return_value.execute.return_value = MagicMock(
         data=inventory_rows, error=None
     )
 
     mock_comps_table = MagicMock()
     (
-        mock_comps_table.select.return_value.eq.return_value.order.return_value.limit.return_value.execute.return_value
-    ) = MagicMock(data=comps_rows, error=None)
+        mock_comps_table.select.return_value.order.return_value.limit.return_value.execute.return_value
+    ) = MagicMock(data=[{"created_at": "2024-01-01T00:00:00"}], error=None)
 
     mock_tasks_table = MagicMock()
     (
@@ -101,9 +102,14 @@ def test_get_full_ai_context():
 
     mock_supabase = MagicMock()
     mock_supabase.table.side_effect = table_side_effect
+    mock_supabase.rpc.return_value.range.return_value.execute.return_value = MagicMock(
+        data=[{"inventory_id": 1, **row} for row in comps_rows], error=None
+    )
 
-    with patch("app.openai_router.supabase", mock_supabase):
+    with patch("app.openai_router.supabase", mock_supabase), \
+         patch("app.openai_router._inventory_context_cache", TTLCache(ttl=60)):
         response = client.get("/api/ai/context/full")
+        again = client.get("/api/ai/context/full")
 
     assert response.status_code == 200
     data = response.json()
@@ -112,3 +118,10 @@ def test_get_full_ai_context():
     assert data["overdue"]["activities"] == acts_rows
     assert data["hot_leads"] == leads_rows
     assert "inventory_block" in data["ai_context_blocks"]
+    assert "$34000" in data["ai_context_blocks"]["inventory_block"]
+    mock_supabase.rpc.assert_called_once_with("latest_market_comps", {"per_vehicle": 5})
+    mock_supabase.rpc.return_value.range.assert_called_once_with(0, 999)
+    mock_comps_table.select.assert_called_with("created_at")
+    # Second request is served from the cache: comps fingerprint unchanged.
+    assert again.json()["inventory"] == data["inventory"]
+    assert mock_inv_table.select.call_count == 1
@@ -1,5 +1,16 @@
+import json
+import uuid
+from datetime import datetime, timedelta
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db import get_db_session
+from app.db_models import AIHotness, Base, CustomerSignal
+from app.hotness import rebuild
 from app.main import app
 from fastapi.testclient import TestClient
 
@@ -21,13 +32,17 @@ def test_ingest_signal():
 
 
 def test_get_ai_hotness():
+    cid = "11111111-1111-1111-1111-111111111111"
     mock_session = MagicMock()
-    signals = [SimpleNamespace(signal_type="web_visit", total_value=5)]
-    mock_session.execute.return_value.all.return_value = signals
-    mock_session.merge.return_value = None
+    mock_session.get.return_value = AIHotness(
+        customer_id=uuid.UUID(cid),
+        score=0.5,
+        breakdown=[{"signal_type": "web_visit", "weight": 0.1, "contribution": 0.5}],
+        totals={"web_visit": 5.0},
+        computed_at=datetime(2025, 10, 1),
+    )
 
     with patch("app.db.SessionLocal", return_value=mock_session):
-        cid = "11111111-1111-1111-1111-111111111111"
         response = client.get(f"/api/customers/{cid}/ai-hotness")
 
     assert response.status_code == 200
@@ -36,3 +51,159 @@ def test_get_ai_hotness():
     assert data["score"] == 0.5
     assert data["breakdown"][0]["signal_type"] == "web_visit"
     assert data["breakdown"][0]["contribution"] == 0.5
+    mock_session.get.assert_called_once()
+    mock_session.execute.assert_not_called()
+
+
+@pytest.fixture
+def signal_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'signals.sqlite3'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    def override():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db_session] = override
+    yield Session
+    app.dependency_overrides.pop(get_db_session, None)
+    engine.dispose()
+
+
+def _stored(Session):
+    with Session() as db:
+        return db.scalars(select(CustomerSignal).order_by(CustomerSignal.signal_value)).all()
+
+
+def test_ingest_signals_batch_reports_item_errors(signal_db):
+    cid = "a1111111-1111-1111-1111-111111111111"
+    items = [
+        {"customer_id": cid, "type": "web_visit", "value": 1, "metadata": {"page": "/"}},
+        {"customer_id": "not-a-uuid", "type": "web_visit", "value": 1},
+        {"customer_id": cid, "type": "service_visit", "value": 2,
+         "created_at": "2025-10-01T12:00:00"},
+        {"customer_id": cid, "value": 3},
+    ]
+
+    response = client.post("/api/customers/signals:batch", json=items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["inserted"], body["rejected"]) == (2, 2)
+    assert [e["index"] for e in body["errors"]] == [1, 3]
+    assert body["errors"][1]["error"].startswith("type:")
+    rows = _stored(signal_db)
+    assert [(r.signal_type, r.signal_value) for r in rows] == [("web_visit", 1), ("service_visit", 2)]
+    assert rows[0].meta == {"page": "/"}
+    assert rows[1].created_at.day == 1
+
+
+def test_ingest_signals_ndjson_streams_in_chunks(signal_db):
+    cid = "b2222222-2222-2222-2222-222222222222"
+    lines = [json.dumps({"customer_id": cid, "type": "web_visit", "value": i}) for i in range(7)]
+    lines.insert(3, "{not json")
+    body = "\n".join(lines) + "\n\n"
+
+    with patch("app.routers.ai_hotness.SIGNAL_INSERT_CHUNK", 3):
+        response = client.post("/api/customers/signals:batch", content=body,
+                               headers={"Content-Type": "application/x-ndjson"})
+
+    result = response.json()
+    assert (result["inserted"], result["rejected"]) == (7, 1)
+    assert result["errors"][0]["index"] == 3
+    assert result["errors"][0]["error"].startswith("invalid JSON")
+    assert [r.signal_value for r in _stored(signal_db)] == list(range(7))
+
+
+def test_ingest_signals_batch_rejects_oversized_array(signal_db):
+    items = [{"customer_id": str(uuid.uuid4()), "type": "web_visit", "value": 1}] * 3
+
+    with patch("app.routers.ai_hotness.SIGNAL_BATCH_MAX", 2):
+        response = client.post("/api/customers/signals:batch", json=items)
+
+    assert response.status_code == 413
+    assert _stored(signal_db) == []
+
+
+def _hotness(cid):
+    response = client.get(f"/api/customers/{cid}/ai-hotness")
+    assert response.status_code == 200
+    body = response.json()
+    return body["score"], {b["signal_type"]: b["contribution"] for b in body["breakdown"]}
+
+
+def test_hotness_is_updated_incrementally_and_matches_rebuild(signal_db):
+    cid = "c3333333-3333-3333-3333-333333333333"
+    other = "d4444444-4444-4444-4444-444444444444"
+
+    client.post(f"/api/customers/{cid}/signals", json={"type": "web_visit", "value": 5})
+    assert _hotness(cid) == (0.5, {"web_visit": 0.5})
+
+    client.post("/api/customers/signals:batch", json=[
+        {"customer_id": cid, "type": "quote_request", "value": 10},
+        {"customer_id": cid, "type": "web_visit", "value": 5},
+        {"customer_id": other, "type": "service_visit", "value": 2},
+    ])
+    score, breakdown = _hotness(cid)
+    assert breakdown == {"web_visit": 1.0, "quote_request": 3.0}
+    assert score == 4.0
+    assert _hotness(other)[0] == 0.3
+
+    with signal_db() as db:
+        before = {str(r.customer_id): (r.score, r.totals) for r in db.scalars(select(AIHotness))}
+        assert rebuild(db) == 2
+        after = {str(r.customer_id): (r.score, r.totals) for r in db.scalars(select(AIHotness))}
+    assert after == before
+
+
+def test_hotness_decays_with_half_life(signal_db):
+    cid = "e5555555-5555-5555-5555-555555555555"
+    week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
+
+    with patch("app.hotness.HOTNESS_HALF_LIFE_DAYS", 7.0):
+        client.post("/api/customers/signals:batch", json=[
+            {"customer_id": cid, "type": "quote_request", "value": 10, "created_at": week_ago},
+            {"customer_id": cid, "type": "web_visit", "value": 10},
+        ])
+        score, breakdown = _hotness(cid)
+        with signal_db() as db:
+            rebuild(db)
+        rebuilt, _ = _hotness(cid)
+
+    assert breakdown["quote_request"] == pytest.approx(1.5, rel=1e-3)
+    assert breakdown["web_visit"] == pytest.approx(1.0, rel=1e-3)
+    assert score == pytest.approx(2.5, rel=1e-3)
+    assert rebuilt == pytest.approx(score, rel=1e-3)
+
+
+def test_unknown_customer_hotness_is_404(signal_db):
+    response = client.get(f"/api/customers/{uuid.uuid4()}/ai-hotness")
+    assert response.status_code == 404
+
+
+def test_apply_signals_tolerates_a_concurrently_created_row(signal_db):
+    from app import hotness
+
+    cid = uuid.UUID("f6666666-6666-6666-6666-66666666666f")
+    now = datetime.utcnow()
+    insert_missing = hotness._insert_missing
+
+    def racing_insert(db, ids, when):
+        # Another transaction creates the row between our batch and our insert.
+        with signal_db() as other:
+            other.add(AIHotness(customer_id=cid, score=1.0, breakdown=[],
+                                totals={"web_visit": 10.0}, computed_at=now))
+            other.commit()
+        insert_missing(db, ids, when)
+
+    with patch("app.hotness._insert_missing", racing_insert), signal_db() as db:
+        hotness.apply_signals(db, [{"customer_id": cid, "signal_type": "web_visit",
+                                    "signal_value": 5.0, "created_at": now}])
+        db.commit()
+
+    with signal_db() as db:
+        assert db.get(AIHotness, cid).totals == {"web_visit": 15.0}
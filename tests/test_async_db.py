@@ -0,0 +1,71 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.async_db import AsyncQuery
+
+
+class _SlowBuilder:
+    def __init__(self):
+        self.calls = []
+
+    def eq(self, *args):
+        self.calls.append(("eq", args))
+        return self
+
+    async def execute(self):
+        await asyncio.sleep(1)
+
+
+def test_async_query_forwards_builder_calls():
+    builder = MagicMock()
+    builder.eq.return_value = builder
+
+    query = AsyncQuery(builder).eq("id", 1)
+
+    assert isinstance(query, AsyncQuery)
+    builder.eq.assert_called_with("id", 1)
+
+
+def test_async_query_timeout_raises_api_error():
+    builder = _SlowBuilder()
+
+    with pytest.raises(APIError) as exc:
+        asyncio.run(AsyncQuery(builder).eq("id", 1).execute(timeout=0.01))
+
+    assert exc.value.code == "timeout"
+    assert builder.calls == [("eq", ("id", 1))]
+
+
+def test_each_loop_gets_a_pool_closed_with_the_loop():
+    from app.async_db import AsyncSupabase
+
+    db = AsyncSupabase("http://supabase.test", "key")
+
+    async def open_pool():
+        db._postgrest()
+        assert db._postgrest() is db._postgrest()
+        return next(iter(db._clients.values()))[0]
+
+    first = asyncio.run(open_pool())
+    second = asyncio.run(open_pool())
+
+    assert first is not second
+    assert first.is_closed and second.is_closed
+    assert len(db._clients) == 0
+
+
+def test_aclose_closes_the_running_loops_pool():
+    from app.async_db import AsyncSupabase
+
+    db = AsyncSupabase("http://supabase.test", "key")
+
+    async def run():
+        db._postgrest()
+        http = next(iter(db._clients.values()))[0]
+        await db.aclose()
+        return http
+
+    assert asyncio.run(run()).is_closed
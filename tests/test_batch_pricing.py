@@ -0,0 +1,101 @@
+import asyncio
+import csv
+import io
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.batch_pricing import price_row, run_batch_pricing, stored_comps
+from app.jobs import Job
+from app.main import app
+
+VEHICLES = [
+    {"id": 1, "stocknumber": "A1", "year": 2020, "make": "Ford", "model": "F-150",
+     "trim": "XLT", "sellingprice": "36000.00", "mileage": 30000},
+    {"id": 2, "stocknumber": "B2", "year": 2021, "make": "Honda", "model": "Civic",
+     "trim": "EX", "sellingprice": 21000, "mileage": 12000},
+    {"id": 3, "stocknumber": "C3", "year": 2019, "make": "Jeep", "model": "Wrangler",
+     "trim": None, "sellingprice": 28000, "mileage": 50000},
+]
+STORED = [
+    {"inventory_id": "1", "price": p, "mileage": m}
+    for p, m in [(30000, 40000), (31000, 35000), (32000, 30000), (33000, 25000)]
+] + [{"inventory_id": "2", "price": p, "mileage": 10000} for p in (22000, 23000, 24000)]
+
+
+def _supabase():
+    query = MagicMock()
+    query.order.return_value = query
+    query.limit.return_value = query
+    query.execute = AsyncMock(return_value=MagicMock(data=VEHICLES))
+    mock = MagicMock()
+    mock.table.return_value.select.return_value = query
+    mock.rpc.return_value.range.return_value.execute = AsyncMock(return_value=MagicMock(data=STORED))
+    return mock
+
+
+def test_price_row_flags_against_band():
+    comps = [{"price": p, "mileage": 20000} for p in (30000, 31000, 32000)]
+
+    row = price_row({"id": 1, "sellingprice": 35000}, comps, "stored", percent=0)
+
+    assert row["flag"] == "OVERPRICED"
+    assert row["gap"] == 4000
+    assert price_row({"id": 1, "sellingprice": 35000}, [], "stored")["flag"] == "NO COMPS"
+
+
+def test_run_batch_pricing_uses_stored_then_live_comps():
+    job = Job("batch-pricing")
+    search = AsyncMock(return_value={"comps": [{"price": 27000}, {"price": 29000}]})
+
+    with patch("app.batch_pricing.async_supabase", _supabase()), \
+         patch("app.batch_pricing.comp_engine.search", search):
+        rows = asyncio.run(run_batch_pricing(job, concurrency=2))
+
+    by_id = {r["id"]: r for r in rows}
+    assert by_id[1]["flag"] == "OVERPRICED" and by_id[1]["comp_source"] == "stored"
+    assert by_id[2]["flag"] == "UNDERPRICED"
+    assert by_id[3]["comp_source"] == "live" and by_id[3]["flag"] == "IN MARKET RANGE"
+    search.assert_awaited_once()
+    assert (job.total, job.done) == (3, 3)
+    assert job.summary == {"OVERPRICED": 1, "UNDERPRICED": 1, "IN MARKET RANGE": 1}
+
+
+def test_batch_pricing_job_endpoints():
+    with patch("app.batch_pricing.async_supabase", _supabase()), TestClient(app) as client:
+        started = client.post("/api/pricing/batch?live=false")
+        assert started.status_code == 202
+        job_id = started.json()["id"]
+
+        for _ in range(50):
+            status = client.get(f"/api/pricing/batch/{job_id}").json()
+            if status["status"] == "done":
+                break
+            time.sleep(0.02)
+
+        assert status["progress"] == 1.0
+        assert status["summary"]["NO COMPS"] == 1
+        report = client.get(f"/api/pricing/batch/{job_id}/report?format=csv")
+
+    assert report.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(report.text)))
+    assert [r["stocknumber"] for r in rows] == ["A1", "B2", "C3"]
+    assert rows[0]["flag"] == "OVERPRICED"
+
+
+def test_unknown_pricing_job_is_404():
+    assert TestClient(app).get("/api/pricing/batch/nope").status_code == 404
+
+
+def test_stored_comps_pages_past_the_row_cap():
+    rows = [{"inventory_id": str(i // 20), "price": 20000} for i in range(2500)]
+    mock = MagicMock()
+    mock.rpc.return_value.range.side_effect = lambda start, end: MagicMock(
+        execute=AsyncMock(return_value=MagicMock(data=rows[start:end + 1])))
+
+    with patch("app.batch_pricing.async_supabase", mock):
+        by_vehicle = asyncio.run(stored_comps())
+
+    assert sum(len(c) for c in by_vehicle.values()) == 2500
+    assert len(by_vehicle) == 125
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.rate_limit import AsyncTokenBucket
+
+
+class FakeTwilioError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FakeTwilio:
+    """Stands in for ``twilio.rest.Client``: records sends, fails on cue."""
+
+    def __init__(self, fail=(), throttle_once=()):
+        self.sent = []
+        self.fail = set(fail)
+        self.throttle_once = set(throttle_once)
+        self.messages = self
+
+    def create(self, body, to, from_):
+        if to in self.throttle_once:
+            self.throttle_once.discard(to)
+            raise FakeTwilioError(429)
+        if to in self.fail:
+            raise FakeTwilioError(400)
+        self.sent.append((to, body))
+
+
+def _customers(rows):
+    """Fake ``async_supabase`` answering ``select(...).in_("id", chunk)`` lookups."""
+    by_id = {r["id"]: r for r in rows}
+    mock = MagicMock()
+    mock.selects, mock.chunks = [], []
+
+    def select(columns):
+        mock.selects.append(columns)
+        query = MagicMock()
+
+        def in_(key, ids):
+            mock.chunks.append(list(ids))
+            query.execute = AsyncMock(return_value=MagicMock(
+                data=[by_id[i] for i in ids if i in by_id]))
+            return query
+        query.in_.side_effect = in_
+        return query
+
+    mock.table.return_value.select.side_effect = select
+    return mock
+
+
+def test_bulk_text_runs_as_job_with_counts():
+    rows = [{"id": str(i), "phone": f"+1555000{i:04d}"} for i in range(20)]
+    rows.append({"id": "x", "phone": None})
+    fake = FakeTwilio(fail={"+15550000003"}, throttle_once={"+15550000007"})
+
+    db = _customers(rows)
+    with patch("app.routers.bulk.async_supabase", db), \
+         patch("app.export.ID_CHUNK_SIZE", 6), \
+         patch("app.routers.bulk.twilio_client", return_value=fake), \
+         patch("app.routers.bulk.TWILIO_MESSAGES_PER_SECOND", 1000.0), \
+         patch("app.bulk_send.RETRY_BACKOFF", 0), \
+         TestClient(app) as client:
+        started = client.post("/api/bulk/text", json={"ids": [r["id"] for r in rows], "message": "Sale!"})
+        assert started.status_code == 202
+        status_url = started.json()["status_url"]
+
+        for _ in range(100):
+            status = client.get(status_url).json()
+            if status["status"] == "done":
+                break
+            time.sleep(0.02)
+
+    assert status["summary"] == {"skipped": 1, "sent": 19, "failed": 1}
+    assert (status["done"], status["total"]) == (21, 21)
+    assert len(fake.sent) == 19 and all(body == "Sale!" for _, body in fake.sent)
+    assert set(db.selects) == {"id,phone"}
+    assert [len(c) for c in db.chunks] == [6, 6, 6, 3]
+
+
+def test_token_bucket_spaces_requests():
+    now = [0.0]
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    bucket = AsyncTokenBucket(rate=2, burst=2, clock=lambda: now[0], sleep=fake_sleep)
+
+    async def run():
+        for _ in range(5):
+            await bucket.acquire()
+
+    asyncio.run(run())
+
+    # Two tokens of burst, then one every half second.
+    assert slept == [0.5, 0.5, 0.5]
+
+
+def test_unknown_bulk_job_is_404():
+    assert TestClient(app).get("/api/bulk/jobs/missing").status_code == 404
+
+
+class _StubSendGrid(BaseHTTPRequestHandler):
+    """Local stand-in for ``POST /v3/mail/send``; rejects payloads with a bad address."""
+
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append((self.path, body))
+        emails = [t["email"] for p in body["personalizations"] for t in p["to"]]
+        status = 400 if "bad@example.com" in emails else 202
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_bulk_email_sends_batched_personalizations(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubSendGrid)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _StubSendGrid.requests = []
+    monkeypatch.setenv("SENDGRID_API_HOST", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("SENDGRID_FROM", "sales@dealer.com")
+    rows = [{"id": str(i), "email": f"c{i}@example.com", "first_name": f"N{i}"} for i in range(5)]
+    rows[3]["email"] = "bad@example.com"
+    rows[4]["first_name"] = "<b>Al & Bo</b>"
+    rows.append({"id": "x", "email": None})
+
+    try:
+        db = _customers(rows)
+        with patch("app.routers.bulk.async_supabase", db), \
+             patch("app.bulk_send.SENDGRID_BATCH_SIZE", 2):
+            response = TestClient(app).post("/api/bulk/email", json={
+                "ids": [r["id"] for r in rows], "subject": "Hi {{ first_name }}",
+                "body": "<p>Service special for {{first_name}}</p>",
+            })
+    finally:
+        server.shutdown()
+
+    body = response.json()
+    assert (body["sent"], body["failed"], body["skipped"]) == (3, 2, 1)
+    assert sorted(b["status_code"] for b in body["batches"]) == [202, 202, 400]
+    assert len(_StubSendGrid.requests) == 3
+    assert db.selects == ["id,email,first_name"]
+    assert {path for path, _ in _StubSendGrid.requests} == {"/v3/mail/send"}
+    assert {b["subject"] for _, b in _StubSendGrid.requests} == {"Hi {{first_name}}"}
+    merged = {p["to"][0]["email"]: p["substitutions"]
+              for _, b in _StubSendGrid.requests for p in b["personalizations"]}
+    assert {b["content"][0]["value"] for _, b in _StubSendGrid.requests} == {
+        "<p>Service special for {{html:first_name}}</p>"}
+    assert merged["c0@example.com"] == {"{{first_name}}": "N0", "{{html:first_name}}": "N0"}
+    # The subject gets the raw value, the HTML body an escaped one.
+    assert merged["c4@example.com"] == {
+        "{{first_name}}": "<b>Al & Bo</b>",
+        "{{html:first_name}}": "&lt;b&gt;Al &amp; Bo&lt;/b&gt;",
+    }
+
+
+def test_account_rate_is_split_across_processes():
+    from app import rate_limit
+
+    with patch("app.rate_limit.RATE_LIMIT_PROCESSES", 1), \
+         patch.dict("app.rate_limit._limiters", clear=True):
+        assert rate_limit.limiter_for("twilio:test", 4.0).rate == 4.0
+        rate_limit.set_process_count(4)
+        assert rate_limit.limiter_for("twilio:test", 4.0).rate == 1.0
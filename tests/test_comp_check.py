@@ -0,0 +1,84 @@
+import asyncio
+from pathlib import Path
+
+import httpx
+
+from app.comp_check import CompEngine, parse_cars_com
+
+FIXTURES = Path(__file__).parent / "fixtures" / "comps"
+PAGES = {
+    "www.cars.com": "cars_com.html",
+    "www.cargurus.com": "cargurus.html",
+    "www.autotrader.com": "autotrader.html",
+}
+
+
+def _transport(slow_host=None, calls=None):
+    async def handler(request):
+        host = request.url.host
+        if calls is not None:
+            calls.append(host)
+        if host == slow_host:
+            await asyncio.sleep(1)
+        return httpx.Response(200, text=(FIXTURES / PAGES[host]).read_text())
+    return httpx.MockTransport(handler)
+
+
+def test_parse_cars_com_fixture():
+    cars = parse_cars_com((FIXTURES / "cars_com.html").read_text())
+
+    assert [c["trim"] for c in cars] == ["XLT", "Lariat"]
+    assert cars[0]["price"] == "31500"
+    assert cars[0]["url"] == "https://www.cars.com/vehicledetail/aaa/"
+    assert parse_cars_com((FIXTURES / "cars_com.html").read_text(), trim="lariat")[0]["price"] == "38900"
+
+
+def test_search_fans_out_and_caches():
+    calls = []
+    engine = CompEngine(transport=_transport(calls=calls))
+
+    async def run():
+        first = await engine.search(2020, "Ford", "F-150", "XLT", "76504", 200)
+        second = await engine.search(2020, "ford", "f-150", "xlt", "76504", 200)
+        await engine.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert sorted(calls) == sorted(PAGES)
+    assert second is first
+    assert first["partial"] is False
+    assert {c["source"] for c in first["comps"]} == {"Cars.com", "CarGurus", "Autotrader"}
+    assert first["market_low"] == 29995
+
+
+def test_slow_source_returns_partial_result():
+    engine = CompEngine(transport=_transport(slow_host="www.autotrader.com"), timeout=0.2)
+
+    async def run():
+        result = await engine.search(2020, "Ford", "F-150")
+        await engine.aclose()
+        return result
+
+    result = asyncio.run(run())
+
+    assert result["partial"] is True
+    assert result["sources"]["Autotrader"] == "timeout"
+    assert result["sources"]["Cars.com"] == "ok"
+    assert all(c["source"] != "Autotrader" for c in result["comps"])
+
+
+def test_client_of_a_finished_loop_is_closed():
+    engine = CompEngine(transport=_transport())
+
+    async def run():
+        await engine.search(2020, "Ford", "F-150")
+        return engine._client()
+
+    first = asyncio.run(run())
+    second = asyncio.run(run())
+
+    assert first is not second
+    assert first.is_closed
+    assert second.is_closed
+    assert len(engine._clients) == 0
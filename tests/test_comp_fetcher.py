@@ -0,0 +1,162 @@
+import importlib.util
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import MagicMock
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "comp_fetcher.py"
+
+
+def _load():
+    spec = importlib.util.spec_from_file_location("comp_fetcher", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _vehicles(n):
+    return [{"id": i, "year": 2022, "make": "Chevrolet", "model": "Silverado", "trim": "LT"}
+            for i in range(1, n + 1)]
+
+
+def test_job_resumes_from_checkpoint(tmp_path):
+    cf = _load()
+    checkpoint = tmp_path / "checkpoint.json"
+    cf.Checkpoint(str(checkpoint)).mark(1)
+    cf.supabase = MagicMock()
+    cf.fetch_inventory = lambda: _vehicles(3)
+    cf.fetch_comp_freshness = lambda: {}
+    scraped = []
+    cf.scrape_cars_com = lambda **kw: scraped.append(kw) or [{"price": 30000, "source": "Cars.com"}]
+
+    failed = cf.comp_fetcher_job(concurrency=2, checkpoint_path=str(checkpoint))
+
+    assert failed == 0
+    assert not checkpoint.exists()
+    # Identical vehicles share one scrape and one replace call.
+    assert len(scraped) == 1
+    (call,) = cf.supabase.rpc.call_args_list
+    assert call.args[0] == "replace_market_comps"
+    assert call.args[1]["p_inventory_ids"] == [2, 3]
+    assert [r["inventory_id"] for r in call.args[1]["p_comps"]] == [2, 3]
+
+
+def test_failed_vehicle_stays_pending(tmp_path):
+    cf = _load()
+    checkpoint = tmp_path / "checkpoint.json"
+    cf.supabase = MagicMock()
+    vehicles = _vehicles(2)
+    vehicles[1]["trim"] = "High Country"
+    cf.fetch_inventory = lambda: vehicles
+    cf.fetch_comp_freshness = lambda: {}
+    results = iter([[], [{"price": 30000, "source": "Cars.com"}]])
+    cf.scrape_cars_com = lambda **kw: next(results)
+
+    failed = cf.comp_fetcher_job(concurrency=1, checkpoint_path=str(checkpoint))
+
+    assert failed == 1
+    assert len(cf.Checkpoint(str(checkpoint))) == 1
+
+
+def test_rate_limiter_spaces_same_host(monkeypatch):
+    cf = _load()
+    sleeps = []
+    monkeypatch.setattr(cf.time, "sleep", sleeps.append)
+    monkeypatch.setattr(cf.time, "monotonic", lambda: 100.0)
+    limiter = cf.HostRateLimiter(interval=2.0, jitter=0)
+
+    limiter.wait("https://www.cars.com/a")
+    limiter.wait("https://www.cars.com/b")
+    limiter.wait("https://www.cargurus.com/c")
+
+    assert sleeps == [2.0]
+
+
+def test_signature_groups_identical_units():
+    cf = _load()
+    vehicles = _vehicles(3) + [{"id": 9, "year": "2022", "make": "chevrolet ",
+                                "model": "SILVERADO", "trim": "lt"},
+                               {"id": 10, "year": 2023, "make": "Chevrolet",
+                                "model": "Silverado", "trim": "LT"}]
+
+    groups = cf.group_by_signature(vehicles)
+
+    assert sorted(len(g) for g in groups.values()) == [1, 4]
+
+
+NOW = datetime(2025, 10, 17, tzinfo=timezone.utc)
+
+
+def test_needs_refresh_reasons():
+    cf = _load()
+    vehicle = {"id": 1, "sellingprice": 31000}
+    fresh = {"fetched_at": "2025-10-15T00:00:00", "inventory_price": 31000}
+
+    assert cf.needs_refresh(vehicle, {}, 7, NOW) == "new"
+    assert cf.needs_refresh(vehicle, {"1": fresh}, 7, NOW) is None
+    assert cf.needs_refresh(vehicle, {"1": fresh}, 1, NOW) == "stale"
+    assert cf.needs_refresh({**vehicle, "sellingprice": 29500}, {"1": fresh}, 7, NOW) == "price"
+
+
+def test_job_skips_fresh_signatures(tmp_path):
+    cf = _load()
+    cf.supabase = MagicMock()
+    vehicles = _vehicles(2) + [{"id": 3, "year": 2021, "make": "Ford", "model": "F-150",
+                                "trim": "XLT", "sellingprice": 40000}]
+    for v in vehicles[:2]:
+        v["sellingprice"] = 31000
+    recent = datetime.now(timezone.utc).isoformat()
+    cf.fetch_inventory = lambda: vehicles
+    cf.fetch_comp_freshness = lambda: {
+        "1": {"fetched_at": recent, "inventory_price": 31000},
+        "2": {"fetched_at": recent, "inventory_price": 31000},
+        "3": {"fetched_at": recent, "inventory_price": 42000},
+    }
+    scraped = []
+    cf.scrape_cars_com = lambda **kw: scraped.append(kw["model"]) or [{"price": 38000}]
+
+    cf.comp_fetcher_job(concurrency=1, checkpoint_path=str(tmp_path / "cp.json"))
+    assert scraped == ["F-150"]
+    (call,) = cf.supabase.rpc.call_args_list
+    assert call.args[1]["p_comps"][0]["inventory_price"] == 40000
+
+    scraped.clear()
+    cf.comp_fetcher_job(concurrency=1, checkpoint_path=str(tmp_path / "cp.json"), full=True)
+    assert sorted(scraped) == ["F-150", "Silverado"]
+
+
+def test_vehicles_without_a_year_are_skipped(capsys):
+    cf = _load()
+    vehicles = _vehicles(2) + [{"id": 7, "year": None, "make": "Ford", "model": "F-150"},
+                               {"id": 8, "year": " ", "make": "Ford", "model": "F-150"}]
+
+    groups = cf.group_by_signature(vehicles)
+
+    assert [len(g) for g in groups.values()] == [2]
+    assert "Skipping vehicle 7" in capsys.readouterr().out
+
+
+def test_checkpoint_marks_a_group_in_one_write(tmp_path, monkeypatch):
+    cf = _load()
+    checkpoint = cf.Checkpoint(str(tmp_path / "cp.json"))
+    writes = []
+    real_replace = cf.os.replace
+    monkeypatch.setattr(cf.os, "replace", lambda *a: writes.append(a) or real_replace(*a))
+
+    checkpoint.mark(1, 2, 3)
+
+    assert len(writes) == 1
+    assert len(cf.Checkpoint(str(tmp_path / "cp.json"))) == 3
+
+
+def test_freshness_is_read_past_the_row_cap():
+    cf = _load()
+    rows = [{"inventory_id": i, "fetched_at": None, "inventory_price": None} for i in range(2500)]
+    cf.supabase = MagicMock()
+    rpc = cf.supabase.rpc.return_value
+    rpc.range.side_effect = lambda start, end: MagicMock(
+        execute=MagicMock(return_value=MagicMock(data=rows[start:end + 1])))
+
+    freshness = cf.fetch_comp_freshness()
+
+    assert len(freshness) == 2500
+    assert rpc.range.call_count == 3
@@ -0,0 +1,65 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from app.comp_check import CARGURUS
+from app.comp_parsing import card_strainer, iter_cards, parse_listings, parse_title
+
+ROOT = Path(__file__).resolve().parents[1]
+FIXTURES = ROOT / "tests" / "fixtures" / "comps"
+
+
+def _script(name):
+    spec = importlib.util.spec_from_file_location(name, ROOT / "scripts" / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_parse_title_splits_once():
+    assert parse_title("2020 Ford F-150 XLT SuperCrew") == {
+        "year": "2020", "make": "Ford", "model": "F-150", "trim": "XLT SuperCrew",
+    }
+    assert parse_title("2019 Honda Civic")["trim"] == "N/A"
+    with pytest.raises(ValueError):
+        parse_title("Sold")
+
+
+def test_only_cards_are_parsed():
+    html = (
+        '<div class="nav"><div class="vehicle-card-ad">ad</div></div>'
+        '<div class="vehicle-card x"><h2>a</h2></div><p>footer</p>'
+    )
+    cards = list(iter_cards(html, card_strainer("div", "vehicle-card")))
+
+    assert [c.h2.get_text() for c in cards] == ["a"]
+
+
+def test_parse_listings_matches_fixture():
+    (car,) = parse_listings((FIXTURES / "cargurus.html").read_text(), CARGURUS, trim="xlt")
+
+    assert car["trim"] == "XLT SuperCrew"
+    assert car["price"] == "33250"
+    assert car["url"] == "https://www.cargurus.com/Cars/l-123"
+
+
+def test_comp_fetcher_parses_vehicle_cards():
+    cf = _script("comp_fetcher")
+    html = (
+        '<div data-test="vehicleCard"><a href="/vehicledetail/x/"></a>'
+        '<span data-test="vehicleCardPricingBlockPrice">$31,500</span>'
+        '<div data-test="vehicleMileage">41,200 mi.</div></div>'
+        '<div data-test="vehicleCard"><span>no link</span></div>'
+    )
+
+    (comp,) = cf.parse_results(html, 2020, "Ford", "F-150", "XLT")
+
+    assert (comp["price"], comp["mileage"]) == (31500, 41200)
+    assert comp["url"] == "https://www.cars.com/vehicledetail/x/"
+
+
+def test_benchmark_runs(capsys):
+    _script("bench_comp_parsing").main(["--cards", "2", "--chrome", "2", "--number", "1"])
+
+    assert "Autotrader" in capsys.readouterr().out
@@ -0,0 +1,56 @@
+import numpy as np
+
+from app.comp_check import remove_outliers, summarize_comps
+from app.comp_stats import adjusted_price, batch_comp_stats, comp_arrays, comp_stats, parse_number
+
+
+def _comp(price, mileage=None, i=0):
+    return {"year_make_model": f"2020 Ford F-150 #{i}", "price": price, "mileage": mileage,
+            "location": "TX"}
+
+
+def test_parse_number():
+    assert parse_number("$31,500") == 31500
+    assert parse_number("41,200 mi.") == 41200
+    assert parse_number(29995) == 29995
+    assert np.isnan(parse_number("N/A"))
+
+
+def test_trim_keeps_duplicate_prices():
+    # Ten comps, four share the lowest surviving price; the old set-based
+    # filter kept or dropped all of them together.
+    prices = [1000, 20000, 20000, 20000, 20000, 25000, 26000, 27000, 28000, 90000]
+    comps = [_comp(p, i=i) for i, p in enumerate(prices)]
+
+    kept = remove_outliers(comps)
+
+    assert [c["price"] for c in kept] == prices[1:-1]
+
+
+def test_stats_and_mileage_regression():
+    comps = [_comp(40000 - m // 10, f"{m:,} mi", i) for i, m in
+             enumerate([10000, 20000, 30000, 40000, 50000])]
+
+    kept, stats = comp_stats(comps, percent=0)
+
+    assert len(kept) == 5
+    assert stats["market_median"] == 37000
+    assert stats["percentiles"]["p25"] == 36000
+    fit = stats["mileage_regression"]
+    assert fit["slope_per_mile"] == -0.1 and fit["r2"] == 1.0
+    assert adjusted_price(stats, "60,000") == 34000
+
+
+def test_summary_without_prices_is_empty():
+    result = summarize_comps([_comp("Call for price")])
+
+    assert result["market_avg"] == 0 and result["mileage_regression"] is None
+
+
+def test_batch_stats_and_arrays():
+    prices, mileage = comp_arrays([_comp("$10", "5 mi"), _comp(None)])
+    assert np.isnan(prices[1]) and mileage[0] == 5
+
+    stats = batch_comp_stats({1: [_comp(100), _comp(300)], 2: []})
+    assert stats[1]["market_avg"] == 200
+    assert stats[2]["count"] == 0
@@ -17,6 +17,8 @@ def test_search_contacts():
 
     mock_query = MagicMock()
     mock_query.ilike.return_value = mock_query
+    mock_query.order.return_value = mock_query
+    mock_query.limit.return_value = mock_query
     mock_query.execute.return_value = exec_result
 
     mock_table = MagicMock()
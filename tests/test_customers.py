@@ -1,5 +1,5 @@
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import json
 from app.main import app
 client = TestClient(app)
@@ -16,6 +16,8 @@ def test_search_customers():
 
     mock_query = MagicMock()
     mock_query.ilike.return_value = mock_query
+    mock_query.order.return_value = mock_query
+    mock_query.limit.return_value = mock_query
     mock_query.execute.return_value = exec_result
 
     mock_table = MagicMock()
@@ -86,15 +88,17 @@ def test_add_customer_to_floor_log_be_back():
     }
 
     mock_customer_table = MagicMock()
-    (
-        mock_customer_table.select.return_value.eq.return_value.maybe_single.return_value.execute.return_value
-    ) = MagicMock(data=customer, error=None)
+    mock_customer_table.select.return_value.eq.return_value.maybe_single.return_value.execute = AsyncMock(
+        return_value=MagicMock(data=customer, error=None)
+    )
 
     mock_floor_table = MagicMock()
-    (
-        mock_floor_table.select.return_value.eq.return_value.eq.return_value.gte.return_value.limit.return_value.execute.return_value
-    ) = MagicMock(data=[{"id": "old"}], error=None)
-    mock_floor_table.insert.return_value.execute.return_value = MagicMock(data=[inserted], error=None)
+    mock_floor_table.select.return_value.eq.return_value.gte.return_value.limit.return_value.execute = AsyncMock(
+        return_value=MagicMock(data=[{"id": "old"}], error=None)
+    )
+    mock_floor_table.insert.return_value.execute = AsyncMock(
+        return_value=MagicMock(data=[inserted], error=None)
+    )
 
     def table_side_effect(name):
         if name == "customers":
@@ -108,7 +112,7 @@ def test_add_customer_to_floor_log_be_back():
 
     payload = {"visit_time": inserted["visit_time"], "salesperson": "Bob"}
 
-    with patch("app.routers.customers.supabase", mock_supabase):
+    with patch("app.routers.customers.async_supabase", mock_supabase):
         response = client.post(
             "/api/customers/1/floor-traffic",
             content=json.dumps(payload),
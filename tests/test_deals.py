@@ -21,8 +21,12 @@ def test_list_deals():
         "close_date": None,
     }]
     exec_result = MagicMock(data=[sample[0].copy()], error=None)
+    mock_query = MagicMock()
+    mock_query.order.return_value = mock_query
+    mock_query.limit.return_value = mock_query
+    mock_query.execute.return_value = exec_result
     mock_table = MagicMock()
-    mock_table.select.return_value.execute.return_value = exec_result
+    mock_table.select.return_value = mock_query
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
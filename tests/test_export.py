@@ -0,0 +1,119 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.pagination import decode_cursor
+
+client = TestClient(app)
+
+
+def _async_chain(*pages):
+    mock_query = MagicMock()
+    for name in ("order", "limit", "gt", "lt", "or_", "eq", "ilike", "gte", "lte"):
+        getattr(mock_query, name).return_value = mock_query
+    mock_query.execute = AsyncMock(
+        side_effect=[MagicMock(data=rows, error=None) for rows in pages]
+    )
+    mock_table = MagicMock()
+    mock_table.select.return_value = mock_query
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value = mock_table
+    return mock_supabase, mock_query
+
+
+def test_export_customers_ndjson_walks_every_page():
+    first = [{"id": "1", "first_name": "Ann", "last_name": "Lee"},
+             {"id": "2", "name": "Bob"},
+             {"id": "3", "name": "Cy"}]
+    second = [{"id": "3", "name": "Cy"}]
+    mock_supabase, mock_query = _async_chain(first, second)
+
+    with patch("app.routers.customers.async_supabase", mock_supabase), \
+         patch("app.export.EXPORT_BATCH_SIZE", 2):
+        response = client.get("/api/customers/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in lines] == ["1", "2", "3"]
+    assert lines[0]["name"] == "Ann Lee"
+    mock_query.limit.assert_called_with(3)
+    mock_query.gt.assert_called_once_with("id", "2")
+
+
+def test_export_inventory_csv_uses_columns_as_header():
+    rows = [{"id": 7, "make": "Ford", "model": "F-150", "year": 2022}]
+    mock_supabase, _ = _async_chain(rows)
+
+    with patch("app.routers.inventory.async_supabase", mock_supabase):
+        response = client.get("/api/inventory/export?format=csv&fields=make,model,year")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="inventory.csv"' in response.headers["content-disposition"]
+    assert response.text.splitlines() == ["id,make,model,year", "7,Ford,F-150,2022"]
+
+
+def test_export_activities_pages_by_created_at():
+    first = [{"id": 2, "created_at": "2024-02-01"}, {"id": 1, "created_at": "2024-01-01"}]
+    mock_supabase, mock_query = _async_chain(first, [])
+
+    with patch("app.routers.activities.async_supabase", mock_supabase), \
+         patch("app.export.EXPORT_BATCH_SIZE", 1):
+        response = client.get("/api/activities/export")
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 1
+    clause = mock_query.or_.call_args[0][0]
+    assert clause.startswith('created_at.lt."2024-02-01"')
+
+
+def test_export_database_error_returns_400():
+    from postgrest.exceptions import APIError
+
+    mock_supabase, mock_query = _async_chain()
+    mock_query.execute = AsyncMock(side_effect=APIError({"message": "boom"}))
+
+    with patch("app.routers.deals.async_supabase", mock_supabase):
+        response = client.get("/api/deals/export")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "boom"
+
+
+def test_iter_by_ids_chunks_dedupes_and_bounds_concurrency():
+    import asyncio
+
+    from app.export import iter_by_ids
+
+    in_flight = [0, 0]  # current, peak
+    chunks = []
+
+    def build_query():
+        query = MagicMock()
+
+        def in_(key, ids):
+            chunks.append(ids)
+
+            async def execute():
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+                await asyncio.sleep(0.01)
+                in_flight[0] -= 1
+                return MagicMock(data=[{key: i} for i in ids])
+            query.execute = execute
+            return query
+        query.in_.side_effect = in_
+        return query
+
+    async def collect():
+        ids = [str(i) for i in range(10)] + ["3", "4"]
+        return [r["id"] async for r in iter_by_ids(build_query, ids, chunk_size=3, concurrency=2)]
+
+    rows = asyncio.run(collect())
+
+    assert sorted(rows, key=int) == [str(i) for i in range(10)]
+    assert [len(c) for c in chunks] == [3, 3, 3, 1]
+    assert in_flight[1] == 2
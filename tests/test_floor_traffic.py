@@ -1,6 +1,8 @@
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.main import app
+from app.daily_metrics import month_bounds
+from datetime import date
 import json
 
 client = TestClient(app)
@@ -28,11 +30,11 @@ def test_get_today_floor_traffic():
 
     exec_result = MagicMock(data=sample, error=None)
     mock_table = MagicMock()
-    mock_table.select.return_value.gte.return_value.lt.return_value.order.return_value.execute.return_value = exec_result
+    mock_table.select.return_value.gte.return_value.lt.return_value.order.return_value.execute = AsyncMock(return_value=exec_result)
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
-    with patch("app.routers.floor_traffic.supabase", mock_supabase):
+    with patch("app.routers.floor_traffic.async_supabase", mock_supabase):
         response = client.get("/api/floor-traffic/today")
 
     assert response.status_code == 200
@@ -62,11 +64,11 @@ def test_create_floor_traffic():
     exec_result = MagicMock(data=[sample], error=None)
 
     mock_ft_table = MagicMock()
-    mock_ft_table.insert.return_value.execute.return_value = exec_result
+    mock_ft_table.insert.return_value.execute = AsyncMock(return_value=exec_result)
 
     mock_contacts_table = MagicMock()
-    mock_contacts_table.insert.return_value.execute.return_value = MagicMock(
-        data=[{"id": "99"}], error=None
+    mock_contacts_table.insert.return_value.execute = AsyncMock(
+        return_value=MagicMock(data=[{"id": "99"}], error=None)
     )
 
     def table_side_effect(name):
@@ -89,7 +91,7 @@ def test_create_floor_traffic():
         "last_name": "Smith",
     }
 
-    with patch("app.routers.floor_traffic.supabase", mock_supabase):
+    with patch("app.routers.floor_traffic.async_supabase", mock_supabase):
         response = client.post(
             "/api/floor-traffic/",
             content=json.dumps(payload),
@@ -123,11 +125,11 @@ def test_update_floor_traffic():
 
     exec_result = MagicMock(data=[sample], error=None)
     mock_table = MagicMock()
-    mock_table.update.return_value.eq.return_value.execute.return_value = exec_result
+    mock_table.update.return_value.eq.return_value.execute = AsyncMock(return_value=exec_result)
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
-    with patch("app.routers.floor_traffic.supabase", mock_supabase):
+    with patch("app.routers.floor_traffic.async_supabase", mock_supabase):
         response = client.put(
             "/api/floor-traffic/1",
             content=json.dumps({"notes": "Updated"}),
@@ -160,9 +162,10 @@ def test_mark_sold_creates_deal():
 
     exec_result = MagicMock(data=[sample], error=None)
     mock_ft_table = MagicMock()
-    mock_ft_table.update.return_value.eq.return_value.execute.return_value = exec_result
+    mock_ft_table.update.return_value.eq.return_value.execute = AsyncMock(return_value=exec_result)
 
     mock_deals_table = MagicMock()
+    mock_deals_table.insert.return_value.execute = AsyncMock()
 
     def table_side_effect(name):
         if name == "floor_traffic_customers":
@@ -174,7 +177,7 @@ def test_mark_sold_creates_deal():
     mock_supabase = MagicMock()
     mock_supabase.table.side_effect = table_side_effect
 
-    with patch("app.routers.floor_traffic.supabase", mock_supabase):
+    with patch("app.routers.floor_traffic.async_supabase", mock_supabase):
         response = client.put(
             "/api/floor-traffic/1",
             content=json.dumps({"sold": True}),
@@ -188,19 +191,19 @@ def test_mark_sold_creates_deal():
 
 def test_month_metrics():
     sample = [
-        {"demo": True, "worksheet": True, "customer_offer": True, "sold": False},
-        {"demo": False, "worksheet": False, "customer_offer": False, "sold": True},
+        {"visits": 1, "demos": 1, "worksheets": 1, "offers": 1, "sold": 0},
+        {"visits": 1, "demos": 0, "worksheets": 0, "offers": 0, "sold": 1},
     ]
 
     exec_result = MagicMock(data=sample, error=None)
     mock_table = MagicMock()
-    (
-        mock_table.select.return_value.gte.return_value.lt.return_value.execute.return_value
-    ) = exec_result
+    mock_table.select.return_value.gte.return_value.lt.return_value.execute = AsyncMock(
+        return_value=exec_result
+    )
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
-    with patch("app.routers.floor_traffic.supabase", mock_supabase):
+    with patch("app.routers.floor_traffic.async_supabase", mock_supabase):
         response = client.get("/api/floor-traffic/month-metrics")
 
     assert response.status_code == 200
@@ -237,16 +240,33 @@ def test_search_floor_traffic():
 
     exec_result = MagicMock(data=sample, error=None)
     mock_table = MagicMock()
-    (
-        mock_table.select.return_value.gte.return_value.lt.return_value.order.return_value.execute.return_value
-    ) = exec_result
+    mock_table.select.return_value.gte.return_value.lt.return_value.order.return_value.execute = AsyncMock(
+        return_value=exec_result
+    )
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
-    with patch("app.routers.floor_traffic.supabase", mock_supabase):
+    with patch("app.routers.floor_traffic.async_supabase", mock_supabase):
         response = client.get(
             "/api/floor-traffic/search?start=2024-01-05&end=2024-01-05"
         )
 
     assert response.status_code == 200
     assert response.json() == sample
+
+
+def test_month_metrics_reads_daily_rollup():
+    mock_table = MagicMock()
+    mock_table.select.return_value.gte.return_value.lt.return_value.execute = AsyncMock(
+        return_value=MagicMock(data=[], error=None)
+    )
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value = mock_table
+
+    with patch("app.routers.floor_traffic.async_supabase", mock_supabase):
+        response = client.get("/api/floor-traffic/month-metrics")
+
+    assert response.json()["total_customers"] == 0
+    mock_supabase.table.assert_called_with("daily_metrics")
+    mock_table.select.assert_called_with("visits,demos,worksheets,offers,sold")
+    assert month_bounds(date(2024, 12, 15)) == (date(2024, 12, 1), date(2025, 1, 1))
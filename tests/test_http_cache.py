@@ -0,0 +1,134 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.http_cache import AsyncCachingTransport, CachingTransport, HTTPCache
+from app.main import app
+
+VPIC = "https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVin/1FTFW1E55LFA00001?format=json"
+DECODE = {"Results": [
+    {"Variable": "Model Year", "Value": "2020"},
+    {"Variable": "Make", "Value": "FORD"},
+    {"Variable": "Model", "Value": "F-150"},
+    {"Variable": "Trim", "Value": "XLT"},
+]}
+
+
+def _mock(calls, status=200):
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(status, json=DECODE)
+    return httpx.MockTransport(handler)
+
+
+def test_responses_survive_a_new_cache_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    calls = []
+    with httpx.Client(transport=CachingTransport(_mock(calls), HTTPCache(path))) as client:
+        assert client.get(VPIC).json() == DECODE
+        assert client.get(VPIC).headers["x-cache"] == "hit"
+
+    # A fresh instance (e.g. after a restart) reads the same file.
+    with httpx.Client(transport=CachingTransport(_mock(calls), HTTPCache(path))) as client:
+        assert client.get(VPIC).json() == DECODE
+    assert calls == [VPIC]
+
+
+def test_only_configured_hosts_and_successes_are_cached(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.sqlite3"), ttls={"vpic.nhtsa.dot.gov": 60})
+    calls = []
+    with httpx.Client(transport=CachingTransport(_mock(calls), cache)) as client:
+        client.get("https://example.com/a")
+        client.get("https://example.com/a")
+    with httpx.Client(transport=CachingTransport(_mock(calls, status=500), cache)) as client:
+        client.get(VPIC)
+        client.get(VPIC)
+
+    assert len(calls) == 4
+
+
+def test_expired_and_invalidated_entries_are_refetched(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.sqlite3"), ttls={"vpic.nhtsa.dot.gov": 60})
+    cache.set(VPIC, 200, {}, b"{}")
+    assert VPIC in cache
+
+    cache.invalidate(VPIC)
+    assert VPIC not in cache
+
+    cache.ttls["vpic.nhtsa.dot.gov"] = -1
+    cache.set(VPIC, 200, {}, b"{}")
+    assert VPIC not in cache
+
+
+def test_async_transport(tmp_path):
+    calls = []
+    transport = AsyncCachingTransport(_mock(calls), HTTPCache(str(tmp_path / "c.sqlite3")))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get(VPIC)
+            return await client.get(VPIC)
+
+    assert asyncio.run(run()).json() == DECODE
+    assert len(calls) == 1
+
+
+def test_async_transport_keeps_sqlite_off_the_loop(tmp_path):
+    cache = HTTPCache(str(tmp_path / "c.sqlite3"))
+    threads = []
+    for name in ("_hit", "_store"):
+        method = getattr(cache, name)
+
+        def spy(*args, _method=method, _name=name):
+            threads.append((_name, threading.get_ident()))
+            return _method(*args)
+        setattr(cache, name, spy)
+    transport = AsyncCachingTransport(_mock([]), cache)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get(VPIC)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+
+    assert [name for name, _ in threads] == ["_hit", "_store"]
+    assert all(ident != loop_thread for _, ident in threads)
+
+
+def test_vin_decode_is_served_from_cache(tmp_path):
+    calls = []
+    vpic = httpx.Client(transport=CachingTransport(_mock(calls), HTTPCache(str(tmp_path / "v.sqlite3"))))
+
+    with patch("app.routers.vin.vpic_client", vpic):
+        first = TestClient(app).get("/api/vin/decode/1ftfw1e55lfa00001")
+        second = TestClient(app).get("/api/vin/decode/1FTFW1E55LFA00001")
+
+    assert first.json() == second.json()
+    assert first.json()["trim"] == "XLT"
+    assert len(calls) == 1
+
+
+def test_unwritable_path_disables_the_cache(tmp_path):
+    cache = HTTPCache(str(tmp_path / "missing" / "cache.sqlite3"))
+    calls = []
+    with httpx.Client(transport=CachingTransport(_mock(calls), cache)) as client:
+        assert client.get(VPIC).json() == DECODE
+        assert client.get(VPIC).json() == DECODE
+
+    assert len(calls) == 2
+    assert cache.path is None
+    cache.invalidate(VPIC)
+    assert cache.purge_expired() == 0
+
+
+def test_invalidate_and_purge_survive_database_errors(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.sqlite3"))
+    cache.set(VPIC, 200, {}, b"{}")
+    cache._db.execute("drop table responses")
+
+    cache.invalidate(VPIC)
+    assert cache.purge_expired() == 0
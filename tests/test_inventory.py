@@ -1,6 +1,9 @@
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
+from postgrest.exceptions import APIError
 from app.main import app
+from app.inventory_aging import AgingSnapshot
+from app.inventory_index import InventoryIndex
 import json
 
 client = TestClient(app)
@@ -9,12 +12,17 @@ client = TestClient(app)
 def test_list_inventory():
     sample = [{"id": "1", "stocknumber": "A123", "type": "new"}]
     exec_result = MagicMock(data=sample, error=None)
+    mock_query = MagicMock()
+    mock_query.order.return_value = mock_query
+    mock_query.limit.return_value = mock_query
+    mock_query.execute.return_value = exec_result
     mock_table = MagicMock()
-    mock_table.select.return_value.execute.return_value = exec_result
+    mock_table.select.return_value = mock_query
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
-    with patch("app.routers.inventory.supabase", mock_supabase):
+    with patch("app.inventory_index.supabase", mock_supabase), \
+         patch("app.routers.inventory.inventory_index", InventoryIndex()):
         response = client.get("/api/inventory/")
 
     assert response.status_code == 200
@@ -22,6 +30,7 @@ def test_list_inventory():
     assert isinstance(data, list)
     assert data[0]["stocknumber"] == "A123"
     assert data[0]["type"] == "new"
+    assert "x-next-cursor" not in response.headers
 
 
 def test_create_inventory():
@@ -52,6 +61,8 @@ def test_filter_inventory_query_params():
 
     mock_query = MagicMock()
     mock_query.ilike.return_value = mock_query
+    mock_query.order.return_value = mock_query
+    mock_query.limit.return_value = mock_query
     mock_query.gte.return_value = mock_query
     mock_query.execute.return_value = exec_result
 
@@ -60,7 +71,12 @@ def test_filter_inventory_query_params():
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
-    with patch("app.routers.inventory.supabase", mock_supabase):
+    def unavailable():
+        raise APIError({"message": "down"})
+
+    # With the in-memory index unavailable the filters go to PostgREST.
+    with patch("app.routers.inventory.supabase", mock_supabase), \
+         patch("app.routers.inventory.inventory_index", InventoryIndex(unavailable)):
         response = client.get("/api/inventory/?make=Ford&year_min=2020")
 
     assert response.status_code == 200
@@ -75,13 +91,9 @@ def test_inventory_snapshot():
         {"type": "used", "StatusCode": "in_stock"},
         {"type": "new", "StatusCode": "in_stock"},
     ]
-    exec_result = MagicMock(data=sample, error=None)
-    mock_table = MagicMock()
-    mock_table.select.return_value.execute.return_value = exec_result
-    mock_supabase = MagicMock()
-    mock_supabase.table.return_value = mock_table
+    index = InventoryIndex(lambda: sample)
 
-    with patch("app.routers.inventory.supabase", mock_supabase):
+    with patch("app.routers.inventory.aging_snapshot", AgingSnapshot(index)):
         response = client.get("/api/inventory/snapshot")
 
     assert response.status_code == 200
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+from app.inventory_aging import AgingSnapshot
+from app.inventory_index import InventoryIndex
+
+ROWS = [
+    {"id": "1", "type": "New", "Days In Stock": 10},
+    {"id": "2", "type": "new", "Days In Stock": 40},
+    {"id": "3", "type": "Used", "Days In Stock": 95},
+    {"id": "4", "type": "used"},
+]
+
+
+class _Clock:
+    def __init__(self):
+        self.day = date(2025, 7, 1)
+
+    def __call__(self):
+        return self.day
+
+
+def _snapshot():
+    clock = _Clock()
+    index = InventoryIndex(lambda: [dict(r) for r in ROWS])
+    return AgingSnapshot(index, today=clock), index, clock
+
+
+def test_summary_matches_full_recompute():
+    snapshot, _, _ = _snapshot()
+    summary = snapshot.summary()
+
+    assert summary["new"] == {
+        "total": 2,
+        "avgDays": 25.0,
+        "turnRate": 0.04,
+        "buckets": {"0-30": 1, "31-45": 1, "46-60": 0, "61-90": 0, "90+": 0},
+    }
+    assert summary["used"]["total"] == 2
+    assert summary["used"]["buckets"]["90+"] == 1
+
+
+def test_rolls_forward_daily_without_reload():
+    snapshot, index, clock = _snapshot()
+    snapshot.summary()
+    calls = []
+    index._loader = lambda: calls.append(1) or []
+
+    clock.day += timedelta(days=21)
+    summary = snapshot.summary()
+
+    assert calls == []
+    assert summary["new"]["buckets"] == {"0-30": 0, "31-45": 1, "46-60": 0, "61-90": 1, "90+": 0}
+    assert summary["new"]["avgDays"] == 46.0
+
+
+def test_router_writes_update_counters():
+    snapshot, index, _ = _snapshot()
+    snapshot.summary()
+
+    index.upsert({"id": "5", "type": "New", "Days In Stock": 1})
+    index.upsert({"id": "3", "type": "New"})  # partial update moves it to new
+    index.remove("1")
+    summary = snapshot.summary()
+
+    assert summary["new"]["total"] == 3
+    assert summary["new"]["buckets"] == {"0-30": 1, "31-45": 1, "46-60": 0, "61-90": 0, "90+": 1}
+    assert summary["used"]["total"] == 1
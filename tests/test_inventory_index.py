@@ -0,0 +1,155 @@
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, patch
+from app.main import app
+from app.inventory_index import InventoryIndex
+from app.pagination import decode_cursor
+
+client = TestClient(app)
+
+ROWS = [
+    {"id": "3", "make": "Ford", "model": "F-150", "type": "Used", "year": 2019,
+     "sellingprice": 31000, "mileage": 42000, "exterior_color": "Oxford White"},
+    {"id": "1", "make": "Ford", "model": "Escape", "type": "New", "year": 2024,
+     "sellingprice": 29500, "mileage": 12, "exterior_color": "Blue"},
+    {"id": "2", "make": "Toyota", "model": "Camry", "type": "Used", "year": 2021,
+     "sellingprice": 24000, "mileage": 30000, "exterior_color": "White"},
+    {"id": "10", "make": "Ford", "model": "Bronco", "type": "New", "year": 2024,
+     "sellingprice": 45000, "mileage": 5, "exterior_color": "Red"},
+]
+
+
+def _index():
+    return InventoryIndex(lambda: [dict(r) for r in ROWS])
+
+
+def test_search_filters_and_orders_by_id():
+    result = _index().search(
+        terms={"make": "for", "exterior_color": "WHITE"},
+        ranges={"year": (2018, 2020)},
+    )
+    assert [r["id"] for r in result.rows] == ["3"]
+
+    result = _index().search(ranges={"sellingprice": (25000, None)})
+    assert [r["id"] for r in result.rows] == ["1", "3", "10"]
+
+
+def test_facets_exclude_their_own_filter():
+    result = _index().search(terms={"make": "ford", "type": "new"}, with_facets=True)
+
+    assert result.total == 2
+    assert result.facets["type"] == {"New": 2, "Used": 1}
+    assert result.facets["make"] == {"Ford": 2}
+
+
+def test_upsert_and_remove_update_the_index():
+    index = _index()
+    index.load()
+
+    index.upsert({"id": "2", "sellingprice": 50000})
+    index.upsert({"id": "11", "make": "Kia", "type": "New"})
+    index.upsert({"id": "4", "make": "Kia", "type": "Used"})
+    index.remove("10")
+
+    assert [r["id"] for r in index.search(ranges={"sellingprice": (40000, None)}).rows] == ["2"]
+    assert [r["id"] for r in index.search(terms={"make": "kia"}).rows] == ["4", "11"]
+    assert index.search().total == 5
+
+
+def test_list_inventory_pages_from_index():
+    with patch("app.routers.inventory.inventory_index", _index()):
+        response = client.get("/api/inventory/?make=ford&limit=2&fields=make")
+        cursor = response.headers["x-next-cursor"]
+        second = client.get(f"/api/inventory/?make=ford&limit=2&fields=make&cursor={cursor}")
+
+    assert response.json() == [{"id": "1", "make": "Ford"}, {"id": "3", "make": "Ford"}]
+    assert decode_cursor(cursor) == {"id": "3"}
+    assert second.json() == [{"id": "10", "make": "Ford"}]
+    assert "x-next-cursor" not in second.headers
+
+
+def test_search_endpoint_returns_items_and_facets():
+    with patch("app.routers.inventory.inventory_index", _index()):
+        response = client.get("/api/inventory/search?type=used")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 2
+    assert [item["id"] for item in body["items"]] == ["2", "3"]
+    assert body["facets"]["make"] == {"Ford": 1, "Toyota": 1}
+
+
+def test_version_change_reloads_the_index():
+    rows = [dict(r) for r in ROWS]
+    version = {"value": 1}
+    index = InventoryIndex(lambda: [dict(r) for r in rows],
+                           version_loader=lambda: version["value"], check_interval=0)
+    assert index.search(terms={"make": "kia"}).total == 0
+
+    # Another worker adds a vehicle; the watermark moves.
+    rows.append({"id": "12", "make": "Kia"})
+    assert index.search(terms={"make": "kia"}).total == 0
+    version["value"] = 2
+    assert index.search(terms={"make": "kia"}).total == 1
+
+
+def test_refresh_rereads_the_view_row():
+    view = {"2": {"id": "2", "make": "Toyota", "sellingprice": 22000, "Days In Stock": 40}}
+    index = InventoryIndex(lambda: [dict(r) for r in ROWS], row_loader=view.get)
+    index.search()
+
+    index.refresh("2")
+    index.refresh("3")  # gone from the view
+
+    rows = index.search().rows
+    assert [r["id"] for r in rows] == ["1", "2", "10"]
+    assert rows[1]["Days In Stock"] == 40
+
+
+def test_list_falls_back_to_database_on_any_index_error():
+    def broken():
+        raise RuntimeError("connection reset")
+
+    mock_supabase = MagicMock()
+    query = mock_supabase.table.return_value.select.return_value
+    query.order.return_value = query
+    query.execute.return_value = MagicMock(data=[{"id": "7", "make": "Ford"}], count=None)
+
+    with patch("app.routers.inventory.inventory_index", InventoryIndex(broken)), \
+         patch("app.routers.inventory.supabase", mock_supabase):
+        response = client.get("/api/inventory/")
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": "7", "make": "Ford"}]
+
+
+def test_loader_projection_includes_every_filtered_column():
+    from app.inventory_index import FACETS, RANGES, load_inventory_rows
+
+    view = [
+        {"id": "1", "make": "Ford", "fuel_type": "Gasoline", "drive_type": "4WD"},
+        {"id": "2", "make": "Tesla", "fuel_type": "Electric", "drive_type": "AWD"},
+    ]
+    mock_supabase = MagicMock()
+    query = mock_supabase.table.return_value.select.return_value
+
+    def execute():
+        # Return only the selected columns, like PostgREST would.
+        columns = mock_supabase.table.return_value.select.call_args.args[0].split(",")
+        return MagicMock(data=[{c: r[c] for c in columns if c in r} for r in view])
+
+    query.order.return_value = query
+    query.limit.return_value = query
+    query.execute.side_effect = execute
+
+    with patch("app.inventory_index.supabase", mock_supabase):
+        index = InventoryIndex(load_inventory_rows)
+        selected = mock_supabase.table.return_value.select
+        index.search()
+        assert set(FACETS) | set(RANGES) <= set(selected.call_args.args[0].split(","))
+
+        with patch("app.routers.inventory.inventory_index", index):
+            response = client.get("/api/inventory/?fuelType=Electric")
+            facets = client.get("/api/inventory/search").json()["facets"]
+
+    assert [r["id"] for r in response.json()] == ["2"]
+    assert facets["fuel_type"] == {"Electric": 1, "Gasoline": 1}
@@ -0,0 +1,186 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db_models import Base, QueuedJob
+from app.job_queue import LEASE_LOST, JobQueue
+from app.main import app
+from app.worker import work
+from tests.test_bulk_send import FakeTwilio, _customers
+
+
+@pytest.fixture
+def queue(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.sqlite3'}")
+    Base.metadata.create_all(bind=engine)
+    yield JobQueue(sessionmaker(bind=engine), retry_backoff=0)
+    engine.dispose()
+
+
+def test_enqueue_is_idempotent_per_key(queue):
+    queue.task("echo")(lambda job, value: value)
+
+    first = queue.enqueue("echo", {"value": 1}, idempotency_key="abc")
+    again = queue.enqueue("echo", {"value": 2}, idempotency_key="abc")
+    other = queue.enqueue("echo", {"value": 3})
+
+    assert again["id"] == first["id"]
+    assert other["id"] != first["id"]
+    assert first["status"] == "pending"
+    assert len(queue.recent()) == 2
+
+
+def test_failed_job_is_retried_then_succeeds(queue):
+    calls = []
+
+    @queue.task("flaky", max_attempts=3)
+    async def flaky(job, n):
+        calls.append(n)
+        if len(calls) < 2:
+            raise RuntimeError("upstream timeout")
+        job.total = job.done = n
+        job.summary["ok"] = n
+        return {"n": n}
+
+    job_id = queue.enqueue("flaky", {"n": 5})["id"]
+    assert asyncio.run(queue.run_pending("w1")) == 2
+
+    body = queue.get(job_id)
+    assert calls == [5, 5]
+    assert (body["status"], body["attempts"], body["error"]) == ("done", 2, None)
+    assert body["result"] == {"n": 5}
+    assert body["summary"] == {"ok": 5} and body["progress"] == 1.0
+
+
+def test_job_fails_after_max_attempts(queue):
+    @queue.task("broken", max_attempts=2)
+    def broken(job):
+        raise ValueError("bad payload")
+
+    job_id = queue.enqueue("broken")["id"]
+    asyncio.run(queue.run_pending("w1"))
+
+    body = queue.get(job_id)
+    assert (body["status"], body["attempts"], body["error"]) == ("failed", 2, "bad payload")
+    assert body["finished_at"] is not None
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue):
+    queue.task("echo")(lambda job, value: value)
+    job_id = queue.enqueue("echo", {"value": "hi"})["id"]
+
+    assert queue.claim("dead-worker").id == job_id
+    assert queue.claim("w2") is None  # still leased
+
+    with queue.session() as db:
+        db.execute(update(QueuedJob).values(locked_until=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+    row = queue.claim("w2")
+    assert (row.id, row.locked_by, row.attempts) == (job_id, "w2", 2)
+
+    # The dead worker can no longer write to the job it lost.
+    job = queue.get_job(job_id)
+    assert queue.complete(row, job, "dead-worker", "late") is False
+    assert asyncio.run(queue.run(row, "w2")) == "done"
+    assert queue.get(job_id)["result"] == "hi"
+
+
+def test_lost_lease_cancels_the_handler(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.sqlite3'}")
+    Base.metadata.create_all(bind=engine)
+    queue = JobQueue(sessionmaker(bind=engine), lease_seconds=0.3, retry_backoff=0)
+    finished = []
+
+    @queue.task("slow")
+    async def slow(job):
+        with queue.session() as db:  # another worker takes the job over
+            db.execute(update(QueuedJob).values(locked_by="w2"))
+            db.commit()
+        await asyncio.sleep(5)
+        finished.append(True)
+
+    job_id = queue.enqueue("slow")["id"]
+    row = queue.claim("w1")
+    started = time.perf_counter()
+
+    assert asyncio.run(queue.run(row, "w1")) == LEASE_LOST
+    assert time.perf_counter() - started < 2
+    assert finished == []
+    assert queue.get(job_id)["status"] == "running"  # still w2's
+    engine.dispose()
+
+
+def test_sync_handler_runs_off_the_event_loop(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.sqlite3'}")
+    Base.metadata.create_all(bind=engine)
+    queue = JobQueue(sessionmaker(bind=engine), lease_seconds=0.3, retry_backoff=0)
+    beats = []
+    renew = queue.heartbeat
+    queue.heartbeat = lambda *args: beats.append(1) or renew(*args)
+    queue.task("blocking")(lambda job: time.sleep(0.5) or "ok")
+
+    job_id = queue.enqueue("blocking")["id"]
+    assert asyncio.run(queue.run_pending("w1")) == 1
+
+    assert queue.get(job_id)["status"] == "done"
+    assert len(beats) >= 2
+    engine.dispose()
+
+
+def test_worker_runs_jobs_concurrently(queue):
+    @queue.task("sleep")
+    async def sleepy(job, seconds):
+        await asyncio.sleep(seconds)
+
+    for _ in range(4):
+        queue.enqueue("sleep", {"seconds": 0.2})
+
+    started = time.perf_counter()
+    ran = asyncio.run(work(queue, concurrency=4, once=True))
+
+    assert ran == 4
+    assert time.perf_counter() - started < 0.6
+    assert {j["status"] for j in queue.recent()} == {"done"}
+
+
+def test_bulk_text_enqueues_and_worker_sends(queue):
+    from app.routers import bulk
+
+    queue.tasks.update(bulk.job_queue.tasks)
+    rows = [{"id": str(i), "phone": f"+1555000{i:04d}"} for i in range(3)]
+    fake = FakeTwilio()
+
+    with patch("app.routers.bulk.JOB_QUEUE_ENABLED", True), \
+         patch("app.routers.jobs.JOB_QUEUE_ENABLED", True), \
+         patch("app.routers.bulk.job_queue", queue), \
+         patch("app.routers.jobs.job_queue", queue), \
+         patch("app.routers.bulk.async_supabase", _customers(rows)), \
+         patch("app.routers.bulk.twilio_client", return_value=fake), \
+         patch("app.routers.bulk.TWILIO_MESSAGES_PER_SECOND", 1000.0):
+        client = TestClient(app)
+        payload = {"ids": [r["id"] for r in rows], "message": "Sale!"}
+        headers = {"Idempotency-Key": "blast-1"}
+        started = client.post("/api/bulk/text", json=payload, headers=headers)
+        repeated = client.post("/api/bulk/text", json=payload, headers=headers)
+
+        assert started.status_code == 202
+        assert repeated.json()["id"] == started.json()["id"]
+        assert started.json()["status"] == "pending"
+        assert fake.sent == []
+
+        asyncio.run(queue.run_pending("w1"))
+        status = client.get(started.json()["status_url"]).json()
+
+    assert status["status"] == "done"
+    assert status["summary"] == {"skipped": 0, "sent": 3, "failed": 0}
+    assert len(fake.sent) == 3
+
+
+def test_unknown_job_is_404():
+    assert TestClient(app).get("/api/jobs/missing").status_code == 404
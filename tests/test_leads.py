@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.main import app
+from app.cache import TTLCache
 
 client = TestClient(app)
 
@@ -9,8 +10,12 @@ def test_list_leads():
     sample = [{"id": "1", "name": "Alice", "email": "alice@example.com"}]
     exec_result = MagicMock(data=sample, error=None)
 
+    mock_query = MagicMock()
+    mock_query.order.return_value = mock_query
+    mock_query.limit.return_value = mock_query
+    mock_query.execute.return_value = exec_result
     mock_table = MagicMock()
-    mock_table.select.return_value.execute.return_value = exec_result
+    mock_table.select.return_value = mock_query
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
@@ -25,11 +30,11 @@ def test_ask_no_openai_key():
     payload = {"question": "Hi"}
     exec_result = MagicMock(data=[], error=None)
     mock_table = MagicMock()
-    mock_table.select.return_value.execute.return_value = exec_result
+    mock_table.select.return_value.execute = AsyncMock(return_value=exec_result)
     mock_supabase = MagicMock()
     mock_supabase.table.return_value = mock_table
 
-    with patch("app.routers.leads.supabase", mock_supabase), \
+    with patch("app.routers.leads.async_supabase", mock_supabase), \
          patch("app.routers.leads.get_openai_client", return_value=None):
         response = client.post(
             "/api/leads/ask",
@@ -42,16 +47,8 @@ def test_ask_no_openai_key():
 
 def test_month_metrics():
     sample = [
-        {
-            "created_at": "2024-01-01T00:00:00",
-            "last_lead_response_at": "2024-01-01T00:10:00",
-            "last_staff_response_at": "2024-01-01T00:20:00",
-        },
-        {
-            "created_at": "2024-01-02T00:00:00",
-            "last_lead_response_at": None,
-            "last_staff_response_at": None,
-        },
+        {"leads": 1, "engaged_leads": 1, "responded_leads": 1, "response_seconds": 600.0},
+        {"leads": 1, "engaged_leads": 0, "responded_leads": 0, "response_seconds": 0},
     ]
     exec_result = MagicMock(data=sample, error=None)
     mock_table = MagicMock()
@@ -71,3 +68,57 @@ def test_month_metrics():
         "average_response_time": 600.0,
         "lead_engagement_rate": 50.0,
     }
+
+
+def test_lead_metrics_uses_rpc_and_caches():
+    rpc_result = MagicMock(
+        data=[{"total_leads": 4, "engaged_leads": 1, "avg_response_seconds": 600}],
+        error=None,
+    )
+    mock_supabase = MagicMock()
+    mock_supabase.rpc.return_value.execute.return_value = rpc_result
+
+    with patch("app.routers.leads.supabase", mock_supabase), \
+         patch("app.routers.leads._kpi_cache", TTLCache(ttl=60)):
+        first = client.get("/api/leads/metrics")
+        second = client.get("/api/leads/metrics")
+
+    assert first.json() == {
+        "total_leads": 4,
+        "conversion_rate": 25.0,
+        "average_response_time": 600.0,
+        "lead_engagement_rate": 25.0,
+    }
+    assert second.json() == first.json()
+    mock_supabase.rpc.assert_called_once_with("lead_kpis")
+
+
+def test_awaiting_response_reads_view():
+    sample = [{"id": "1", "name": "Alice", "email": "alice@example.com"}]
+    mock_supabase = MagicMock()
+    (
+        mock_supabase.table.return_value.select.return_value.order.return_value.execute.return_value
+    ) = MagicMock(data=sample, error=None)
+
+    with patch("app.routers.leads.supabase", mock_supabase):
+        response = client.get("/api/leads/awaiting-response")
+
+    assert response.json() == sample
+    mock_supabase.table.assert_called_with("leads_awaiting_response")
+
+
+def test_ask_fetches_single_lead():
+    mock_query = MagicMock()
+    mock_query.select.return_value = mock_query
+    mock_query.eq.return_value = mock_query
+    mock_query.maybe_single.return_value = mock_query
+    mock_query.execute = AsyncMock(return_value=MagicMock(data={"id": 7, "name": "Bo"}))
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value = mock_query
+
+    with patch("app.routers.leads.async_supabase", mock_supabase), \
+         patch("app.routers.leads.get_openai_client", return_value=None):
+        response = client.post("/api/leads/ask", json={"question": "Hi", "lead_id": 7})
+
+    assert response.status_code == 200
+    mock_query.eq.assert_called_once_with("id", 7)
@@ -0,0 +1,100 @@
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, patch
+from app.main import app
+from app.pagination import Page, decode_cursor, encode_cursor, range_pages
+
+client = TestClient(app)
+
+
+def _chain(rows, count=None):
+    mock_query = MagicMock()
+    for name in ("order", "limit", "gt", "lt", "or_", "eq"):
+        getattr(mock_query, name).return_value = mock_query
+    mock_query.execute.return_value = MagicMock(data=rows, count=count, error=None)
+    mock_table = MagicMock()
+    mock_table.select.return_value = mock_query
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value = mock_table
+    return mock_supabase, mock_table, mock_query
+
+
+def test_cursor_round_trip():
+    values = {"id": "42", "created_at": "2024-01-01T00:00:00"}
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+def test_next_cursor_header_and_total():
+    rows = [{"id": str(i), "name": f"Opp {i}", "account_id": "1", "stage": "new", "amount": None} for i in range(1, 4)]
+    mock_supabase, mock_table, mock_query = _chain(rows, count=7)
+
+    with patch("app.routers.opportunities.supabase", mock_supabase):
+        response = client.get("/api/opportunities/?limit=2&include_total=true")
+
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()] == ["1", "2"]
+    assert decode_cursor(response.headers["x-next-cursor"]) == {"id": "2"}
+    assert response.headers["x-total-count"] == "7"
+    mock_table.select.assert_called_with("*", count="exact")
+    mock_query.limit.assert_called_with(3)
+
+
+def test_cursor_applies_keyset_filter():
+    mock_supabase, _, mock_query = _chain([])
+    cursor = encode_cursor({"id": "2"})
+
+    with patch("app.routers.opportunities.supabase", mock_supabase):
+        response = client.get(f"/api/opportunities/?cursor={cursor}")
+
+    assert response.status_code == 200
+    assert "x-next-cursor" not in response.headers
+    mock_query.gt.assert_called_with("id", "2")
+
+
+def test_compound_key_uses_tiebreaker():
+    query = MagicMock()
+    query.or_.return_value = query
+    query.order.return_value = query
+    page = Page(cursor=encode_cursor({"id": "9", "created_at": "2024-01-01"}), limit=10)
+
+    page.apply(query, key="created_at", desc=True)
+
+    query.or_.assert_called_with(
+        'created_at.lt."2024-01-01",and(created_at.eq."2024-01-01",id.lt."9")'
+    )
+    query.limit.assert_called_with(11)
+
+
+def test_invalid_cursor_rejected():
+    mock_supabase, _, _ = _chain([])
+    with patch("app.routers.opportunities.supabase", mock_supabase):
+        response = client.get("/api/opportunities/?cursor=not-a-cursor")
+
+    assert response.status_code == 400
+
+
+def test_no_limit_or_cursor_returns_everything():
+    mock_supabase, _, mock_query = _chain([
+        {"id": str(i), "name": f"Opp {i}", "account_id": "1", "stage": "new", "amount": None}
+        for i in range(150)
+    ])
+
+    with patch("app.routers.opportunities.supabase", mock_supabase):
+        response = client.get("/api/opportunities/")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 150
+    assert "x-next-cursor" not in response.headers
+    mock_query.limit.assert_not_called()
+
+
+def test_range_pages_reads_until_a_short_page():
+    data = list(range(7))
+    query = MagicMock()
+
+    def page(start, end):
+        return MagicMock(execute=MagicMock(return_value=MagicMock(data=data[start:end + 1])))
+
+    query.range.side_effect = page
+
+    assert list(range_pages(lambda: query, page_size=3)) == data
+    assert [c.args for c in query.range.call_args_list] == [(0, 2), (3, 5), (6, 8)]
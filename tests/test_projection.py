@@ -0,0 +1,90 @@
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, patch
+from postgrest.exceptions import APIError
+from app.main import app
+from app.inventory_index import InventoryIndex
+from app.models import InventoryItem
+from app.projection import select_columns
+
+client = TestClient(app)
+
+
+def _inventory_supabase(rows):
+    mock_query = MagicMock()
+    mock_query.order.return_value = mock_query
+    mock_query.limit.return_value = mock_query
+    mock_query.execute.return_value = MagicMock(data=rows, error=None)
+    mock_table = MagicMock()
+    mock_table.select.return_value = mock_query
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value = mock_table
+    return mock_supabase, mock_table
+
+
+def _no_index():
+    def unavailable():
+        raise APIError({"message": "down"})
+    return InventoryIndex(unavailable)
+
+
+def test_default_projection_uses_model_columns():
+    columns = select_columns(InventoryItem).split(",")
+
+    assert columns[0] == "id"
+    assert "exterior_color" in columns
+    assert '"Days In Stock"' in columns
+    assert "exteriorColor" not in columns
+
+
+def test_fields_param_limits_columns_and_payload():
+    mock_supabase, mock_table = _inventory_supabase([{"id": "1", "make": "Ford", "year": 2022}])
+
+    with patch("app.routers.inventory.supabase", mock_supabase), \
+         patch("app.routers.inventory.inventory_index", _no_index()):
+        response = client.get("/api/inventory/?fields=make,year")
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": "1", "make": "Ford", "year": 2022}]
+    mock_table.select.assert_called_with("id,make,year", count=None)
+
+
+def test_fields_param_rejects_unknown_field():
+    mock_supabase, _ = _inventory_supabase([])
+
+    with patch("app.routers.inventory.supabase", mock_supabase):
+        response = client.get("/api/inventory/?fields=make,secret_cost")
+
+    assert response.status_code == 400
+    assert "secret_cost" in response.json()["detail"]
+
+
+def test_sparse_fields_keep_required_model_fields():
+    rows = {
+        "activities": [{"id": "a1", "created_at": "2024-01-01T00:00:00", "subject": "Call",
+                        "activity_type": "call"}],
+        "leads": [{"id": "l1", "name": "Ann", "email": "ann@example.com"}],
+    }
+    for table, url, select in (
+        ("activities", "/api/activities/?fields=subject", "id,created_at,subject,activity_type"),
+        ("leads", "/api/leads/?fields=name", "id,name,email"),
+    ):
+        mock_supabase, mock_table = _inventory_supabase(rows[table])
+        with patch(f"app.routers.{table}.supabase", mock_supabase):
+            response = client.get(url)
+
+        assert response.status_code == 200, url
+        assert response.json() == rows[table]
+        mock_table.select.assert_called_with(select, count=None)
+
+
+def test_sparse_customer_fields_still_derive_name():
+    mock_supabase, mock_table = _inventory_supabase(
+        [{"id": "c1", "first_name": "Ann", "last_name": "Lee", "name": None,
+          "email": "ann@example.com"}]
+    )
+    with patch("app.routers.customers.supabase", mock_supabase):
+        response = client.get("/api/customers/?fields=email")
+
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Ann Lee"
+    mock_table.select.assert_called_with("id,first_name,last_name,email,name", count=None)
@@ -0,0 +1,108 @@
+from datetime import date
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.vin_decoder import InvalidVIN, check_digit, decode_local, model_year
+
+client = TestClient(app)
+
+ACCORD = "1HGCM82633A004352"
+
+
+def test_check_digit_and_validation():
+    assert check_digit(ACCORD) == "3"
+    assert check_digit("1M8GDM9AXKP042788") == "X"
+    with pytest.raises(InvalidVIN, match="check digit"):
+        decode_local("1HGCM82643A004352")
+    with pytest.raises(InvalidVIN, match="invalid characters"):
+        decode_local("1HGCM8263OA004352")
+    # Outside North America the check digit is optional.
+    assert decode_local("WBA8E9G51GNU30000")["check_digit_valid"] is False
+
+
+def test_model_year_cycles():
+    today = date(2025, 10, 17)
+    assert model_year(ACCORD, today) == 2003
+    assert model_year("1FTFW1E55LFA00001", today) == 2020  # letter in position 7
+    assert model_year("5YJ3E1EA7KF317000", today) == 2019
+    # Would be 2033 in the letter cycle; too far ahead, so 2003.
+    assert model_year("WBAXXXA0X3A000000", today) == 2003
+    # Outside North America position 7 means nothing: latest cycle (2020, not 1990).
+    assert model_year("WBAXXX10XLA000000", today) == 2020
+    # Harley-Davidson puts a digit in position 7 on current bikes.
+    assert model_year("1HD1KHM1XLB000000", today) == 2020
+
+
+def test_decode_local_uses_wmi_table():
+    result = decode_local(" 1hgcm82633a004352 ")
+
+    assert result["make"] == "Honda"
+    assert result["country"] == "United States"
+    assert result["year"] == 2003
+    assert decode_local("1C4RJFAG4FC600000")["make"] is None  # shared Stellantis WMI
+
+
+def test_local_decode_skips_vpic():
+    with patch("app.routers.vin.vpic_decode") as vpic:
+        response = client.get(f"/api/vin/decode/{ACCORD}?local=true")
+
+    vpic.assert_not_called()
+    assert response.status_code == 200
+    assert response.json()["make"] == "Honda" and response.json()["model"] is None
+
+
+def test_vpic_fills_missing_fields_and_sets_the_year():
+    remote = {"year": 2004, "make": "HONDA", "model": "Accord", "trim": "EX"}
+    with patch("app.routers.vin.vpic_decode", return_value=remote):
+        body = client.get(f"/api/vin/decode/{ACCORD}").json()
+
+    assert (body["year"], body["make"], body["model"], body["trim"]) == (2004, "Honda", "Accord", "EX")
+    assert body["source"] == "local+vpic"
+
+
+def test_vpic_outage_returns_partial_result():
+    def handler(request):
+        raise httpx.ConnectTimeout("timed out")
+    broken = httpx.Client(transport=httpx.MockTransport(handler))
+
+    with patch("app.routers.vin.vpic_client", broken):
+        response = client.get(f"/api/vin/decode/{ACCORD}")
+
+    assert response.status_code == 200
+    assert response.json()["partial"] is True
+    assert client.get("/api/vin/decode/1HGCM82643A004352").status_code == 400
+
+
+def test_decode_batch_dedupes_and_reports_errors():
+    calls = []
+
+    def fake_vpic(vin):
+        calls.append(vin)
+        return {"model": "Accord", "trim": "EX"}
+
+    vins = [ACCORD, ACCORD.lower(), "1HGCM82643A004352", "SHORT", "1FTFW1E55LFA00001"]
+    with patch("app.routers.vin.vpic_decode", side_effect=fake_vpic):
+        body = client.post("/api/vin/decode-batch", json={"vins": vins}).json()
+
+    assert sorted(calls) == sorted([ACCORD, "1FTFW1E55LFA00001"])
+    assert body["count"] == 5 and body["errors"] == 2
+    first, repeat, bad_check, short, ford = body["results"]
+    assert first["model"] == "Accord" and first["make"] == "Honda"
+    assert repeat == first
+    assert "check digit" in bad_check["error"]
+    assert short == {"vin": "SHORT", "error": "VIN must be 17 characters."}
+    assert ford["make"] == "Ford"
+
+
+def test_decode_batch_local_and_limit():
+    with patch("app.routers.vin.vpic_decode") as vpic:
+        body = client.post("/api/vin/decode-batch", json={"vins": [ACCORD], "local": True}).json()
+    vpic.assert_not_called()
+    assert body["results"][0]["source"] == "local"
+
+    too_many = {"vins": [ACCORD] * 501}
+    assert client.post("/api/vin/decode-batch", json=too_many).status_code == 422